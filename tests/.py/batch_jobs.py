@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_jobs.py
+-------------
+Batchjobb-läge för stora översättningskörningar (OpenAI Batch API eller lokal filbaserad ersättare).
+- Alla väntande förfrågningar skrivs som JSONL (custom_id + /v1/chat/completions-body) och skickas som ETT jobb
+- Jobbets id och förfrågningarnas metadata sparas i en tillståndsfil → skriptet kan avslutas och köras igen
+- Nästa körning pollar jobbet; när det är klart läses resultaten in (t.ex. till översättningsminnet)
+- Förfrågningar som fick fel eller saknas skickas i ett nytt jobb nästa varv
+- LocalBatchBackend: samma flöde helt offline – svaren kommer från openai_stub_server (pseudoöversättning)
+
+Backend väljs med BATCH_BACKEND=openai|local (default openai), pollintervall BATCH_POLL_SECONDS (30).
+
+Exempel:
+    runner = BatchRunner("översättning/full_pivot.batch.json", get_backend("local"))
+    done = runner.step("SE-EN", {"SE-EN-ab12": {"meta": [...], "messages": [...]}}, model="gpt-4o")
+    if done is None: ...  # jobbet kör fortfarande – kör skriptet igen senare
+    ... spara done (t.ex. i översättningsminnet) ...
+    runner.mark_collected("SE-EN")   # först nu räknas jobbet som hämtat
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+from typing import Any, Dict, List, Optional
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+DEFAULT_BACKEND = os.getenv("BATCH_BACKEND", "openai")
+POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+LOCAL_DIR = os.path.join("översättning", "batch_local")
+LOCAL_DELAY = float(os.getenv("LOCAL_BATCH_DELAY", "0"))
+
+FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+# --------- JSONL ---------
+def request_line(custom_id: str, messages: List[Dict[str, str]], model: str, **body) -> Dict[str, Any]:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": model, "messages": messages, **body},
+    }
+
+def write_jsonl(path: str, lines) -> int:
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+def parse_output(text: str) -> Dict[str, Optional[str]]:
+    """custom_id -> svarstext; None för rader med fel (status != 200 eller error)."""
+    out: Dict[str, Optional[str]] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        cid = entry.get("custom_id")
+        if cid is None:
+            continue
+        resp = entry.get("response") or {}
+        if entry.get("error") or resp.get("status_code") != 200:
+            out.setdefault(cid, None)
+            continue
+        try:
+            content = resp["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            out.setdefault(cid, None)
+            continue
+        out[cid] = (content or "").strip() or None
+    return out
+
+
+# --------- Backends ---------
+class OpenAIBatchBackend:
+    """Files API + Batches API."""
+
+    name = "openai"
+
+    def __init__(self, client=None):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+
+    def submit(self, path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+            metadata=metadata or None,
+        )
+        return batch.id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        b = self.client.batches.retrieve(job_id)
+        counts = getattr(b, "request_counts", None)
+        return {
+            "status": b.status,
+            "output_file_id": getattr(b, "output_file_id", None),
+            "error_file_id": getattr(b, "error_file_id", None),
+            "completed": getattr(counts, "completed", 0) if counts else 0,
+            "failed": getattr(counts, "failed", 0) if counts else 0,
+            "total": getattr(counts, "total", 0) if counts else 0,
+        }
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchBackend:
+    """Filbaserad ersättare: jobben ligger i en katalog och "körs" av openai_stub_server vid pollning."""
+
+    name = "local"
+
+    def __init__(self, directory: str = LOCAL_DIR, delay: float = LOCAL_DELAY, stub=None):
+        from openai_stub_server import StubServer
+        self.directory = directory
+        self.delay = delay
+        self.stub = stub or StubServer()
+        os.makedirs(directory, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def _read_state(self, job_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self._job_dir(job_id), "status.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_state(self, job_id: str, state: Dict[str, Any]):
+        tmp = os.path.join(self._job_dir(job_id), "status.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(self._job_dir(job_id), "status.json"))
+
+    def submit(self, path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        job_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._job_dir(job_id))
+        shutil.copyfile(path, os.path.join(self._job_dir(job_id), "input.jsonl"))
+        self._write_state(job_id, {"status": "in_progress", "created": time.time(), "metadata": metadata or {}})
+        return job_id
+
+    def _run(self, job_id: str, state: Dict[str, Any]):
+        out, err = [], []
+        with open(os.path.join(self._job_dir(job_id), "input.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                status, _, body = self.stub.handle(req.get("body") or {})
+                entry = {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": req.get("custom_id"),
+                    "response": {"status_code": status, "body": body},
+                    "error": None,
+                }
+                (out if status == 200 else err).append(entry)
+        write_jsonl(os.path.join(self._job_dir(job_id), "output.jsonl"), out)
+        write_jsonl(os.path.join(self._job_dir(job_id), "errors.jsonl"), err)
+        state.update({
+            "status": "completed",
+            "output_file_id": f"{job_id}/output.jsonl",
+            "error_file_id": f"{job_id}/errors.jsonl" if err else None,
+            "completed": len(out),
+            "failed": len(err),
+            "total": len(out) + len(err),
+        })
+        self._write_state(job_id, state)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        state = self._read_state(job_id)
+        if state["status"] == "in_progress" and time.time() - state["created"] >= self.delay:
+            self._run(job_id, state)
+        return state
+
+    def download(self, file_id: str) -> str:
+        with open(os.path.join(self.directory, file_id), "r", encoding="utf-8") as f:
+            return f.read()
+
+
+def get_backend(name: str = DEFAULT_BACKEND, **kwargs):
+    if name == "local":
+        return LocalBatchBackend(**kwargs)
+    if name == "openai":
+        return OpenAIBatchBackend(**kwargs)
+    raise ValueError(f"Okänd batch-backend: {name}")
+
+
+# --------- Tillstånd + flöde ---------
+class BatchRunner:
+    """Ett jobb per fas; tillståndet (jobb-id, metadata per custom_id) sparas i en JSON-fil."""
+
+    def __init__(self, state_path: str, backend, poll_seconds: float = POLL_SECONDS):
+        self.state_path = state_path
+        self.backend = backend
+        self.poll_seconds = poll_seconds
+        self.state: Dict[str, Any] = {"phases": {}}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _save(self):
+        d = os.path.dirname(self.state_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def phase(self, name: str) -> Dict[str, Any]:
+        return self.state["phases"].get(name, {})
+
+    def meta(self, name: str) -> Dict[str, Any]:
+        """custom_id -> metadata som skickades med (t.ex. [källspråk, målspråk, text])."""
+        return self.phase(name).get("meta", {})
+
+    def submit(self, name: str, requests: Dict[str, Dict[str, Any]], model: str, **body) -> str:
+        path = os.path.join(os.path.dirname(self.state_path) or ".", f"{os.path.basename(self.state_path)}.{name}.jsonl")
+        n = write_jsonl(path, (request_line(cid, r["messages"], model, **body) for cid, r in requests.items()))
+        job_id = self.backend.submit(path, metadata={"phase": name})
+        self.state["phases"][name] = {
+            "job_id": job_id,
+            "backend": self.backend.name,
+            "input": path,
+            "submitted_at": time.time(),
+            "requests": n,
+            "meta": {cid: r.get("meta") for cid, r in requests.items()},
+        }
+        self._save()
+        print(f"📤 Fas {name}: {n} förfrågningar skickade som batchjobb {job_id} ({self.backend.name})")
+        return job_id
+
+    def poll(self, name: str, wait: bool = False) -> Optional[Dict[str, Any]]:
+        """Status för fasens jobb; med wait pollas tills jobbet är klart. None = kör fortfarande."""
+        job = self.phase(name)
+        while True:
+            st = self.backend.status(job["job_id"])
+            if st["status"] in FINAL_STATES:
+                return st
+            print(f"⏳ Fas {name}: {st['status']} ({st.get('completed', 0)}/{st.get('total', 0) or job['requests']})")
+            if not wait:
+                return None
+            time.sleep(self.poll_seconds)
+
+    def collect(self, name: str, st: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        results: Dict[str, Optional[str]] = {}
+        for key in ("output_file_id", "error_file_id"):
+            if st.get(key):
+                for cid, content in parse_output(self.backend.download(st[key])).items():
+                    if content is not None or cid not in results:
+                        results[cid] = content
+        for cid in self.meta(name):
+            results.setdefault(cid, None)
+        return results
+
+    def step(self, name: str, requests: Dict[str, Dict[str, Any]], model: str, wait: bool = False, **body) -> Optional[Dict[str, Optional[str]]]:
+        """Skickar, pollar och hämtar en fas.
+
+        requests: custom_id -> {"messages": [...], "meta": ...} som fortfarande saknar resultat.
+        Returnerar {custom_id: text eller None} när fasens jobb är klart; None om det kör (eller nyss skickades).
+        Tomt requests → {} (inget att göra).
+        Anroparen kör mark_collected(name) när resultaten är sparade – till dess hämtas samma jobb igen.
+        """
+        if not requests:
+            return {}
+        job = self.phase(name)
+        if not job or job.get("collected"):
+            self.submit(name, requests, model, **body)
+            if not wait:
+                return None
+        st = self.poll(name, wait=wait)
+        if st is None:
+            return None
+        results = self.collect(name, st)
+        ok = sum(1 for v in results.values() if v is not None)
+        print(f"📥 Fas {name}: jobbet {st['status']} – {ok}/{len(results)} svar")
+        return results
+
+    def mark_collected(self, name: str):
+        """Fasens jobb är hämtat och sparat; nästa step skickar ett nytt jobb för det som saknas."""
+        self.state["phases"][name]["collected"] = True
+        self._save()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_packer.py
+---------------
+Packar poster i LLM-anrop efter tokenbudget i stället för fast BATCH_SIZE.
+- estimate_tokens(): tiktoken om det finns installerat, annars ≈ tecken/3.5
+- pack_batches(): fyller varje anrop upp till in-/utbudget (och max antal poster)
+- Korta keywords åker många per anrop, långa svar får egna anrop
+
+Budget via env: PACK_MAX_INPUT_TOKENS (6000), PACK_MAX_OUTPUT_TOKENS (4000),
+PACK_MAX_ITEMS (200), PACK_OUTPUT_RATIO (1.3 – översättningar blir ofta längre),
+PACK_SOLO_TOKENS (400 – poster större än så får alltid ett eget anrop).
+"""
+
+import os
+import math
+from typing import List, Optional, Sequence
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None
+
+MAX_INPUT_TOKENS = int(os.getenv("PACK_MAX_INPUT_TOKENS", "6000"))
+MAX_OUTPUT_TOKENS = int(os.getenv("PACK_MAX_OUTPUT_TOKENS", "4000"))
+MAX_ITEMS = int(os.getenv("PACK_MAX_ITEMS", "200"))
+OUTPUT_RATIO = float(os.getenv("PACK_OUTPUT_RATIO", "1.3"))
+SOLO_TOKENS = int(os.getenv("PACK_SOLO_TOKENS", "400"))
+ITEM_OVERHEAD = 8  # "id": "...", citattecken och komman i JSON
+
+_encoders = {}
+
+
+def estimate_tokens(text: str, model: str = "gpt-4o") -> int:
+    text = text or ""
+    if tiktoken is not None:
+        enc = _encoders.get(model)
+        if enc is None:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except Exception:
+                enc = tiktoken.get_encoding("o200k_base")
+            _encoders[model] = enc
+        return len(enc.encode(text))
+    return max(1, math.ceil(len(text) / 3.5))
+
+def pack_batches(
+    texts: Sequence[str],
+    max_input_tokens: Optional[int] = None,
+    max_output_tokens: Optional[int] = None,
+    max_items: Optional[int] = None,
+    output_ratio: Optional[float] = None,
+    solo_tokens: Optional[int] = None,
+    model: str = "gpt-4o",
+) -> List[List[int]]:
+    """Returnerar index-grupper; varje grupp ryms i ett anrop.
+
+    Posterna sorteras efter storlek (kortast först) så att korta åker tillsammans;
+    resultaten ska alltså sättas ihop via index, inte via position i gruppen.
+    Långa poster (> solo_tokens) och poster som ensamma spränger budgeten får egna grupper.
+    """
+    max_in = max_input_tokens or MAX_INPUT_TOKENS
+    max_out = max_output_tokens or MAX_OUTPUT_TOKENS
+    max_n = max_items or MAX_ITEMS
+    ratio = output_ratio or OUTPUT_RATIO
+    solo = solo_tokens or SOLO_TOKENS
+
+    sizes = [estimate_tokens(t, model) + ITEM_OVERHEAD for t in texts]
+    order = sorted(range(len(texts)), key=lambda i: sizes[i])
+
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    cur_in = 0
+    for i in order:
+        size_in = sizes[i]
+        if size_in > solo:
+            batches.append([i])
+            continue
+        size_out = math.ceil(size_in * ratio)
+        cur_out = math.ceil(cur_in * ratio)
+        if cur and (len(cur) >= max_n or cur_in + size_in > max_in or cur_out + size_out > max_out):
+            batches.append(cur)
+            cur, cur_in = [], 0
+        cur.append(i)
+        cur_in += size_in
+    if cur:
+        batches.append(cur)
+    return batches
+
+def output_budget(texts: Sequence[str], output_ratio: Optional[float] = None, model: str = "gpt-4o") -> int:
+    """max_tokens för ett anrop med dessa poster (med marginal för JSON-omslaget)."""
+    ratio = output_ratio or OUTPUT_RATIO
+    est = sum(estimate_tokens(t, model) + ITEM_OVERHEAD for t in texts)
+    return math.ceil(est * ratio) + 64
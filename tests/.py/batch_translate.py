@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_translate.py
+------------------
+Batchanrop med id-taggade poster och JSON-svar (ersätter "en rad per ord").
+- Posterna skickas som {"<id>": "<text>"}; svaret måste vara {"items": {"<id>": "<resultat>"}}
+- Saknade eller ogiltiga id:n skickas om – bara de – högst BATCH_RETRY_ROUNDS varv
+- Ingen tyst utfyllnad: poster som aldrig kom tillbaka returneras som None
+- *_packed: posterna delas upp efter tokenbudget (batch_packer.py) och körs parallellt
+- translate_fields: alla fält i en FAQ-rad (fältnamn som id) i ett anrop i stället för ett per fält
+- translate_multi: samma fält till flera målspråk i ett anrop; varje språk kontrolleras för sig
+  (giltig sträng + lang_verifier) och bara det som underkänns blir None → enskilda anrop hos anroparen
+
+Exempel:
+    engine = TranslateEngine(model="gpt-4o")
+    en = asyncio.run(translate_list(engine, ["alger", "fog"], "Swedish", "English"))
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from batch_packer import output_budget, pack_batches
+from lang_verifier import get_verifier
+from llm_telemetry import tagged
+
+BATCH_RETRY_ROUNDS = int(os.getenv("BATCH_RETRY_ROUNDS", "3"))
+
+log = logging.getLogger("batch_translate")
+
+SYSTEM_PROMPT = (
+    "You process a JSON object of items keyed by id. "
+    'Respond ONLY with a JSON object of the form {"items": {"<id>": "<result>"}} '
+    "containing exactly one string result for every id you were given. "
+    "Never merge, split, skip or renumber ids."
+)
+
+
+MULTI_SYSTEM_PROMPT = (
+    "You process a JSON object of items keyed by id and translate it into several languages at once. "
+    'Respond ONLY with a JSON object of the form {"translations": {"<language code>": {"<id>": "<result>"}}} '
+    "containing every requested language code and, for each of them, exactly one string result for every id. "
+    "Never merge, split, skip or renumber ids."
+)
+
+
+def build_messages(items: Dict[str, str], instructions: str) -> List[Dict[str, str]]:
+    payload = json.dumps(items, ensure_ascii=False)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{instructions}\n\nItems:\n{payload}"},
+    ]
+
+def parse_response(raw: str, expected_ids: Sequence[str]) -> Dict[str, str]:
+    """Plockar ut giltiga svar: känt id, icke-tom sträng. Allt annat räknas som saknat."""
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return {}
+    if isinstance(data, dict) and isinstance(data.get("items"), dict):
+        data = data["items"]
+    if not isinstance(data, dict):
+        return {}
+    wanted = set(expected_ids)
+    out = {}
+    for k, v in data.items():
+        k = str(k).strip()
+        if k in wanted and isinstance(v, str) and v.strip():
+            out[k] = v.strip()
+    return out
+
+async def batch_complete(
+    engine,
+    items: Dict[str, str],
+    instructions: str,
+    model: Optional[str] = None,
+    rounds: int = BATCH_RETRY_ROUNDS,
+    **kwargs,
+) -> Dict[str, Optional[str]]:
+    """Kör items genom modellen; id:n som saknas efter alla varv får None."""
+    results: Dict[str, Optional[str]] = {}
+    pending = dict(items)
+    for attempt in range(max(1, rounds)):
+        if not pending:
+            break
+        try:
+            raw = await engine.complete(
+                build_messages(pending, instructions),
+                model=model,
+                temperature=0,
+                response_format={"type": "json_object"},
+                **kwargs,
+            )
+        except Exception as e:
+            log.warning(f"⚠️ Batch ({len(pending)} poster) misslyckades: {e}")
+            continue
+        got = parse_response(raw, list(pending))
+        results.update(got)
+        pending = {k: v for k, v in pending.items() if k not in got}
+        if pending:
+            log.info(f"↻ Varv {attempt+1}: {len(got)} ok, {len(pending)} saknas → skickar om bara dem")
+    for k in pending:
+        results[k] = None
+    if pending:
+        log.warning(f"❌ {len(pending)} poster saknas efter {rounds} varv: {list(pending)[:10]}")
+    return results
+
+async def batch_complete_list(engine, texts: Sequence[str], instructions: str, **kwargs) -> List[Optional[str]]:
+    """Som batch_complete men för en lista; resultaten ligger i samma ordning som texts."""
+    items = {str(i + 1): t for i, t in enumerate(texts)}
+    res = await batch_complete(engine, items, instructions, **kwargs)
+    return [res[str(i + 1)] for i in range(len(texts))]
+
+async def batch_complete_packed(
+    engine,
+    texts: Sequence[str],
+    instructions: str,
+    model: Optional[str] = None,
+    budget: Optional[Dict[str, int]] = None,
+    **kwargs,
+) -> List[Optional[str]]:
+    """Packar texts efter tokenbudget, kör grupperna parallellt och returnerar i ordning.
+
+    budget: nycklar till pack_batches (max_input_tokens, max_output_tokens, max_items, output_ratio)
+    """
+    budget = budget or {}
+    groups = pack_batches(texts, model=model or getattr(engine, "model", "gpt-4o"), **budget)
+    log.info(f"📦 {len(texts)} poster → {len(groups)} anrop")
+
+    async def run(group):
+        items = {str(i + 1): texts[i] for i in group}
+        max_tokens = output_budget([texts[i] for i in group], budget.get("output_ratio"))
+        return await batch_complete(engine, items, instructions, model=model, max_tokens=max_tokens, **kwargs)
+
+    merged: Dict[str, Optional[str]] = {}
+    for res in await asyncio.gather(*(run(g) for g in groups)):
+        merged.update(res)
+    return [merged[str(i + 1)] for i in range(len(texts))]
+
+def translation_instructions(src_lang: str, tgt_lang: str, extra: str = "") -> str:
+    text = (
+        f"Translate every item from {src_lang} to {tgt_lang}. "
+        "Keep series names, colors, formats and units unchanged."
+    )
+    return f"{text} {extra}".strip()
+
+async def translate_list(engine, texts: Sequence[str], src_lang: str, tgt_lang: str, extra: str = "", **kwargs) -> List[Optional[str]]:
+    """Översätter en lista (tokenpackad) – resultaten i samma ordning, None för saknade."""
+    with tagged(stage=f"{src_lang}→{tgt_lang} batch", lang=tgt_lang):
+        return await batch_complete_packed(engine, texts, translation_instructions(src_lang, tgt_lang, extra), **kwargs)
+
+def row_instructions(src_lang: str, tgt_lang: str, extra: str = "") -> str:
+    text = (
+        f"The items are the fields of one FAQ entry (question, short answer, full answer). "
+        f"Translate every item from {src_lang} to {tgt_lang} and use the same terminology in all of them. "
+        "Keep series names, colors, formats and units unchanged."
+    )
+    return f"{text} {extra}".strip()
+
+async def translate_fields(engine, fields: Dict[str, str], src_lang: str, tgt_lang: str, extra: str = "",
+                           rounds: int = 1, **kwargs) -> Dict[str, Optional[str]]:
+    """Alla fält i en rad i ett strukturerat anrop; fält som saknas i svaret blir None (anroparen faller tillbaka per fält)."""
+    with tagged(stage=f"{src_lang}→{tgt_lang} rad", lang=tgt_lang):
+        return await batch_complete(engine, fields, row_instructions(src_lang, tgt_lang, extra), rounds=rounds, **kwargs)
+
+def multi_instructions(src_lang: str, targets: Dict[str, str], extra: str = "") -> str:
+    langs = ", ".join(f"{code} ({name})" for code, name in targets.items())
+    text = (
+        f"Translate every item from {src_lang} into each target language. "
+        "Keep series names, colors, formats and units unchanged."
+    )
+    return f"{text} {extra}".strip() + f"\nTarget languages: {langs}"
+
+def parse_multi_response(raw: str, codes: Sequence[str], expected_ids: Sequence[str]) -> Dict[str, Dict[str, str]]:
+    """{språkkod: {id: text}} med bara giltiga svar; ett trasigt språk påverkar inte de andra."""
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return {}
+    if isinstance(data, dict) and isinstance(data.get("translations"), dict):
+        data = data["translations"]
+    if not isinstance(data, dict):
+        return {}
+    by_code = {str(k).strip().upper(): v for k, v in data.items()}
+    return {code: parse_response(json.dumps(by_code[code]), expected_ids) for code in codes if code in by_code}
+
+async def translate_multi(engine, fields: Dict[str, str], src_lang: str, targets: Dict[str, str], source: str = "SE",
+                          extra: str = "", verifier=None, **kwargs) -> Dict[str, Dict[str, Optional[str]]]:
+    """Alla fält till alla mål (kod → språknamn) i ett anrop → {kod: {id: text eller None}}.
+
+    Varje språk valideras för sig; None betyder saknat, ogiltigt eller fortfarande på källspråket.
+    """
+    verifier = verifier or get_verifier()
+    out: Dict[str, Dict[str, Optional[str]]] = {code: {k: None for k in fields} for code in targets}
+    payload = json.dumps(fields, ensure_ascii=False)
+    messages = [
+        {"role": "system", "content": MULTI_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{multi_instructions(src_lang, targets, extra)}\n\nItems:\n{payload}"},
+    ]
+    with tagged(stage=f"{source}→{'+'.join(targets)}", lang="+".join(targets)):
+        try:
+            raw = await engine.complete(messages, temperature=0, response_format={"type": "json_object"}, **kwargs)
+        except Exception as e:
+            log.warning(f"⚠️ Flerspråksanrop ({len(fields)} fält → {', '.join(targets)}) misslyckades: {e}")
+            return out
+    for code, got in parse_multi_response(raw, list(targets), list(fields)).items():
+        for k, text in got.items():
+            if verifier.needs_retry(text, code, source):
+                log.info(f"⚠️ {code}/{k}: svaret är kvar på {source} – tas om separat")
+                continue
+            out[code][k] = text
+    return out
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cache_keys.py
+-------------
+Gemensam nyckelbyggare för översättningscachen.
+- canonical_text(): NFC, LF-radbrytningar, "\\n"-escapes, ‹KEEP›-markörer och
+  extra blanksteg normaliseras bort så att samma text alltid får samma nyckel
+- lang_code(): "English" / "en" / "Engelska" → "EN"
+- canonical_key(): (källspråk, målspråk, modell, promptversion, texthash)
+- parse_legacy_key(): läser de tre gamla nyckelformaten
+    "EN::<text>"            (translate_faq_sheets_*)
+    "EN::Q::<text>"         (translate_faq_sheets_* (1), faq-extended/.cache_faq_translate.json)
+    "<text>::English"       (translate_faq_local_se_to_en_da_de.py)
+"""
+
+import re
+import hashlib
+import unicodedata
+from typing import Callable, Optional, Tuple
+
+KEEP_MARKERS = ("‹KEEP›", "‹/KEEP›")
+
+LANG_ALIASES = {
+    "SE": ["se", "sv", "swedish", "svenska"],
+    "EN": ["en", "english", "engelska"],
+    "DA": ["da", "dk", "danish", "danska", "dansk"],
+    "DE": ["de", "german", "tyska", "deutsch"],
+}
+_LANG_LOOKUP = {alias: code for code, aliases in LANG_ALIASES.items() for alias in aliases}
+
+_WS_RX = re.compile(r"[ \t ]+")
+
+
+def lang_code(lang: str) -> Optional[str]:
+    return _LANG_LOOKUP.get((lang or "").strip().lower())
+
+def strip_keep_markers(text: str) -> str:
+    for m in KEEP_MARKERS:
+        text = text.replace(m, "")
+    return text
+
+def canonical_text(text: str) -> str:
+    """Kanonisk form av en källtext (för nycklar, inte för visning)."""
+    text = unicodedata.normalize("NFC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\\n", "\n")
+    text = strip_keep_markers(text)
+    lines = [_WS_RX.sub(" ", line).strip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(canonical_text(text).encode("utf-8")).hexdigest()
+
+def canonical_key(text: str, src_lang: str, tgt_lang: str, model: str, prompt_version: str) -> str:
+    src = lang_code(src_lang) or src_lang
+    tgt = lang_code(tgt_lang) or tgt_lang
+    return f"{src}|{tgt}|{model}|{prompt_version}|{text_hash(text)}"
+
+
+# --------- Gamla nyckelformat ---------
+def parse_legacy_key(key: str) -> Optional[Tuple[str, str, str]]:
+    """Gammal cachenyckel → (målspråk, fält, text). fält är "Q"/"A" eller "" om okänt."""
+    head, sep, rest = key.partition("::")
+    if sep and lang_code(head) and len(head) == 2:
+        field, sep2, text = rest.partition("::")
+        if sep2 and field in ("Q", "A"):
+            return lang_code(head), field, text
+        return lang_code(head), "", rest
+    text, sep, tail = key.rpartition("::")
+    if sep and lang_code(tail):
+        return lang_code(tail), "", text
+    return None
+
+def legacy_key_parser(source_lang: str = "SE", pivot: bool = False) -> Callable[[str], Optional[Tuple[str, str, str]]]:
+    """Parser för TranslationMemory.import_json.
+
+    pivot=True: DA/DE översattes från EN-output (translate_faq_sheets_*_UPDATED/_CLEAN).
+    """
+    def parse(key: str):
+        parsed = parse_legacy_key(key)
+        if not parsed:
+            return None
+        tgt, _field, text = parsed
+        src = "EN" if (pivot and tgt != "EN") else source_lang
+        return src, tgt, text
+    return parse
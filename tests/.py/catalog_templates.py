@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+catalog_templates.py
+--------------------
+Katalogsvar (färger/format per serie) renderas från mallar på alla fyra språk – inga API-anrop.
+- Mallar per språk för frågor, färglistor och "Tillgängliga format"-rader (FORMAT_LABEL)
+- render_catalog_answer(): bygger svaret direkt från facit (valid_formats_by_series.series.json);
+  formatraden skrivs alltid, även tom ("Tillgängliga format: ") som i tidigare svar
+- render_text(): känner igen en text som följer mallarna på källspråket och renderar den på målspråket
+- Serienamn, färgnamn och format lämnas orörda; generiska färgord (Grå, Vit, Övrigt …) slås upp i COLOR_WORDS
+
+Texter som inte följer mallarna exakt (t.ex. avkortade "… Vill du se fler?") ger None → vanlig översättning.
+
+Rapport på en korpus:
+    python tests/.py/catalog_templates.py --corpus faq-extended/faq_colors_from_pronto_se_v2.json
+"""
+
+import re
+import json
+from typing import Dict, List, Optional, Tuple
+
+FACIT_FILE = "faq-extended/valid_formats_by_series.series.json"
+LANGS = ["SE", "EN", "DA", "DE"]
+
+FORMAT_LABEL = {"SE": "Tillgängliga format", "EN": "Available formats", "DA": "Tilgængelige formater", "DE": "Verfügbare Formate"}
+
+# Mallar per rad; {fält} fylls i, allt annat måste stämma tecken för tecken
+TEMPLATES = {
+    "SE": {
+        "q_colors": "Vilka färger finns i serien {serie}?",
+        "q_formats": "Vilka format finns i serien {serie}?",
+        "colors_inline": "Följande färger finns i serien {serie}: {colors}",
+        "colors_header": "Följande färger finns i {serie}:",
+        "formats_header": "Följande format finns i {serie}:",
+        "color_formats": "- {color} ({tone}) – format: {formats}",
+        "color_formats_plain": "- {color} – format: {formats}",
+        "color": "- {color} ({tone})",
+        "color_plain": "- {color}",
+        "formats": FORMAT_LABEL["SE"] + ": {formats}",
+        "formats_none": FORMAT_LABEL["SE"] + ":",   # serie utan format i facit
+    },
+    "EN": {
+        "q_colors": "What colors are available in the {serie} series?",
+        "q_formats": "What formats are available in the {serie} series?",
+        "colors_inline": "The following colors are available in the {serie} series: {colors}",
+        "colors_header": "The following colors are available in {serie}:",
+        "formats_header": "The following formats are available in {serie}:",
+        "color_formats": "- {color} ({tone}) – format: {formats}",
+        "color_formats_plain": "- {color} – format: {formats}",
+        "color": "- {color} ({tone})",
+        "color_plain": "- {color}",
+        "formats": FORMAT_LABEL["EN"] + ": {formats}",
+        "formats_none": FORMAT_LABEL["EN"] + ":",   # serie utan format i facit
+    },
+    "DA": {
+        "q_colors": "Hvilke farver findes i serien {serie}?",
+        "q_formats": "Hvilke formater findes i serien {serie}?",
+        "colors_inline": "Følgende farver findes i serien {serie}: {colors}",
+        "colors_header": "Følgende farver findes i {serie}:",
+        "formats_header": "Følgende formater findes i {serie}:",
+        "color_formats": "- {color} ({tone}) – format: {formats}",
+        "color_formats_plain": "- {color} – format: {formats}",
+        "color": "- {color} ({tone})",
+        "color_plain": "- {color}",
+        "formats": FORMAT_LABEL["DA"] + ": {formats}",
+        "formats_none": FORMAT_LABEL["DA"] + ":",   # serie utan format i facit
+    },
+    "DE": {
+        "q_colors": "Welche Farben gibt es in der Serie {serie}?",
+        "q_formats": "Welche Formate gibt es in der Serie {serie}?",
+        "colors_inline": "Folgende Farben gibt es in der Serie {serie}: {colors}",
+        "colors_header": "Die folgenden Farben sind in {serie} erhältlich:",
+        "formats_header": "Die folgenden Formate sind in {serie} erhältlich:",
+        "color_formats": "- {color} ({tone}) – Format: {formats}",
+        "color_formats_plain": "- {color} – Format: {formats}",
+        "color": "- {color} ({tone})",
+        "color_plain": "- {color}",
+        "formats": FORMAT_LABEL["DE"] + ": {formats}",
+        "formats_none": FORMAT_LABEL["DE"] + ":",   # serie utan format i facit
+    },
+}
+
+# Generiska färgord (facit och Pronto blandar dem med produktnamn som Etna/Bocote)
+COLOR_WORDS = {
+    "Övrigt": {"EN": "Other", "DA": "Andet", "DE": "Sonstiges"},
+    "Vit": {"EN": "White", "DA": "Hvid", "DE": "Weiß"},
+    "Svart": {"EN": "Black", "DA": "Sort", "DE": "Schwarz"},
+    "Grå": {"EN": "Grey", "DA": "Grå", "DE": "Grau"},
+    "Ljusgrå": {"EN": "Light grey", "DA": "Lysegrå", "DE": "Hellgrau"},
+    "Mörkgrå": {"EN": "Dark grey", "DA": "Mørkegrå", "DE": "Dunkelgrau"},
+    "Antracitgrå": {"EN": "Anthracite", "DA": "Antracitgrå", "DE": "Anthrazitgrau"},
+    "Brun": {"EN": "Brown", "DA": "Brun", "DE": "Braun"},
+    "Beige": {"EN": "Beige", "DA": "Beige", "DE": "Beige"},
+}
+
+# Vad varje fält får innehålla när en text tolkas
+_FIELD_RX = {
+    "serie": r"[^:?\n]+?",
+    "colors": r"[^\n…:]+",
+    "color": r"[^()\n–:]+?",
+    "tone": r"[^()\n]+?",
+    "formats": r"\d[\dxX,.\s]*(?:cm)?(?:,\s*\d[\dxX,.\s]*(?:cm)?)*",
+}
+_FIELD_NAME_RX = re.compile(r"\{(\w+)\}")
+_patterns: Dict[str, List[Tuple[str, "re.Pattern"]]] = {}
+
+
+# --------- Ordlista ---------
+def translate_word(word: str, src: str, tgt: str) -> str:
+    """Generiskt färgord src → tgt; produktnamn lämnas orörda."""
+    if src == tgt:
+        return word
+    se = word
+    if src != "SE":
+        se = next((k for k, v in COLOR_WORDS.items() if v.get(src) == word), None)
+        if se is None:
+            return word
+    if tgt == "SE":
+        return se if se in COLOR_WORDS else word
+    return COLOR_WORDS.get(se, {}).get(tgt, word)
+
+def _translate_fields(fields: Dict[str, str], src: str, tgt: str) -> Dict[str, str]:
+    out = dict(fields)
+    for name in ("color", "tone"):
+        if name in out:
+            out[name] = translate_word(out[name], src, tgt)
+    if "colors" in out:
+        out["colors"] = ", ".join(translate_word(c.strip(), src, tgt) for c in out["colors"].split(","))
+    return out
+
+
+# --------- Tolkning & rendering ---------
+def _compile(lang: str):
+    if lang not in _patterns:
+        compiled = []
+        for kind, tpl in TEMPLATES[lang].items():
+            rx = ""
+            pos = 0
+            for m in _FIELD_NAME_RX.finditer(tpl):
+                rx += re.escape(tpl[pos:m.start()]) + f"(?P<{m.group(1)}>{_FIELD_RX[m.group(1)]})"
+                pos = m.end()
+            rx += re.escape(tpl[pos:])
+            compiled.append((kind, re.compile(rx + r"\Z")))
+        _patterns[lang] = compiled
+    return _patterns[lang]
+
+def parse_text(text: str, lang: str = "SE") -> Optional[List[Tuple[str, Dict[str, str]]]]:
+    """[(malltyp, fält)] per rad, eller None om någon rad inte följer mallarna."""
+    if not isinstance(text, str) or not text.strip() or lang not in TEMPLATES:
+        return None
+    parsed = []
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        for kind, rx in _compile(lang):
+            m = rx.match(line)
+            if m:
+                parsed.append((kind, m.groupdict()))
+                break
+        else:
+            return None
+    return parsed
+
+def render_lines(parsed, tgt: str, src: str = "SE") -> str:
+    return "\n".join(
+        TEMPLATES[tgt][kind].format(**_translate_fields(fields, src, tgt))
+        for kind, fields in parsed
+    )
+
+def render_text(text: str, tgt: str, src: str = "SE") -> Optional[str]:
+    """Renderar en malltext på målspråket; None om texten inte är ett katalogsvar."""
+    parsed = parse_text(text, src)
+    if parsed is None:
+        return None
+    lines = text.strip().split("\n")
+    # Exakt rundtur på källspråket, annars riskerar vi att tappa innehåll
+    if render_lines(parsed, src, src) != "\n".join(l.strip() for l in lines):
+        return None
+    # Indrag från källan behålls rad för rad
+    indents = [l[:len(l) - len(l.lstrip())] for l in lines]
+    return "\n".join(i + l for i, l in zip(indents, render_lines(parsed, tgt, src).split("\n")))
+
+
+# --------- Från facit ---------
+def load_facit(path: str = FACIT_FILE) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def render_catalog_question(serie: str, lang: str = "SE", kind: str = "q_colors") -> str:
+    return TEMPLATES[lang][kind].format(serie=serie)
+
+def render_catalog_answer(serie: str, lang: str, facit: dict) -> Optional[str]:
+    """Färger + format för serien, direkt från facit.
+
+    Formatraden finns alltid med (tom när facit saknar format), precis som svaren som redan ligger i FAQ_SE.
+    """
+    info = facit.get(serie)
+    if not info:
+        return None
+    return render_lines([
+        ("colors_inline", {"serie": serie, "colors": ", ".join(info.get("colors", []))}),
+        ("formats", {"formats": ", ".join(info.get("formats", []))}),
+    ], lang)
+
+
+# --------- Rapport ---------
+def main():
+    import time
+    import argparse
+    from migrate_translation_caches import load_rows
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="faq-extended/faq_colors_from_pronto_se_v2.json")
+    parser.add_argument("--facit", default=FACIT_FILE)
+    args = parser.parse_args()
+
+    rows = load_rows(args.corpus)
+    t0 = time.perf_counter()
+    done = 0
+    total = 0
+    for row in rows:
+        for field in ("question_se", "answer_se", "question", "answer"):
+            text = row.get(field)
+            if not isinstance(text, str) or not text.strip():
+                continue
+            total += 1
+            if all(render_text(text, lang) is not None for lang in ["EN", "DA", "DE"]):
+                done += 1
+    facit = load_facit(args.facit)
+    rendered = [render_catalog_answer(s, lang, facit) for s in facit for lang in LANGS]
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"📊 {args.corpus}: {done}/{total} texter renderade från mallar ({total - done} kvar till LLM)")
+    print(f"📚 {args.facit}: {len(facit)} serier × {len(LANGS)} språk = {len(rendered)} svar")
+    print(f"⏱️ {ms:.1f} ms totalt, 0 API-anrop")
+
+if __name__ == "__main__":
+    main()
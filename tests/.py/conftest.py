@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+conftest.py
+-----------
+Gemensamt för pytest-testerna av Python-skripten (python -m pytest -q från repots rot).
+- Skriptkatalogen först på sys.path – skripten importerar varandra som syskonmoduler
+- MemorySpreadsheet/MemoryWorksheet: ark i minnet i stället för gspread → inga nätverksanrop
+- script_env: miljövariablerna som .env.local annars ger, arbetskatalog = tmp (cache, logg, manifest
+  och SQLite-filer hamnar där) och en Sheets-klient i minnet (MemorySheetsClient)
+- Telemetrin är avstängd i alla tester (inga llm_calls.jsonl i arbetskatalogen)
+"""
+
+import os
+import sys
+from typing import Any, Dict, List
+
+import pytest
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+TEST_ENV = {
+    "SHEET_ID_MAIN": "test-sheet",
+    "GCP_PROJECT_ID": "test-project",
+    "GCP_CLIENT_EMAIL": "test@test-project.iam.gserviceaccount.com",
+    "GCP_PRIVATE_KEY": "test-key",
+    "OPENAI_API_KEY": "test",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",  # ett anrop som ändå görs når aldrig OpenAI
+    "SHEETS_TOKEN_CACHE": "",
+    "TELEMETRY": "0",
+}
+
+# Datafiler som skript läser redan vid import (finns inte i repot)
+IMPORT_DATA = {
+    os.path.join("faq-extended", "valid_formats_by_series.cleaned.json"): "{}",
+}
+
+
+# --------- Sheets i minnet ---------
+class MemoryWorksheet:
+    """Det gspread.Worksheet-API som skripten läser med; skrivningar läggs i calls."""
+
+    def __init__(self, title: str, values: List[List[str]] = None, sheet_id: int = 0):
+        self.title = title
+        self.id = sheet_id
+        self.values = [list(r) for r in values or []]
+        self.row_count, self.col_count = 1000, 26
+        self.calls: List[Any] = []
+
+    def get_all_values(self) -> List[List[str]]:
+        return [list(r) for r in self.values]
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        if not self.values:
+            return []
+        keys = self.values[0]
+        return [dict(zip(keys, list(r) + [""] * (len(keys) - len(r)))) for r in self.values[1:]]
+
+    def col_values(self, col: int) -> List[str]:
+        return [r[col - 1] for r in self.values if col - 1 < len(r)]
+
+    def row_values(self, row: int) -> List[str]:
+        return list(self.values[row - 1]) if row - 1 < len(self.values) else []
+
+    def batch_update(self, data, **kwargs):
+        self.calls.append(("batch_update", data))
+
+    def batch_clear(self, ranges):
+        self.calls.append(("batch_clear", ranges))
+
+    def clear(self):
+        self.calls.append(("clear", None))
+
+    def append_row(self, values, **kwargs):
+        self.calls.append(("append_rows", [list(values)]))
+
+    def append_rows(self, values, **kwargs):
+        self.calls.append(("append_rows", [list(v) for v in values]))
+
+
+class MemorySpreadsheet:
+    """Som sheets_client.LazySpreadsheet, men flikarna finns i minnet (okänd flik = tom flik)."""
+
+    def __init__(self, key: str, tabs: Dict[str, List[List[str]]] = None):
+        self.id = key
+        self.tabs: Dict[str, MemoryWorksheet] = {}
+        self.calls: List[Any] = []
+        for title, values in (tabs or {}).items():
+            self.add_worksheet(title, values)
+
+    def add_worksheet(self, title: str, values: List[List[str]] = None, *args, **kwargs) -> MemoryWorksheet:
+        ws = MemoryWorksheet(title, values, sheet_id=len(self.tabs))
+        ws.spreadsheet = self
+        self.tabs[title] = ws
+        return ws
+
+    def worksheet(self, title: str) -> MemoryWorksheet:
+        return self.tabs.get(title) or self.add_worksheet(title)
+
+    def worksheets(self) -> List[MemoryWorksheet]:
+        return list(self.tabs.values())
+
+    def values_batch_get(self, ranges, params=None):
+        return {"valueRanges": [{"range": r, "values": self.worksheet(r.strip("'")).get_all_values()} for r in ranges]}
+
+    def values_batch_update(self, body):
+        self.calls.append(("values_batch_update", body))
+
+    def batch_update(self, body):
+        self.calls.append(("batch_update", body))
+
+
+class MemorySheetsClient:
+    """Ersätter sheets_client.get_client(): open_spreadsheet() ger ark i minnet."""
+
+    def __init__(self):
+        self.sheets: Dict[str, MemorySpreadsheet] = {}
+
+    def spreadsheet(self, key: str = None) -> MemorySpreadsheet:
+        key = key or os.getenv("SHEET_ID_MAIN")
+        if key not in self.sheets:
+            self.sheets[key] = MemorySpreadsheet(key)
+        return self.sheets[key]
+
+
+# --------- Fixtures ---------
+@pytest.fixture(autouse=True)
+def no_telemetry(monkeypatch):
+    import llm_telemetry
+    monkeypatch.setattr(llm_telemetry, "_default", llm_telemetry.Telemetry(enabled=False))
+
+
+@pytest.fixture
+def script_env(tmp_path, monkeypatch):
+    """Miljö för att importera/köra skripten utan .env.local, gspread-inloggning eller nätverk."""
+    import sheets_client
+    import sheet_mirror
+    from sheet_writer import WRITE_HOOKS
+
+    for key, value in TEST_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(tmp_path)
+    for path, content in IMPORT_DATA.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    client = MemorySheetsClient()
+    monkeypatch.setattr(sheets_client, "_default", client)
+    monkeypatch.setattr(sheet_mirror, "_mirrors", {})
+    hooks = list(WRITE_HOOKS)
+    yield client
+    WRITE_HOOKS[:] = hooks
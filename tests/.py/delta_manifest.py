@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+delta_manifest.py
+-----------------
+Manifest med innehållshash per FAQ_SE-rad → bara ändrade rader översätts och skrivs.
+- Hash per rad på kanoniserad text (cache_keys.canonical_text) för de fält skriptet översätter
+- diff(): nya, ändrade och borttagna rader (position i FAQ_SE = rad i EN/DA/DE-flikarna)
+- Manifestet gäller en namnrymd (modell/promptversion); byts den, eller saknas manifest → full körning
+- write_delta(): skriver bara ändrade rader (en batch_update per flik) och rensar bortklippta rader;
+  full körning synkas cellvis mot fliken (sheet_sync.py) i stället för clear + append
+
+Manifesten sparas i faq-extended/cache/manifests/<skript>.json, ett per skript och kalkylark.
+
+Exempel:
+    manifest = DeltaManifest("faq-sheets-updated", namespace=f"{MODEL}/{PROMPT_VERSION}", sheet_id=SHEET_ID)
+    delta = manifest.diff(rows, ["question_se", "answer_se"])
+    ... översätt [rows[i] for i in delta.todo] ...
+    write_delta(ws, delta, values, header)
+    manifest.commit(rows, ["question_se", "answer_se"])
+"""
+
+import os
+import json
+import hashlib
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from cache_keys import canonical_text
+from sheets_client import col_letter
+
+MANIFEST_DIR = os.path.join("faq-extended", "cache", "manifests")
+
+
+class Delta(namedtuple("Delta", ["added", "changed", "deleted", "unchanged", "full", "old_rows"])):
+    """Radindex (0 = första FAQ-raden); full = skriv om hela fliken."""
+
+    @property
+    def todo(self) -> List[int]:
+        return sorted(self.added + self.changed)
+
+    def describe(self) -> str:
+        if self.full:
+            return f"full körning ({len(self.added)} rader)"
+        return (f"{len(self.added)} nya, {len(self.changed)} ändrade, "
+                f"{len(self.deleted)} borttagna, {len(self.unchanged)} oförändrade")
+
+
+def row_hash(row: Dict, fields: Sequence[str]) -> str:
+    parts = []
+    for f in fields:
+        v = row.get(f, "")
+        parts.append(canonical_text(v if isinstance(v, str) else ("" if v is None else str(v))))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+class DeltaManifest:
+    def __init__(self, name: str, namespace: str, sheet_id: Optional[str] = None, directory: str = MANIFEST_DIR):
+        self.path = os.path.join(directory, f"{name}.json")
+        self.namespace = namespace
+        self.sheet_id = sheet_id or ""
+        self.hashes: List[str] = []
+        self.valid = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Kunde inte läsa manifest {self.path}: {e} – kör allt")
+            return
+        if data.get("namespace") != self.namespace or data.get("sheet_id", "") != self.sheet_id:
+            print(f"ℹ️ Manifestet {self.path} gäller en annan modell/prompt/kalkylark – kör allt")
+            return
+        self.hashes = list(data.get("rows", []))
+        self.valid = True
+
+    def diff(self, rows: Sequence[Dict], fields: Sequence[str], full: bool = False) -> Delta:
+        new = [row_hash(r, fields) for r in rows]
+        old = self.hashes
+        if full or not self.valid:
+            return Delta(list(range(len(new))), [], [], [], True, len(old))
+        added = list(range(len(old), len(new)))
+        changed = [i for i in range(min(len(old), len(new))) if old[i] != new[i]]
+        unchanged = [i for i in range(min(len(old), len(new))) if old[i] == new[i]]
+        deleted = list(range(len(new), len(old)))
+        return Delta(added, changed, deleted, unchanged, False, len(old))
+
+    def commit(self, rows: Sequence[Dict], fields: Sequence[str], pending: Iterable[int] = ()):
+        """Sparar hashar för raderna – anropas först när översättningen är skriven.
+
+        pending: rader som misslyckades; de får tom hash och räknas som ändrade nästa körning.
+        """
+        pending = set(pending)
+        self.hashes = ["" if i in pending else row_hash(r, fields) for i, r in enumerate(rows)]
+        self.valid = True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"namespace": self.namespace, "sheet_id": self.sheet_id, "rows": self.hashes}, f)
+        os.replace(tmp, self.path)
+
+
+def write_delta(ws, delta: Delta, values: Sequence[Optional[List]], header: List[str]):
+    """values[k] hör till delta.todo[k]. Rad 1 = rubrik, FAQ-rad i = kalkylarksrad i+2.
+
+    values[k] = None: raden misslyckades – det som står i fliken behålls (skicka raden som pending till commit).
+    """
+    width = len(header)
+    last = col_letter(width)
+    if delta.full:
+        # Diffsynk i stället för clear + append: bara ändrade celler skrivs och fliken är aldrig tom
+        from sheet_sync import sync_table
+        current = ws.get_all_values()
+        table = [list(header)]
+        for i, v in zip(delta.todo, values):
+            if v is None:
+                v = current[i + 1] if i + 1 < len(current) else []
+            table.append(list(v))
+        sync_table(ws.spreadsheet, ws.title, table, current=current)
+        return
+    data = [
+        {"range": f"A{i + 2}:{last}{i + 2}", "values": [list(v)]}
+        for i, v in zip(delta.todo, values)
+        if v is not None
+    ]
+    if data:
+        ws.batch_update(data)
+    if delta.deleted:
+        ws.batch_clear([f"A{delta.deleted[0] + 2}:{last}{delta.deleted[-1] + 2}"])
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fuzzy_tm.py
+-----------
+Fuzzy-uppslagning i översättningsminnet för nästan identiska källtexter.
+- Index över tecken-trigram (inverterat) → kandidater med Dice-likhet, sedan ordvis likhet (difflib)
+- Träff = tidigare översättning + diff av ändrade ord ("100x100" → "80x80", "?" → ".")
+- patch(): byter ut ändrade tal/format/namn direkt i den gamla översättningen (inga API-anrop)
+  – generiska färgord (Grå, Vit …) slås upp i COLOR_WORDS; tal/format och namn (versal, inte först i
+    meningen) måste finnas ordagrant EN gång; vanliga ord ändras aldrig via patch
+- delta_messages(): om patchen inte går – ett litet redigeringsanrop (gammal översättning + diff) i
+  stället för en helt ny översättning
+- Exakta träffar fungerar som förut (index.get / "in"), så indexet ersätter vanliga dict-cacher
+
+FUZZY_THRESHOLD (0.85) och FUZZY_DELTA_MODEL (gpt-4o-mini) kan sättas i miljön.
+
+Exempel:
+    index = FuzzyIndex.from_memory(TranslationMemory(), "SE", "EN")
+    match = index.lookup("Vilka färger finns för plattor i storlek 80x80 cm 20 mm?")
+    if match:
+        new = match.patch("SE", "EN")  # None → skicka delta_messages(match, "Swedish", "English")
+
+Rapport på en korpus (hur många texter som blir exakta/patchade/delta-anrop/nya):
+    python tests/.py/fuzzy_tm.py --corpus faq-extended/faq_from_tiles_se.json
+"""
+
+import os
+import re
+import difflib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache_keys import canonical_text
+from catalog_templates import COLOR_WORDS, translate_word
+
+THRESHOLD = float(os.getenv("FUZZY_THRESHOLD", "0.85"))
+DELTA_MODEL = os.getenv("FUZZY_DELTA_MODEL", "gpt-4o-mini")
+NGRAM = 3
+MAX_CANDIDATES = 20
+
+# Format/tal hålls ihop ("100x100", "37.5"), ord, enskilda skiljetecken
+_TOKEN_RX = re.compile(r"\d+(?:[.,]\d+)*(?:\s?[x×]\s?\d+(?:[.,]\d+)*)*|[^\W\d_]+|[^\w\s]")
+_ALPHA_RX = re.compile(r"[^\W\d_]{2,}")
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    return [(m.group(0), m.start(), m.end()) for m in _TOKEN_RX.finditer(text)]
+
+def ngrams(text: str, n: int = NGRAM) -> Counter:
+    t = f" {canonical_text(text).lower()} "
+    return Counter(t[i:i+n] for i in range(max(1, len(t) - n + 1)))
+
+
+@dataclass
+class FuzzyMatch:
+    text: str                    # ny källtext
+    source: str                  # tidigare källtext
+    translation: str             # tidigare översättning
+    score: float                 # ordvis likhet 0–1
+    changes: List[Tuple[str, str, str]] = field(default_factory=list)  # (op, gammalt, nytt)
+
+    def describe(self) -> str:
+        return "; ".join(f"'{old}' → '{new}'" for _, old, new in self.changes)
+
+    def patch(self, src: str, tgt: str) -> Optional[str]:
+        """Den gamla översättningen med ändringarna inlagda, eller None om någon ändring inte går att placera."""
+        edits = []  # (start, slut, ersättning) i translation
+        for k, (op, old, new) in enumerate(self.changes):
+            if op == "replace":
+                hit = self._locate(old, new, src, tgt)
+                if hit is None:
+                    return None
+                edits.append(hit)
+            elif _is_punct(old + new) and k == len(self.changes) - 1 and self._at_end(op, old, new):
+                t = self.translation.rstrip()
+                if op == "delete":
+                    if not t.endswith(old):
+                        return None
+                    edits.append((len(t) - len(old), len(t), ""))
+                else:
+                    edits.append((len(t), len(t), new))
+            else:
+                return None
+        edits.sort()
+        if any(a[1] > b[0] for a, b in zip(edits, edits[1:])):
+            return None
+        out, pos = [], 0
+        for start, end, repl in edits:
+            out.append(self.translation[pos:start])
+            out.append(repl)
+            pos = end
+        out.append(self.translation[pos:])
+        return "".join(out)
+
+    def _locate(self, old: str, new: str, src: str, tgt: str) -> Optional[Tuple[int, int, str]]:
+        candidates = []
+        if src != tgt and (old in COLOR_WORDS or new in COLOR_WORDS):
+            candidates.append((translate_word(old, src, tgt), translate_word(new, src, tgt)))
+        elif src == tgt or self._is_name(old, new):
+            candidates.append((old, new))
+        for o, n in candidates:
+            rx = (r"(?<!\w)" if o[:1].isalnum() else "") + re.escape(o) + (r"(?!\w)" if o[-1:].isalnum() else "")
+            spans = [m.span() for m in re.finditer(rx, self.translation)]
+            if len(spans) == 1:
+                return spans[0][0], spans[0][1], n
+        return None
+
+    def _is_name(self, old: str, new: str) -> bool:
+        """Tal/format och egennamn överlever översättningen; vanliga ord ("i" → "på") gör det inte."""
+        if not _ALPHA_RX.search(old + new):
+            return True
+        if not (old[:1].isupper() and new[:1].isupper()):
+            return False
+        # Versal först i meningen säger ingenting
+        before = self.source[:self.source.find(old)].rstrip()
+        return bool(before) and not before.endswith((".", "!", "?", ":"))
+
+    def _at_end(self, op: str, old: str, new: str) -> bool:
+        # Bara avslutande skiljetecken är säkra att lägga till/ta bort
+        if op == "delete":
+            return self.source.rstrip().endswith(old)
+        return self.text.rstrip().endswith(new)
+
+
+def _is_punct(s: str) -> bool:
+    return bool(s) and all(not c.isalnum() and not c.isspace() for c in s)
+
+
+class FuzzyIndex:
+    """Exakt dict + trigramindex över (källtext → översättning)."""
+
+    def __init__(self, threshold: float = THRESHOLD, n: int = NGRAM):
+        self.threshold = threshold
+        self.n = n
+        self.exact: Dict[str, str] = {}
+        self.sources: List[str] = []
+        self.grams: List[Counter] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+    @classmethod
+    def from_memory(cls, tm, src: str, tgt: str, model: Optional[str] = None,
+                    prompt_version: Optional[str] = None, **kwargs) -> "FuzzyIndex":
+        index = cls(**kwargs)
+        for source, translation in tm.entries(src, tgt, model, prompt_version):
+            index.add(source, translation)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.exact
+
+    def __getitem__(self, text: str) -> str:
+        return self.exact[text]
+
+    def __setitem__(self, text: str, translation: str):
+        self.add(text, translation)
+
+    def get(self, text: str, default=None):
+        return self.exact.get(text, default)
+
+    def add(self, source: str, translation: str):
+        if not isinstance(source, str) or not source.strip() or not translation:
+            return
+        if source not in self.exact:
+            grams = ngrams(source, self.n)
+            k = len(self.sources)
+            self.sources.append(source)
+            self.grams.append(grams)
+            for g in grams:
+                self.postings[g].append(k)
+        self.exact[source] = translation
+
+    def update(self, pairs: Iterable[Tuple[str, str]]):
+        for source, translation in pairs:
+            self.add(source, translation)
+
+    # --------- Uppslagning ---------
+    def candidates(self, text: str, threshold: Optional[float] = None) -> List[Tuple[float, int]]:
+        """(Dice-likhet på trigram, index) för källtexter som kan vara över tröskeln, bäst först."""
+        threshold = self.threshold if threshold is None else threshold
+        grams = ngrams(text, self.n)
+        size = sum(grams.values())
+        shared: Counter = Counter()
+        for g, c in grams.items():
+            for k in self.postings.get(g, ()):
+                shared[k] += min(c, self.grams[k][g])
+        # Dice kan inte nå tröskeln om längderna skiljer för mycket – filtreras här
+        out = []
+        for k, s in shared.items():
+            dice = 2 * s / (size + sum(self.grams[k].values()))
+            if dice >= threshold * 0.9:
+                out.append((dice, k))
+        out.sort(reverse=True)
+        return out[:MAX_CANDIDATES]
+
+    def lookup(self, text: str, threshold: Optional[float] = None) -> Optional[FuzzyMatch]:
+        """Bästa nästan-träff (ordvis likhet ≥ tröskeln) med diff, eller None. Exakta träffar ger None – använd get()."""
+        if not isinstance(text, str) or not text.strip() or text in self.exact:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        new_tokens = tokenize(text)
+        best = None
+        for _, k in self.candidates(text, threshold):
+            source = self.sources[k]
+            old_tokens = tokenize(source)
+            sm = difflib.SequenceMatcher(None, [t for t, _, _ in old_tokens], [t for t, _, _ in new_tokens], autojunk=False)
+            score = sm.ratio()
+            if score >= threshold and (best is None or score > best[0]):
+                best = (score, source, old_tokens, sm.get_opcodes())
+        if best is None:
+            return None
+        score, source, old_tokens, opcodes = best
+        changes = [
+            (op, _span(source, old_tokens, i1, i2), _span(text, new_tokens, j1, j2))
+            for op, i1, i2, j1, j2 in opcodes if op != "equal"
+        ]
+        return FuzzyMatch(text, source, self.exact[source], score, changes)
+
+
+def _span(text: str, tokens, i: int, j: int) -> str:
+    return text[tokens[i][1]:tokens[j-1][2]] if i < j else ""
+
+def delta_messages(match: FuzzyMatch, src_name: str, tgt_name: str) -> List[Dict[str, str]]:
+    """Redigeringsprompt: gammal källtext + översättning + ändringar → uppdaterad översättning."""
+    return [
+        {"role": "system", "content": f"You update existing {tgt_name} translations of {src_name} texts. "
+                                      "Change only what the source change requires; keep everything else identical. "
+                                      "Return only the updated translation."},
+        {"role": "user", "content": f"Previous {src_name} source:\n{match.source}\n\n"
+                                    f"Previous {tgt_name} translation:\n{match.translation}\n\n"
+                                    f"Changes: {match.describe()}\n\n"
+                                    f"New {src_name} source:\n{match.text}"},
+    ]
+
+
+# --------- Rapport ---------
+def main():
+    import time
+    import argparse
+    from migrate_translation_caches import CORPUS_FIELDS, DEFAULT_CORPUS, load_rows
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--show", type=int, default=5, help="antal exempel på patchade texter")
+    args = parser.parse_args()
+
+    texts = [row.get(f) for row in load_rows(args.corpus) for f in CORPUS_FIELDS]
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+
+    # Källtexten står för "översättningen" – tal, format och namn ska överleva oförändrade
+    index = FuzzyIndex(args.threshold)
+    counts = Counter()
+    shown = 0
+    t0 = time.perf_counter()
+    for text in texts:
+        if text in index:
+            counts["exakt"] += 1
+            continue
+        match = index.lookup(text)
+        if match is None:
+            counts["ny"] += 1
+        elif match.patch("SE", "SE") == text:
+            counts["patch"] += 1
+            if shown < args.show:
+                print(f"🧩 {match.score:.2f}  {match.describe()}\n   {text[:100]}")
+                shown += 1
+        else:
+            counts["delta"] += 1
+        index.add(text, text)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"📊 {args.corpus}: {len(texts)} texter – exakt {counts['exakt']}, patch {counts['patch']}, "
+          f"delta-anrop {counts['delta']}, nya {counts['ny']} ({ms:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+keyword_backends.py
+-------------------
+Keyword-översättning ordbok först: en kedja av backends där varje steg bara får det som är kvar.
+- "dict":  exakt uppslagning i FULL_LOOKUP-kolumnerna (SE/EN/DA/DE, samma rad = samma ord)
+- "norm":  normaliserad uppslagning (gemener, NFC, accenter enligt lexikonens accentMap/normalize,
+           citattecken/skiljetecken och dubbla mellanslag bort, lexikonens aliases)
+- "tm":    översättningsminnet (tidigare LLM-svar i samma namnrymd)
+- "llm":   live-anrop (batchat via translate_list, eller valfri funktion per ord); svaren sparas i minnet
+- Allt utom "llm" är vanliga dict-uppslag i minnet → mikrosekunder per keyword
+
+SE-kolumnen i FULL_LOOKUP-exporten är omsorterad efter en omsynk: bara raderna fram till första
+brottet i dess alfabetiska ordning ligger i linje med EN/DA/DE. EN/DA/DE är i linje hela vägen.
+Skyddade serie-/färgnamn (term_masker.py) översätts till sig själva; rader med ett skyddat namn används
+inte som översättning (DA/DE har där SE-cellens ord, som inte alltid hör till raden).
+
+Exempel:
+    chain = KeywordChain([DictionaryBackend(), NormalizedBackend(), MemoryBackend(tm, "gpt-4o", "keywords-v1"),
+                          BatchLLMBackend(engine, tm, "gpt-4o", "keywords-v1")])
+    results, sources = asyncio.run(chain.translate(["alger", "Fog"], "SE", "EN"))
+
+Rapport (bara ordboksstegen, inga anrop):
+    python tests/.py/keyword_backends.py --words faq-extended/faq_keywords_se_final.csv
+"""
+
+import os
+import re
+import csv
+import json
+import asyncio
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from batch_translate import translate_list
+from term_masker import load_protected_terms
+
+LOOKUP_CSV = os.path.join("faq-extended", "Faq + keywords SE DA EN DE - {lang}_FULL_LOOKUP.csv")
+LEXICON_DIR = os.path.join("config", "lexicon")
+LANGS = ["SE", "EN", "DA", "DE"]
+LANG_NAMES = {"SE": "Swedish", "EN": "English", "DA": "Danish", "DE": "German"}
+
+# Källa i arkets kolumn B per backend
+SOURCE_LABEL = {"dict": "DICT", "norm": "DICT", "tm": "AI", "llm": "AI"}
+
+_QUOTES = "\"'“”„«»‘’"
+_PUNCT_RX = re.compile(r"[^\w\s\-/x×%²³]+")
+_WS_RX = re.compile(r"\s+")
+
+
+# --------- Index ---------
+def _read_column(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return [(row[0] if row else "").strip().strip(_QUOTES).strip() for row in csv.reader(f)]
+    except FileNotFoundError:
+        print(f"⚠️ Hittade inte {path} – språket saknas i ordboken")
+        return []
+
+def _aligned_rows(column: Sequence[str]) -> int:
+    """Antal rader (inkl. rubrik) fram till första brottet i kolumnens alfabetiska ordning."""
+    for i in range(2, len(column)):
+        if column[i].lower() < column[i - 1].lower():
+            return i
+    return len(column)
+
+def _load_lexicon(lang: str, directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, f"{lang}_FULL_LOOKUP.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class KeywordDictionary:
+    """Hashindex (src, tgt) → {keyword: översättning}, exakt och normaliserat."""
+
+    def __init__(self, csv_pattern: str = LOOKUP_CSV, lexicon_dir: str = LEXICON_DIR, langs: Sequence[str] = LANGS,
+                 protected: Optional[Sequence[str]] = None):
+        self.langs = list(langs)
+        self.protected = {t.lower() for t in (load_protected_terms() if protected is None else protected)}
+        self.exact: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.normalized: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.conflicts = Counter()
+        self._accents: Dict[str, Dict[str, str]] = {}
+        self._remove: Dict[str, List["re.Pattern"]] = {}
+        self._aliases: Dict[str, Dict[str, str]] = {}
+        for lang in self.langs:
+            lex = _load_lexicon(lang, lexicon_dir)
+            self._accents[lang] = lex.get("accentMap") or {}
+            self._remove[lang] = [re.compile(p) for p in (lex.get("normalize") or {}).get("remove", [])]
+            self._aliases[lang] = {}
+        columns = {lang: _read_column(csv_pattern.format(lang=lang)) for lang in self.langs}
+        # Aliaser behöver normalize(), som behöver accenterna ovan
+        for lang in self.langs:
+            aliases = _load_lexicon(lang, lexicon_dir).get("aliases") or {}
+            self._aliases[lang] = {self.normalize(k, lang): self.normalize(v, lang) for k, v in aliases.items()}
+        self._build(columns)
+
+    def normalize(self, text: str, lang: str) -> str:
+        t = unicodedata.normalize("NFD", text.lower())
+        for rx in self._remove.get(lang, ()):
+            t = rx.sub("", t)
+        t = unicodedata.normalize("NFC", t)
+        t = "".join(self._accents.get(lang, {}).get(c, c) for c in t)
+        t = _WS_RX.sub(" ", _PUNCT_RX.sub(" ", t.strip(_QUOTES))).strip()
+        return self._aliases.get(lang, {}).get(t, t)
+
+    def _build(self, columns: Dict[str, List[str]]):
+        n = min((len(c) for c in columns.values() if c), default=0)
+        aligned = {lang: n for lang in self.langs}
+        if "SE" in columns and columns["SE"]:
+            aligned["SE"] = min(n, _aligned_rows(columns["SE"]))
+        for src in self.langs:
+            for tgt in self.langs:
+                if src == tgt or not columns.get(src) or not columns.get(tgt):
+                    continue
+                exact, norm = {}, {}
+                for i in range(1, min(aligned[src], aligned[tgt])):  # rad 0 = rubrik
+                    s, t = columns[src][i], columns[tgt][i]
+                    if not s or not t or self._has_protected(columns, i):
+                        continue
+                    for table, key in ((exact, s), (norm, self.normalize(s, src))):
+                        if table.setdefault(key, t) != t:
+                            self.conflicts[(src, tgt)] += 1
+                self.exact[(src, tgt)] = exact
+                self.normalized[(src, tgt)] = norm
+
+    def _has_protected(self, columns, i: int) -> bool:
+        return any(len(c) > i and c[i].lower() in self.protected for c in columns.values())
+
+    def lookup(self, word: str, src: str, tgt: str) -> Optional[str]:
+        word = word.strip()
+        if word.lower() in self.protected:
+            return word
+        return self.exact.get((src, tgt), {}).get(word)
+
+    def lookup_normalized(self, word: str, src: str, tgt: str) -> Optional[str]:
+        return self.normalized.get((src, tgt), {}).get(self.normalize(word, src))
+
+
+_default: Optional[KeywordDictionary] = None
+
+def get_dictionary() -> KeywordDictionary:
+    global _default
+    if _default is None:
+        _default = KeywordDictionary()
+    return _default
+
+
+# --------- Backends ---------
+class DictionaryBackend:
+    name = "dict"
+
+    def __init__(self, dictionary: Optional[KeywordDictionary] = None):
+        self.dictionary = dictionary or get_dictionary()
+
+    def _get(self, word: str, src: str, tgt: str) -> Optional[str]:
+        return self.dictionary.lookup(word, src, tgt)
+
+    async def translate(self, words: Sequence[str], src: str, tgt: str) -> Dict[str, str]:
+        return self.translate_sync(words, src, tgt)
+
+    def translate_sync(self, words: Sequence[str], src: str, tgt: str) -> Dict[str, str]:
+        out = {}
+        for w in words:
+            hit = self._get(w, src, tgt)
+            if hit:
+                out[w] = hit
+        return out
+
+
+class NormalizedBackend(DictionaryBackend):
+    name = "norm"
+
+    def _get(self, word: str, src: str, tgt: str) -> Optional[str]:
+        return self.dictionary.lookup_normalized(word, src, tgt)
+
+
+class MemoryBackend:
+    """Tidigare LLM-svar i översättningsminnet (samma modell/promptversion som live-steget)."""
+
+    name = "tm"
+
+    def __init__(self, tm, model: str, prompt_version: str):
+        self.tm = tm
+        self.model = model
+        self.prompt_version = prompt_version
+
+    async def translate(self, words: Sequence[str], src: str, tgt: str) -> Dict[str, str]:
+        return self.tm.get_many(words, src, tgt, self.model, self.prompt_version)
+
+
+class BatchLLMBackend:
+    """Tokenpackade JSON-batcher via translate_list; svaren sparas i minnet."""
+
+    name = "llm"
+
+    def __init__(self, engine, tm=None, model: str = "gpt-4o", prompt_version: str = "keywords-v1", extra: str = ""):
+        self.engine = engine
+        self.tm = tm
+        self.model = model
+        self.prompt_version = prompt_version
+        self.extra = extra
+
+    async def translate(self, words: Sequence[str], src: str, tgt: str) -> Dict[str, str]:
+        words = list(words)
+        res = await translate_list(self.engine, words, LANG_NAMES[src], LANG_NAMES[tgt], extra=self.extra)
+        out = {w: r for w, r in zip(words, res) if r}
+        _remember(self.tm, out, src, tgt, self.model, self.prompt_version)
+        return out
+
+
+class FunctionBackend:
+    """Valfri översättningsfunktion fn(ord, src, tgt) -> text (t.ex. ett befintligt prompt-anrop per ord)."""
+
+    name = "llm"
+
+    def __init__(self, fn: Callable[[str, str, str], Optional[str]], tm=None,
+                 model: str = "gpt-4o", prompt_version: str = "keywords-v1"):
+        self.fn = fn
+        self.tm = tm
+        self.model = model
+        self.prompt_version = prompt_version
+
+    async def translate(self, words: Sequence[str], src: str, tgt: str) -> Dict[str, str]:
+        out = {}
+        for w in words:
+            r = self.fn(w, src, tgt)
+            if r:
+                out[w] = r
+                # Ett ord i taget → sparas direkt så att ett avbrott inte kostar gjorda anrop
+                _remember(self.tm, {w: r}, src, tgt, self.model, self.prompt_version)
+        return out
+
+
+def _remember(tm, results: Dict[str, str], src: str, tgt: str, model: str, prompt_version: str):
+    if tm is None or not results:
+        return
+    with tm.transaction():
+        for w, r in results.items():
+            tm.put(w, r, src, tgt, model, prompt_version)
+
+
+# --------- Kedja ---------
+class KeywordChain:
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.stats = Counter()
+
+    async def translate(self, words: Sequence[str], src: str, tgt: str) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """(översättningar, backend per ord) i samma ordning som words; None där inget steg svarade."""
+        found: Dict[str, Tuple[str, str]] = {}
+        pending = list(dict.fromkeys(w for w in words if isinstance(w, str) and w.strip()))
+        for backend in self.backends:
+            if not pending:
+                break
+            got = await backend.translate(pending, src, tgt)
+            for w, r in got.items():
+                found[w] = (r, backend.name)
+            self.stats[backend.name] += len(got)
+            pending = [w for w in pending if w not in got]
+        self.stats["miss"] += len(pending)
+        results = [found.get(w, (None, None)) for w in words]
+        return [r for r, _ in results], [b for _, b in results]
+
+    def translate_sync(self, words: Sequence[str], src: str, tgt: str):
+        return asyncio.run(self.translate(words, src, tgt))
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {n}" for name, n in self.stats.items())
+
+def dictionary_chain(*live) -> KeywordChain:
+    """Ordboksstegen följda av valfria TM-/LLM-steg."""
+    d = get_dictionary()
+    return KeywordChain([DictionaryBackend(d), NormalizedBackend(d), *live])
+
+
+# --------- Rapport ---------
+def main():
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", default=os.path.join("faq-extended", "faq_keywords_se_final.csv"), help="CSV med kolumn SE")
+    parser.add_argument("--src", default="SE")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    d = get_dictionary()
+    print(f"📚 Index byggt på {(time.perf_counter() - t0) * 1000:.0f} ms: "
+          + ", ".join(f"{s}→{t} {len(v)}" for (s, t), v in d.exact.items() if s == args.src))
+    with open(args.words, "r", encoding="utf-8-sig", newline="") as f:
+        words = [r[args.src].strip() for r in csv.DictReader(f) if (r.get(args.src) or "").strip()]
+
+    for tgt in [l for l in LANGS if l != args.src]:
+        chain = dictionary_chain()
+        t0 = time.perf_counter()
+        results, _ = chain.translate_sync(words, args.src, tgt)
+        us = (time.perf_counter() - t0) * 1e6 / max(1, len(words))
+        print(f"   {args.src}→{tgt}: {len(words)} keywords – {chain.summary()} ({us:.1f} µs/keyword)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+lang_verifier.py
+----------------
+Snabb språkkontroll av översättningar med ordlistorna i config/lexicon/{SE,EN,DA,DE}_FULL_LOOKUP.json.
+- Texten delas i ord (inte delsträngar): "kan" i "Kante" eller "är" i "Verfärbung" räknas inte
+- Ord ur articles/negations/common ger poäng per språk enligt lexikonets weights
+- Ord som finns i flera språk ("kan", "som", "har", "den") delas på alla de språken → nästan ingen signal
+- Lexikonets exklusiva ankare ("varför", "tack") ger full poäng till sitt språk
+- needs_retry(): bara när källspråket tydligt vinner (minst MIN_EVIDENCE poäng och MARGIN × målspråket)
+- flag_many(): kontrollerar en hel batch utdata på en gång (t.ex. alla segment i ett svar)
+- recheck(): batchkontroll av nya AI-översättningar + striktare omförsök bara för de flaggade
+
+LANG_VERIFY_MARGIN (2.0) och LANG_VERIFY_MIN (1.0) kan sättas i miljön.
+
+Rapport på en korpus med facit (falsklarm på riktiga EN/DA/DE-texter, träffar på SE-texter):
+    python tests/.py/lang_verifier.py --corpus faq-extended/faq_multilang_preview.json
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+LEXICON_DIR = os.path.join("config", "lexicon")
+LANGS = ["SE", "EN", "DA", "DE"]
+CATEGORIES = ("articles", "negations", "common")
+DEFAULT_WEIGHTS = {"articles": 0.6, "negations": 0.5, "common": 0.5}
+ANCHOR_WEIGHT = 1.0
+
+MARGIN = float(os.getenv("LANG_VERIFY_MARGIN", "2.0"))
+MIN_EVIDENCE = float(os.getenv("LANG_VERIFY_MIN", "1.0"))
+
+_WORD_RX = re.compile(r"[^\W\d_]+")
+
+log = logging.getLogger("lang_verifier")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text).lower()
+
+def tokenize(text: str) -> List[str]:
+    if not isinstance(text, str):
+        return []
+    return _WORD_RX.findall(normalize(text))
+
+
+class LanguageVerifier:
+    def __init__(self, langs: Sequence[str] = LANGS, directory: str = LEXICON_DIR,
+                 margin: float = MARGIN, min_evidence: float = MIN_EVIDENCE):
+        self.langs = list(langs)
+        self.margin = margin
+        self.min_evidence = min_evidence
+        # ord -> {språk: vikt}; vikten delas med antal språk som har ordet
+        self.weights: Dict[str, Dict[str, float]] = {}
+        self.anchors: Dict[str, List["re.Pattern"]] = {}
+        raw: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for lang in self.langs:
+            lex = self._load(os.path.join(directory, f"{lang}_FULL_LOOKUP.json"))
+            w = {**DEFAULT_WEIGHTS, **(lex.get("weights") or {})}
+            for cat in CATEGORIES:
+                for word in lex.get(cat) or []:
+                    for tok in tokenize(word):
+                        raw[tok][lang] = max(raw[tok].get(lang, 0.0), float(w.get(cat, 0.5)))
+            self.anchors[lang] = [re.compile(p, re.I) for p in (lex.get("anchors") or {}).get("exclusive", [])]
+        for tok, per_lang in raw.items():
+            self.weights[tok] = {lang: v / len(per_lang) for lang, v in per_lang.items()}
+
+    @staticmethod
+    def _load(path: str) -> dict:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            print(f"⚠️ Hittade inte {path} – språket får inga poäng")
+            return {}
+
+    # --------- Poäng ---------
+    def scores(self, text: str) -> Dict[str, float]:
+        out = {lang: 0.0 for lang in self.langs}
+        if not isinstance(text, str) or not text.strip():
+            return out
+        for tok in tokenize(text):
+            for lang, v in self.weights.get(tok, {}).items():
+                out[lang] += v
+        low = normalize(text)
+        for lang, patterns in self.anchors.items():
+            out[lang] += ANCHOR_WEIGHT * sum(len(p.findall(low)) for p in patterns)
+        return out
+
+    def detect(self, text: str) -> Optional[str]:
+        """Språket med högst poäng, eller None om texten saknar signal."""
+        s = self.scores(text)
+        lang = max(s, key=s.get)
+        return lang if s[lang] >= self.min_evidence else None
+
+    # --------- Kontroll ---------
+    def needs_retry(self, text: str, target: str, source: str = "SE") -> bool:
+        """True bara om källspråket tydligt vinner över målspråket (och alla andra språk)."""
+        if target == source or source not in self.langs:
+            return False
+        s = self.scores(text)
+        src = s[source]
+        if src < self.min_evidence:
+            return False
+        if src < self.margin * s.get(target, 0.0):
+            return False
+        return src >= max(s.values())
+
+    def flag_many(self, texts: Sequence[str], targets, sources="SE") -> List[bool]:
+        """needs_retry för en hel batch; targets/sources är ett språk eller ett per text."""
+        n = len(texts)
+        targets = [targets] * n if isinstance(targets, str) else list(targets)
+        sources = [sources] * n if isinstance(sources, str) else list(sources)
+        return [self.needs_retry(t, tgt, src) for t, tgt, src in zip(texts, targets, sources)]
+
+
+_default: Optional[LanguageVerifier] = None
+
+def get_verifier() -> LanguageVerifier:
+    global _default
+    if _default is None:
+        _default = LanguageVerifier()
+    return _default
+
+async def recheck(jobs, results, redo, target, source, key=None, verifier: Optional[LanguageVerifier] = None):
+    """Kontrollerar alla nya AI-översättningar i en batch och kör bara om de som flaggas.
+
+    results[k] = (översättning, källa) för jobs[k]; target(job)/source(job) ger språken,
+    redo(job) -> (översättning, källa) är det striktare omförsöket; jobb med samma key(job) körs om en gång.
+    """
+    verifier = verifier or get_verifier()
+    fresh = [k for k, (_, src) in enumerate(results) if src == "AI"]
+    flags = verifier.flag_many(
+        [results[k][0] for k in fresh],
+        [target(jobs[k]) for k in fresh],
+        [source(jobs[k]) for k in fresh],
+    )
+    retry = [k for k, flag in zip(fresh, flags) if flag]
+    if not retry:
+        return results
+    groups: Dict = {}
+    for k in retry:
+        groups.setdefault(key(jobs[k]) if key else k, []).append(k)
+    log.info(f"⚠️ {len(groups)}/{len(fresh)} översättningar har kvar källspråket – kör om striktare")
+    redone = await asyncio.gather(*(redo(jobs[ks[0]]) for ks in groups.values()))
+    results = list(results)
+    for ks, res in zip(groups.values(), redone):
+        for k in ks:
+            results[k] = res
+    return results
+
+
+# --------- Rapport ---------
+def _old_is_swedish(text: str) -> bool:
+    sw = ["är", "och", "inte", "eller", "plattor", "ytan", "mycket", "finns", "vilka", "hur", "påverkas", "kan", "säker", "halk"]
+    return sum(1 for w in sw if w in text.lower()) >= 2
+
+def main():
+    import time
+    import argparse
+    from migrate_translation_caches import DEFAULT_CORPUS, load_rows
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="korpus med *_se/_en/_da/_de-fält")
+    parser.add_argument("--lexicon", default=LEXICON_DIR)
+    args = parser.parse_args()
+
+    verifier = LanguageVerifier(directory=args.lexicon)
+    rows = load_rows(args.corpus)
+    suffix = {"SE": "_se", "EN": "_en", "DA": "_da", "DE": "_de"}
+    texts = {lang: [] for lang in LANGS}
+    for row in rows:
+        for key, value in row.items():
+            for lang, suf in suffix.items():
+                if key.endswith(suf) and isinstance(value, str) and value.strip():
+                    texts[lang].append(value)
+
+    t0 = time.perf_counter()
+    print(f"📊 {args.corpus}: {', '.join(f'{l}={len(t)}' for l, t in texts.items())} texter")
+    print(f"   {'mål':4s} {'falsklarm förr':>15s} {'falsklarm nu':>13s}")
+    for lang in ["EN", "DA", "DE"]:
+        old = sum(_old_is_swedish(t) for t in texts[lang])
+        new = sum(verifier.flag_many(texts[lang], lang))
+        print(f"   {lang:4s} {old:>15d} {new:>13d}")
+    # Svensk text som "översättning" ska fångas
+    caught = {lang: sum(verifier.flag_many(texts["SE"], lang)) for lang in ["EN", "DA", "DE"]}
+    old_caught = sum(_old_is_swedish(t) for t in texts["SE"])
+    print(f"   svensk utdata fångas: förr {old_caught}/{len(texts['SE'])}, nu "
+          + ", ".join(f"{l} {n}/{len(texts['SE'])}" for l, n in caught.items()))
+    print(f"⏱️ {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
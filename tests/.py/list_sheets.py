@@ -1,6 +1,6 @@
 import os
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
 
 # Ladda miljövariabler
 load_dotenv(".env.local")
@@ -11,23 +11,8 @@ print("📌 Försöker öppna Spreadsheet ID:", spreadsheet_id)
 gcp_email = os.getenv("GCP_CLIENT_EMAIL")
 print("📌 Använder servicekonto:", gcp_email)
 
-gcp_key = os.getenv("GCP_PRIVATE_KEY").replace("\\n", "\n")
-gcp_project = os.getenv("GCP_PROJECT_ID")
-
-creds = {
-    "type": "service_account",
-    "project_id": gcp_project,
-    "private_key_id": "dummy",
-    "private_key": gcp_key,
-    "client_email": gcp_email,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token"
-}
-
-gc = gspread.service_account_from_dict(creds)
-
 try:
-    sh = gc.open_by_key(spreadsheet_id)
+    sh = open_spreadsheet(spreadsheet_id)
     worksheets = sh.worksheets()
     print("✅ Flikar i dokumentet:")
     for ws in worksheets:
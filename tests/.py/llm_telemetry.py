@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+llm_telemetry.py
+----------------
+Strukturerad telemetri för LLM-anrop och cacheuppslag → JSONL, plus en sammanställning per körning.
+- instrument(client): omslag runt OpenAI-klienten (sync eller async, även with_raw_response);
+  varje anrop ger en "llm"-händelse med modell, latens, prompt/completion-tokens, kostnad, status och retries
+- retries räknas av omslaget: misslyckade anrop med samma modell + meddelanden före ett lyckat
+- record_cache(): "cache"-händelse per uppslag i översättningsminnet (hit/miss)
+- tag(stage=…, lang=…): sätter steg/språk för resten av den aktuella asyncio-tasken (contextvars)
+- Varje process får ett körnings-id (TELEMETRY_RUN eller tid + pid)
+
+Filen styrs av TELEMETRY_FILE (faq-extended/logg/llm_calls.jsonl); TELEMETRY=0 stänger av.
+
+Sammanställning (p50/p95-latens, kostnad per språk, träffgrad per körning):
+    python tests/.py/llm_telemetry.py                 # senaste körningen
+    python tests/.py/llm_telemetry.py --run all
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from rate_limiter import is_rate_limit_error
+
+TELEMETRY_FILE = os.getenv("TELEMETRY_FILE", os.path.join("faq-extended", "logg", "llm_calls.jsonl"))
+ENABLED = os.getenv("TELEMETRY", "1") != "0"
+RUN_ID = os.getenv("TELEMETRY_RUN") or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+# USD per 1M tokens (in, ut); längsta prefix vinner (gpt-4o-mini före gpt-4o)
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+_context: contextvars.ContextVar = contextvars.ContextVar("llm_telemetry", default={})
+
+
+def price_for(model: str):
+    best = None
+    for name in PRICES:
+        if model and model.startswith(name) and (best is None or len(name) > len(best)):
+            best = name
+    return PRICES.get(best)
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    price = price_for(model)
+    if price is None:
+        return None
+    return round((prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000, 6)
+
+
+# --------- Kontext ---------
+def tag(**fields):
+    """Sätter t.ex. stage/lang för resten av den aktuella tasken; returnerar token för reset()."""
+    return _context.set({**_context.get(), **fields})
+
+def reset(token):
+    _context.reset(token)
+
+@contextmanager
+def tagged(**fields):
+    token = tag(**fields)
+    try:
+        yield
+    finally:
+        reset(token)
+
+
+# --------- Skrivning ---------
+class Telemetry:
+    def __init__(self, path: str = TELEMETRY_FILE, run_id: str = RUN_ID, enabled: bool = ENABLED):
+        self.path = path
+        self.run_id = run_id
+        self.enabled = enabled
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+        self._lock = threading.Lock()
+        self._fh = None
+        self._failures: Dict[str, int] = {}
+
+    def _file(self):
+        if self._fh is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        return self._fh
+
+    def emit(self, event: str, **fields):
+        if not self.enabled:
+            return
+        entry = {"event": event, "run": self.run_id, "script": self.script, "ts": round(time.time(), 3)}
+        entry.update(_context.get())
+        entry.update({k: v for k, v in fields.items() if v is not None})
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            fh = self._file()
+            fh.write(line)
+            fh.flush()
+
+    def record_cache(self, hit: bool, src_lang: str = None, tgt_lang: str = None, n: int = 1):
+        self.emit("cache", hit=bool(hit), lang=tgt_lang, src=src_lang, n=n)
+
+    # --------- LLM-anrop ---------
+    @staticmethod
+    def _request_key(kwargs) -> str:
+        raw = json.dumps([kwargs.get("model"), kwargs.get("messages")], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def call_done(self, kwargs, response, started: float):
+        latency = (time.perf_counter() - started) * 1000
+        retries = self._failures.pop(self._request_key(kwargs), 0)
+        parsed = response
+        if hasattr(response, "parse") and hasattr(response, "headers"):
+            try:
+                parsed = response.parse()  # SDK:n cachar parse(), anroparen får samma objekt
+            except Exception:
+                parsed = None
+        usage = getattr(parsed, "usage", None)
+        prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+        completion = int(getattr(usage, "completion_tokens", 0) or 0)
+        model = getattr(parsed, "model", None) or kwargs.get("model")
+        self.emit(
+            "llm", status="ok", model=model, latency_ms=round(latency, 1),
+            prompt_tokens=prompt, completion_tokens=completion,
+            cost_usd=cost_usd(model, prompt, completion), retries=retries,
+        )
+
+    def call_failed(self, kwargs, error: BaseException, started: float):
+        latency = (time.perf_counter() - started) * 1000
+        key = self._request_key(kwargs)
+        self._failures[key] = self._failures.get(key, 0) + 1
+        if isinstance(error, BaseException) and error.__class__.__name__ in ("CancelledError", "TimeoutError"):
+            status = "timeout"
+        elif is_rate_limit_error(error):
+            status = "429"
+        else:
+            status = "error"
+        self.emit(
+            "llm", status=status, model=kwargs.get("model"), latency_ms=round(latency, 1),
+            error=f"{error.__class__.__name__}: {error}"[:200],
+        )
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+_default: Optional[Telemetry] = None
+
+def get_telemetry() -> Telemetry:
+    global _default
+    if _default is None:
+        _default = Telemetry()
+    return _default
+
+def record_cache(hit: bool, src_lang: str = None, tgt_lang: str = None, n: int = 1):
+    get_telemetry().record_cache(hit, src_lang, tgt_lang, n)
+
+
+# --------- Klientomslag ---------
+class _Create:
+    def __init__(self, target, telemetry: Telemetry):
+        self._target = target
+        self._telemetry = telemetry
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = self._target.create(*args, **kwargs)
+        except BaseException as e:
+            self._telemetry.call_failed(kwargs, e, started)
+            raise
+        if inspect.isawaitable(result):
+            return self._finish(result, kwargs, started)
+        self._telemetry.call_done(kwargs, result, started)
+        return result
+
+    async def _finish(self, pending, kwargs, started):
+        try:
+            result = await pending
+        except BaseException as e:
+            self._telemetry.call_failed(kwargs, e, started)
+            raise
+        self._telemetry.call_done(kwargs, result, started)
+        return result
+
+class _Proxy:
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+class _Completions(_Proxy):
+    def __init__(self, target, telemetry):
+        super().__init__(target)
+        self.create = _Create(target, telemetry)
+        raw = getattr(target, "with_raw_response", None)
+        if raw is not None:
+            self.with_raw_response = _Proxy(raw)
+            self.with_raw_response.create = _Create(raw, telemetry)
+
+class _Chat(_Proxy):
+    def __init__(self, target, telemetry):
+        super().__init__(target)
+        self.completions = _Completions(target.completions, telemetry)
+
+class InstrumentedClient(_Proxy):
+    """Samma gränssnitt som OpenAI-/AsyncOpenAI-klienten; chat.completions mäts."""
+
+    def __init__(self, client, telemetry: Optional[Telemetry] = None):
+        super().__init__(client)
+        self.telemetry = telemetry or get_telemetry()
+        self.chat = _Chat(client.chat, self.telemetry)
+
+def instrument(client, telemetry: Optional[Telemetry] = None):
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    telemetry = telemetry or get_telemetry()
+    if not telemetry.enabled:
+        return client
+    return InstrumentedClient(client, telemetry)
+
+
+# --------- Sammanställning ---------
+def load_events(path: str = TELEMETRY_FILE) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[k]
+
+def summarize(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    calls = [e for e in events if e.get("event") == "llm"]
+    ok = [e for e in calls if e.get("status") == "ok"]
+    lat = [e.get("latency_ms", 0.0) for e in ok]
+    by_stage: Dict[str, List[float]] = {}
+    by_lang: Dict[str, Dict[str, float]] = {}
+    for e in ok:
+        by_stage.setdefault(e.get("stage") or "-", []).append(e.get("latency_ms", 0.0))
+        row = by_lang.setdefault(e.get("lang") or "-", {"calls": 0, "prompt": 0, "completion": 0, "cost": 0.0})
+        row["calls"] += 1
+        row["prompt"] += e.get("prompt_tokens", 0)
+        row["completion"] += e.get("completion_tokens", 0)
+        row["cost"] += e.get("cost_usd") or 0.0
+    cache = [e for e in events if e.get("event") == "cache"]
+    hits = sum(e.get("n", 1) for e in cache if e.get("hit"))
+    lookups = sum(e.get("n", 1) for e in cache)
+    return {
+        "calls": len(ok),
+        "failed": len(calls) - len(ok),
+        "retries": sum(e.get("retries", 0) for e in ok),
+        "p50": percentile(lat, 50),
+        "p95": percentile(lat, 95),
+        "stages": {s: (len(v), percentile(v, 50), percentile(v, 95)) for s, v in by_stage.items()},
+        "langs": by_lang,
+        "cost": sum(r["cost"] for r in by_lang.values()),
+        "hits": hits,
+        "lookups": lookups,
+    }
+
+def print_summary(run: str, events: List[Dict[str, Any]]):
+    s = summarize(events)
+    scripts = sorted({e.get("script", "") for e in events if e.get("script")})
+    t = [e["ts"] for e in events if "ts" in e]
+    span = max(t) - min(t) if t else 0.0
+    print(f"📊 Körning {run} ({', '.join(scripts) or '-'}, {span:.0f}s)")
+    print(f"   LLM-anrop: {s['calls']} ok, {s['failed']} fel, {s['retries']} retries; "
+          f"latens p50 {s['p50']:.0f} ms, p95 {s['p95']:.0f} ms")
+    for stage, (n, p50, p95) in sorted(s["stages"].items()):
+        print(f"   steg {stage:12s} {n:5d} anrop  p50 {p50:6.0f} ms  p95 {p95:6.0f} ms")
+    for lang, r in sorted(s["langs"].items()):
+        print(f"   språk {lang:4s} {r['calls']:5d} anrop  {r['prompt']:8d} in / {r['completion']:7d} ut tokens  ${r['cost']:.4f}")
+    ratio = s["hits"] / s["lookups"] if s["lookups"] else 0.0
+    print(f"   kostnad totalt ${s['cost']:.4f}; översättningsminne {s['hits']}/{s['lookups']} träffar ({ratio:.0%})")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=TELEMETRY_FILE)
+    parser.add_argument("--run", default="last", help="körnings-id, 'last' eller 'all'")
+    args = parser.parse_args()
+
+    runs: Dict[str, List[Dict[str, Any]]] = {}
+    for e in load_events(args.file):
+        runs.setdefault(e.get("run", "-"), []).append(e)
+    if not runs:
+        print(f"⚠️ Inga händelser i {args.file}")
+        return
+    if args.run == "all":
+        selected = list(runs)
+    elif args.run == "last":
+        selected = [max(runs, key=lambda r: max(e.get("ts", 0) for e in runs[r]))]
+    else:
+        selected = [args.run] if args.run in runs else []
+        if not selected:
+            print(f"⚠️ Hittade ingen körning '{args.run}' i {args.file}")
+            return
+    for run in selected:
+        print_summary(run, runs[run])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+migrate_translation_caches.py
+-----------------------------
+Engångsmigrering: viker in alla gamla JSON-cacher i översättningsminnet (SQLite)
+med kanoniska nycklar (cache_keys.py) och rapporterar träffgraden på FAQ-korpusen
+per skript (den modell/promptversion som skriptet slår upp under).
+
+Varje cache hamnar under modell/promptversion för skriptet som skapade den, så att
+skripten träffar posterna direkt (och inte importerar dem igen).
+
+Kör från projektroten:
+    python tests/.py/migrate_translation_caches.py
+    python tests/.py/migrate_translation_caches.py --corpus faq-extended/faq_multilang_preview.json
+"""
+
+import os
+import json
+import argparse
+from collections import Counter
+
+from cache_keys import canonical_text, legacy_key_parser, parse_legacy_key
+from translation_memory import DEFAULT_DB, TranslationMemory
+
+# (fil, modell, promptversion, pivot) – pivot: DA/DE översattes från EN-output
+LEGACY_CACHES = [
+    ("faq-extended/cache/faq_translate.json", "gpt-4o", "faq-sheets-v1", True),
+    (".cache_faq_translate_merged.json", "gpt-4o-mini", "faq-sheets-v1", False),
+    (".cache_faq_translate.json", "gpt-4o-mini", "faq-local-v1", False),
+    ("faq-extended/.cache_faq_translate.json", "gpt-4o-mini", "faq-protect-v1", False),
+    ("faq-extended/.cache_faq_translate_merged.json", "gpt-4o-mini", "faq-protect-v1", False),
+    ("faq-extended/old.cache_faq_translate_merged.json", "gpt-4o-mini", "faq-protect-v1", False),
+]
+
+DEFAULT_CORPUS = os.path.join("faq-extended", "faq_multilang_preview.json")
+CORPUS_FIELDS = ["question_se", "answer_se", "answer_full_se", "question", "answer"]
+TARGETS = ["EN", "DA", "DE"]
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Kunde inte läsa {path}: {e}")
+            return {}
+
+def load_rows(path):
+    """Svenska FAQ-rader i korpusen (lista av rader eller {"faq": {"SE": [...]}})."""
+    data = load_json(path)
+    if isinstance(data, dict):
+        rows = []
+        for v in data.values():
+            if isinstance(v, list):
+                rows.extend(v)
+            elif isinstance(v, dict):
+                rows.extend(v.get("SE", []))
+    else:
+        rows = data
+    return [row for row in rows if isinstance(row, dict)]
+
+def load_corpus(path):
+    """Alla svenska källtexter i korpusen."""
+    texts = []
+    for row in load_rows(path):
+        for field in CORPUS_FIELDS:
+            val = row.get(field)
+            if isinstance(val, str) and val.strip():
+                texts.append(val)
+    return texts
+
+def legacy_hits(caches, texts):
+    """Träffar med de gamla, exakta nyckelformaten (så som skripten slog upp)."""
+    raw = set()
+    for data in caches:
+        for key in data:
+            parsed = parse_legacy_key(key)
+            if parsed:
+                raw.add((parsed[0], parsed[2]))
+    hits = Counter()
+    for text in texts:
+        for tgt in TARGETS:
+            if (tgt, text) in raw or (tgt, text.strip()) in raw:
+                hits[tgt] += 1
+    return hits
+
+def canonical_hits(tm, texts, model, prompt_version):
+    """Träffar som ett skript faktiskt får: uppslag under dess egen modell/promptversion."""
+    hits = Counter()
+    for tgt in TARGETS:
+        found = tm.get_many(texts, "SE", tgt, model, prompt_version)
+        hits[tgt] = sum(1 for text in texts if text in found)
+    return hits
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite-fil för översättningsminnet")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="FAQ-korpus för träffgradsrapport")
+    args = parser.parse_args()
+
+    tm = TranslationMemory(args.db)
+    before = len(tm)
+    loaded = {}  # (modell, promptversion) → gamla cacher som skriptet slog upp i
+
+    for path, model, prompt_version, pivot in LEGACY_CACHES:
+        data = load_json(path)
+        if not data:
+            continue
+        loaded.setdefault((model, prompt_version), []).append(data)
+        n = tm.import_json(path, legacy_key_parser(pivot=pivot), model, prompt_version)
+        print(f"📥 {path}: {len(data)} nycklar → {n} importerade ({model} / {prompt_version})")
+
+    print(f"🗄️ {tm.path}: {before} → {len(tm)} poster")
+
+    texts = load_corpus(args.corpus)
+    unique = {canonical_text(t) for t in texts}
+    if not texts:
+        print(f"⚠️ Ingen korpus i {args.corpus} – hoppar över träffgradsrapport")
+        return
+    total = len(texts)
+    print(f"\n📊 Träffgrad på {args.corpus} ({total} texter, {len(unique)} unika kanoniskt)")
+    for (model, prompt_version), caches in loaded.items():
+        old = legacy_hits(caches, texts)
+        new = canonical_hits(tm, texts, model, prompt_version)
+        print(f"  {model} / {prompt_version}:")
+        for tgt in TARGETS:
+            gain = new[tgt] - old[tgt]
+            print(f"   {tgt}: gammal {old[tgt]}/{total} ({old[tgt]/total:.0%}) → "
+                  f"kanonisk {new[tgt]}/{total} ({new[tgt]/total:.0%})  +{gain}")
+    tm.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import os
 import re
 import csv
-import time
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
+from sheet_sync import sync_table
+from sheet_mirror import open_mirror
 
 # ---------------------------------------------------
 # 🔑 Läs miljövariabler
@@ -11,24 +12,12 @@ from dotenv import load_dotenv
 load_dotenv(".env.local")
 
 SHEET_ID = os.getenv("SHEET_ID_MAIN")
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
 
 # ---------------------------------------------------
 # 🔐 Google Sheets-auth
-# ---------------------------------------------------
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
+sh = open_spreadsheet(SHEET_ID)
+# Läsningar (även sanity check) går mot lokala spegeln
+mirror = open_mirror(SHEET_ID)
 
 # ---------------------------------------------------
 # ⚙️ Config
@@ -61,7 +50,7 @@ FAQ_SHEETS = ["FAQ_SE", "FAQ_EN", "FAQ_DA", "FAQ_DE"]
 # 🚀 Main
 # ---------------------------------------------------
 def process_sheet(sheet_name, writer):
-    ws = sh.worksheet(sheet_name)
+    ws = mirror.worksheet(sheet_name)
     rows = ws.get_all_records()
     headers = list(rows[0].keys()) if rows else []
     updates = []
@@ -94,11 +83,9 @@ def process_sheet(sheet_name, writer):
         updates.append(new_row)
 
     if not DRY_RUN:
-        ws.clear()
-        ws.append_row(headers)  # header
-        for batch_start in range(0, len(updates), 200):
-            ws.append_rows(updates[batch_start:batch_start+200])
-            time.sleep(3)
+        # Bara ändrade celler/borttagna rader skrivs – fliken töms aldrig
+        plan = sync_table(sh, sheet_name, [headers] + updates, current=ws.get_all_values())
+        print(f"💾 {sheet_name}: {plan.describe()}")
 
     return len(updates), changes, removed_rows
 
@@ -127,8 +114,8 @@ def main():
 
     # 🔎 Sanity check
     for sheet_name in FAQ_SHEETS:
-        ws = sh.worksheet(sheet_name)
-        values = ws.get_all_values()
+        # Skrivna flikar är inaktuella i spegeln och hämtas om; oförändrade läses lokalt
+        values = mirror.worksheet(sheet_name).get_all_values()
         flat = [cell for row in values for cell in row]
         invalids = sum(1 for cell in flat if "INVALID_FORMAT" in cell)
         print(f"✅ {sheet_name}: {summary[sheet_name]['changes']} ändringar, "
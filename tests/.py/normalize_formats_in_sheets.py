@@ -1,30 +1,21 @@
 import os
 import re
 import csv
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
+from sheet_sync import sync_table
+from sheet_mirror import open_mirror
 
 # --- Ladda env ---
 load_dotenv(".env.local")
 
 # --- Google Sheets-auth ---
-gcp_email = os.getenv("GCP_CLIENT_EMAIL")
-gcp_key = os.getenv("GCP_PRIVATE_KEY").replace("\\n", "\n")
-gcp_project = os.getenv("GCP_PROJECT_ID")
 spreadsheet_id = os.getenv("SHEET_ID_MAIN")
 DRY_RUN = os.getenv("DRY_RUN", "true").lower() == "true"
 
-creds = {
-    "type": "service_account",
-    "project_id": gcp_project,
-    "private_key_id": "dummy",
-    "private_key": gcp_key,
-    "client_email": gcp_email,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token"
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(spreadsheet_id)
+sh = open_spreadsheet(spreadsheet_id)
+# DRY_RUN utan ändringar i arket = inga flikhämtningar alls
+mirror = open_mirror(spreadsheet_id)
 
 # --- Config ---
 SHEET_TABS = ["SE_FULL_LOOKUP", "EN_FULL_LOOKUP", "DA_FULL_LOOKUP", "DE_FULL_LOOKUP"]
@@ -53,9 +44,9 @@ def normalize_format(text: str):
 
 def main():
     changes = []
+    mirror.prefetch(SHEET_TABS)
     for tab in SHEET_TABS:
-        ws = sh.worksheet(tab)
-        values = ws.get_all_values()
+        values = mirror.values(tab)
         if not values:
             print(f"❌ Ingen data i {tab}")
             continue
@@ -79,11 +70,11 @@ def main():
                 new_row.append(patched)
             new_values.append(new_row)
 
+        plan = sync_table(sh, tab, new_values, current=values, dry_run=DRY_RUN)
         if not DRY_RUN:
-            ws.update(new_values)
-            print(f"✅ Uppdaterade {tab} ({len(values)-1} rader)")
+            print(f"✅ Uppdaterade {tab}: {plan.describe()}")
         else:
-            print(f"🔎 DRY_RUN: {tab} skulle uppdateras ({len(values)-1} rader)")
+            print(f"🔎 DRY_RUN: {tab} skulle få {plan.describe()}")
 
     # Skriv logg
     log_file = "formats_patch_log.csv"
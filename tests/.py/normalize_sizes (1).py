@@ -5,8 +5,8 @@ import time
 import sys
 from pathlib import Path
 
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
 
 # ---------- Helpers: find project root & .env.local ----------
 def find_project_root(start: Path, markers=(".env.local", "config")) -> Path:
@@ -43,17 +43,7 @@ if missing:
     print(f"❌ Missing env vars in .env.local at {dotenv_path}: {', '.join(missing)}")
     sys.exit(1)
 
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID_MAIN)
+sh = open_spreadsheet(SHEET_ID_MAIN)
 
 SHEETS = ["SE_FULL_LOOKUP", "EN_FULL_LOOKUP", "DA_FULL_LOOKUP", "DE_FULL_LOOKUP"]
 BATCH_SIZE = 20
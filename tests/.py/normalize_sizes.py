@@ -1,12 +1,13 @@
 import os
 import re
 import json
-import time
 import sys
 from pathlib import Path
 
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
+from sheet_writer import SheetWriter
+from sheet_mirror import open_mirror
 
 # ---------- Helpers: find project root & .env.local ----------
 def find_project_root(start: Path, markers=(".env.local", "config")) -> Path:
@@ -43,21 +44,10 @@ if missing:
     print(f"❌ Missing env vars in .env.local at {dotenv_path}: {', '.join(missing)}")
     sys.exit(1)
 
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID_MAIN)
+sh = open_spreadsheet(SHEET_ID_MAIN)
+mirror = open_mirror(SHEET_ID_MAIN)
 
 SHEETS = ["SE_FULL_LOOKUP", "EN_FULL_LOOKUP", "DA_FULL_LOOKUP", "DE_FULL_LOOKUP"]
-BATCH_SIZE = 20
-SLEEP_SECONDS = 2
 
 # Regex for size patterns like 60x60, 60 x 60, 60x60cm, 60 x 60 cm
 size_pattern = re.compile(r'^\s*(\d{2,3})\s*[xX]\s*(\d{2,3})(\s*cm)?\s*$')
@@ -82,35 +72,24 @@ def normalize_word(word: str):
         return original, False
 
 def process_sheet(sheet_name: str):
-    ws = sh.worksheet(sheet_name)
-    col = ws.col_values(1)
+    col = mirror.worksheet(sheet_name).col_values(1)
     total = len(col)
-    batch_updates = []
     normalized_count = 0
 
-    for i, word in enumerate(col, start=1):
-        new_val, changed = normalize_word(word)
-        if changed:
-            normalized_count += 1
-            batch_updates.append({"range": f"{sheet_name}!A{i}", "values": [[new_val]]})
-            batch_updates.append({"range": f"{sheet_name}!C{i}", "values": [["normalized"]]})
-            print(f"✅ {sheet_name} row {i}: {word} -> {new_val}")
+    # Ändrade celler buffras; intilliggande rader skrivs som block
+    with SheetWriter(sh) as writer:
+        for i, word in enumerate(col, start=1):
+            new_val, changed = normalize_word(word)
+            if changed:
+                normalized_count += 1
+                writer.set_row(sheet_name, i, {"A": new_val, "C": "normalized"})
+                print(f"✅ {sheet_name} row {i}: {word} -> {new_val}")
 
-        if len(batch_updates) >= BATCH_SIZE*2:
-            body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-            sh.values_batch_update(body)
-            print(f"💾 Saved batch up to row {i} in {sheet_name}")
-            batch_updates.clear()
-            time.sleep(SLEEP_SECONDS)
-
-    if batch_updates:
-        body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-        sh.values_batch_update(body)
-        print(f"💾 Saved final batch in {sheet_name}")
-
-    print(f"🚀 Done {sheet_name}, normalized={normalized_count}/{total}")
+    print(f"🚀 Done {sheet_name}, normalized={normalized_count}/{total} ({writer.summary()})")
 
 def main():
+    # Alla fyra FULL_LOOKUP-flikarna i ett values_batch_get
+    mirror.prefetch(SHEETS)
     for sheet in SHEETS:
         process_sheet(sheet)
 
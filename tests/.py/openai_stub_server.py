@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+openai_stub_server.py
+---------------------
+Lokal ersättare för OpenAI:s chat-completions-endpoint (för mätning och regressionstest utan API).
+- POST /v1/chat/completions med samma svarsformat som OpenAI (choices, usage, x-ratelimit-headers)
+- Latens per anrop ur en fördelning: fixed:S, uniform:A,B, normal:MEDEL,SD, lognormal:MEDIAN,SIGMA (sekunder)
+- Felinjektion: andel 429 (med retry-after-ms) och 5xx; valfria RPM/TPM-gränser som ger 429 när de överskrids
+- Deterministisk pseudoöversättning: varje ord byts mot ett påhittat ord (samma ord + språk → samma resultat),
+  siffror, skiljetecken, radbrytningar och platshållare ([[T1]]) lämnas orörda
+- JSON-läge (batch_translate.py): {"items": {...}} tillbaka med samma id:n
+- GET /stats ger räknarna som JSON
+
+Skripten pekas mot stubben med OPENAI_BASE_URL (läses av OpenAI-klienten):
+    python tests/.py/openai_stub_server.py --port 8765 --latency lognormal:0.3,0.5 --error-429 0.02
+    $env:OPENAI_BASE_URL="http://127.0.0.1:8765/v1"; $env:OPENAI_API_KEY="stub"
+
+Självtest:
+    python tests/.py/openai_stub_server.py --selftest
+"""
+
+import re
+import json
+import time
+import math
+import random
+import hashlib
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_WORD_RX = re.compile(r"\[\[T\d+\]\]|[^\W\d_]+")
+_TARGETS_RX = re.compile(r"^Target languages: (.+)$", re.M)
+_TARGET_RX = re.compile(r"\b(English|Danish|German|Swedish|engelska|danska|tyska|dansk|Deutsche|EN|DA|DE)\b")
+_CONSONANTS = "bdfgklmnprstv"
+_VOWELS = "aeiou"
+
+
+# --------- Pseudoöversättning ---------
+def _pseudo_word(word: str, lang: str) -> str:
+    # Korta ord/enheter (cm, mm, i) och platshållare lämnas orörda
+    if len(word) <= 2 or word.startswith("[["):
+        return word
+    digest = hashlib.sha1(f"{lang}:{word.lower()}".encode("utf-8")).digest()
+    out = "".join(
+        (_CONSONANTS if i % 2 == 0 else _VOWELS)[b % (len(_CONSONANTS) if i % 2 == 0 else len(_VOWELS))]
+        for i, b in enumerate(digest[:len(word)])
+    )
+    if word.isupper():
+        return out.upper()
+    if word[0].isupper():
+        return out.capitalize()
+    return out
+
+def pseudo_translate(text: str, lang: str = "XX") -> str:
+    """Samma layout och längd ungefär; inga ord från källspråket kvar."""
+    return _WORD_RX.sub(lambda m: _pseudo_word(m.group(0), lang), text)
+
+def _target(messages) -> str:
+    for m in reversed(messages):
+        hit = _TARGET_RX.findall(m.get("content") or "")
+        if hit:
+            return hit[-1][:2].upper()
+    return "XX"
+
+def _reply(messages, json_mode: bool) -> str:
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    lang = _target(messages)
+    if json_mode or "\nItems:\n{" in user:
+        try:
+            items = json.loads(user.split("\nItems:\n", 1)[1])
+        except (IndexError, ValueError, AttributeError):
+            return json.dumps({"items": {}})
+        # Flera mål i samma anrop ("Target languages: EN (English), DA (Danish)")
+        targets = _TARGETS_RX.search(user)
+        if targets:
+            codes = re.findall(r"\b([A-Z]{2})\b", targets.group(1))
+            return json.dumps({"translations": {
+                code: {k: pseudo_translate(str(v), code) for k, v in items.items()} for code in codes
+            }}, ensure_ascii=False)
+        return json.dumps({"items": {k: pseudo_translate(str(v), lang) for k, v in items.items()}}, ensure_ascii=False)
+    # Instruktion + ":\n\n" + text → bara texten översätts
+    text = user.split(":\n\n", 1)[1] if ":\n\n" in user else user
+    return pseudo_translate(text, lang)
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# --------- Latens ---------
+def parse_latency(spec: str):
+    """'fixed:0.2' | 'uniform:0.1,0.5' | 'normal:0.3,0.1' | 'lognormal:0.3,0.5' → funktion(rng) -> sekunder."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: vals[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(vals[0], vals[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(max(vals[0], 1e-6)), vals[1])
+    raise ValueError(f"Okänd latensfördelning: {spec}")
+
+
+# --------- Server ---------
+class StubServer:
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_429: float = 0.0,
+        error_5xx: float = 0.0,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = parse_latency(latency)
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rng = random.Random(seed)
+        self.host = host
+        self.port = port
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "429": 0, "5xx": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+        self._window: deque = deque()  # (tid, tokens) senaste minuten
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # --------- Beslut per anrop ---------
+    def _decide(self, tokens: int):
+        """(status, retry_after_ms, latens, använda anrop, använda tokens) i fönstret."""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0][0] > 60:
+                self._window.popleft()
+            used_req = len(self._window)
+            used_tok = sum(t for _, t in self._window)
+            delay = self.latency(self.rng)
+            roll = self.rng.random()
+            if (self.rpm and used_req >= self.rpm) or (self.tpm and used_tok + tokens > self.tpm):
+                wait = 60 - (now - self._window[0][0]) if self._window else 1.0
+                self.stats["429"] += 1
+                return 429, int(wait * 1000), 0.0, 0, 0
+            if roll < self.error_429:
+                self.stats["429"] += 1
+                return 429, 200, 0.0, used_req, used_tok
+            if roll < self.error_429 + self.error_5xx:
+                self.stats["5xx"] += 1
+                return self.rng.choice((500, 502, 503)), None, delay, used_req, used_tok
+            self._window.append((now, tokens))
+            return 200, None, delay, used_req + 1, used_tok + tokens
+
+    def _headers(self, used_req: int, used_tok: int) -> Dict[str, str]:
+        h = {}
+        if self.rpm:
+            h.update({"x-ratelimit-limit-requests": str(self.rpm),
+                      "x-ratelimit-remaining-requests": str(max(0, self.rpm - used_req)),
+                      "x-ratelimit-reset-requests": "1s"})
+        if self.tpm:
+            h.update({"x-ratelimit-limit-tokens": str(self.tpm),
+                      "x-ratelimit-remaining-tokens": str(max(0, self.tpm - used_tok)),
+                      "x-ratelimit-reset-tokens": "1s"})
+        return h
+
+    def handle(self, body: dict):
+        """(status, headers, svar) för en chat-completions-förfrågan."""
+        messages = body.get("messages") or []
+        prompt_tokens = sum(_tokens(m.get("content") or "") + 4 for m in messages)
+        status, retry_ms, delay, used_req, used_tok = self._decide(prompt_tokens)
+        if delay:
+            time.sleep(delay)
+        headers = self._headers(used_req, used_tok)
+        if status == 429:
+            headers["retry-after-ms"] = str(retry_ms)
+            return status, headers, {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}}
+        if status != 200:
+            return status, headers, {"error": {"message": f"Stub {status}", "type": "server_error"}}
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = _reply(messages, json_mode)
+        completion_tokens = _tokens(content)
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        return 200, headers, {
+            "id": f"chatcmpl-stub-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, headers, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, {}, {"error": {"message": f"Okänd endpoint {self.path}"}})
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    return self._send(400, {}, {"error": {"message": "Ogiltig JSON"}})
+                self._send(*stub.handle(body))
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    with stub._lock:
+                        return self._send(200, {}, dict(stub.stats))
+                self._send(404, {}, {"error": {"message": "not found"}})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --------- Självtest ---------
+def _selftest():
+    import urllib.request
+    import urllib.error
+
+    def post(url, body):
+        req = urllib.request.Request(url + "/chat/completions", data=json.dumps(body).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    ok = True
+    with StubServer(latency="fixed:0.01") as stub:
+        msg = [{"role": "user", "content": "Translate into English:\n\nVilka färger finns i [[T1]]?\n- 60x60 cm"}]
+        s1, r1 = post(stub.base_url, {"model": "gpt-4o", "messages": msg})
+        s2, r2 = post(stub.base_url, {"model": "gpt-4o", "messages": msg})
+        text = r1["choices"][0]["message"]["content"]
+        print(f"🔤 {text!r}")
+        ok &= s1 == s2 == 200 and text == r2["choices"][0]["message"]["content"]
+        ok &= "[[T1]]" in text and "60x60" in text and "Vilka" not in text
+        items = {"1": "fog", "2": "kakel"}
+        s3, r3 = post(stub.base_url, {"model": "gpt-4o", "response_format": {"type": "json_object"},
+                                      "messages": [{"role": "user", "content": f"Translate to German.\n\nItems:\n{json.dumps(items)}"}]})
+        ok &= s3 == 200 and set(json.loads(r3["choices"][0]["message"]["content"])["items"]) == {"1", "2"}
+    with StubServer(error_429=0.3, error_5xx=0.2, seed=1) as stub:
+        codes = [post(stub.base_url, {"messages": [{"role": "user", "content": "x"}]})[0] for _ in range(50)]
+        print(f"🎲 50 anrop: 200={codes.count(200)} 429={codes.count(429)} 5xx={sum(c >= 500 for c in codes)}")
+        ok &= 0 < codes.count(429) < 50 and any(c >= 500 for c in codes)
+    with StubServer(rpm=5) as stub:
+        codes = [post(stub.base_url, {"messages": [{"role": "user", "content": "x"}]})[0] for _ in range(7)]
+        ok &= codes == [200] * 5 + [429] * 2
+    print("✅ Självtest ok" if ok else "❌ Självtest misslyckades")
+    return ok
+
+def main():
+    import sys
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.3,0.5", help="fixed:S | uniform:A,B | normal:M,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-429", type=float, default=0.0, help="andel anrop som får 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="andel anrop som får 500/502/503")
+    parser.add_argument("--rpm", type=int, help="anrop per minut innan stubben svarar 429")
+    parser.add_argument("--tpm", type=int, help="tokens per minut innan stubben svarar 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--selftest", action="store_true")
+    args = parser.parse_args()
+    if args.selftest:
+        sys.exit(0 if _selftest() else 1)
+
+    stub = StubServer(args.latency, args.error_429, args.error_5xx, args.rpm, args.tpm, args.seed, args.host, args.port)
+    print(f"🧪 OpenAI-stubb på {stub.start()} (Ctrl+C avslutar)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"   {stub.stats}")
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 import os
-import time
-import json
 import sys
 from pathlib import Path
 
-import gspread
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from term_masker import load_protected_terms
+from sheets_client import open_spreadsheet
+from sheet_writer import SheetWriter
+from sheet_mirror import open_mirror
+
 # ---------- Helpers: find project root & .env.local ----------
 def find_project_root(start: Path, markers=(".env.local", "faq-extended")) -> Path:
     cur = start.resolve()
@@ -49,50 +51,18 @@ if missing:
 
 client = OpenAI(api_key=OPENAI_API_KEY)
 
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID_MAIN)
+sh = open_spreadsheet(SHEET_ID_MAIN)
+mirror = open_mirror(SHEET_ID_MAIN)
 
 SE_SHEET = "SE_FULL_LOOKUP"
 EN_SHEET = "EN_FULL_LOOKUP"
 
 # ---------- Load protected words (series/colors) ----------
 colors_file = ROOT / "faq-extended" / "faq_colors_from_pronto_se_v2.json"
-DO_NOT_TRANSLATE = set()
-if colors_file.exists():
-    try:
-        colors_data = json.loads(colors_file.read_text(encoding="utf-8"))
-        for item in colors_data:
-            q = item.get("question_se", "")
-            if "serien" in q:
-                serie = q.split("serien")[-1].strip(" ?")
-                if serie:
-                    DO_NOT_TRANSLATE.add(serie.lower())
-            a = item.get("answer_se", "")
-            for line in a.split("\n"):
-                if line.strip().startswith("-"):
-                    color = line.split("(")[0].strip("- ").strip()
-                    if color:
-                        DO_NOT_TRANSLATE.add(color.lower())
-        # Manual exceptions if needed
-        DO_NOT_TRANSLATE.update({"konjak"})
-        print(f"🚫 Skyddar {len(DO_NOT_TRANSLATE)} domänord (serier & färger) från översättning")
-    except Exception as e:
-        print(f"⚠️ Kunde inte läsa {colors_file}: {e}")
-else:
-    print(f"⚠️ Hittade inte {colors_file} – fortsätter utan skyddad lista.")
+DO_NOT_TRANSLATE = {t.lower() for t in load_protected_terms(str(colors_file))}
+print(f"🚫 Skyddar {len(DO_NOT_TRANSLATE)} domänord (serier & färger) från översättning")
 
 # ---------- Rules ----------
-BATCH_SIZE = 20
-SLEEP_SECONDS = 2
 
 def needs_patch(se: str, en: str) -> bool:
     if en is None or str(en).strip() == "":
@@ -127,8 +97,9 @@ Keyword: "{se}"
         return se
 
 def main():
-    ws_se = sh.worksheet(SE_SHEET)
-    ws_en = sh.worksheet(EN_SHEET)
+    mirror.prefetch([SE_SHEET, EN_SHEET])  # båda flikarna i ett anrop (inget alls om arket är oförändrat)
+    ws_se = mirror.worksheet(SE_SHEET)
+    ws_en = mirror.worksheet(EN_SHEET)
 
     se_col = ws_se.col_values(1)
     en_col = ws_en.col_values(1)
@@ -136,7 +107,8 @@ def main():
     total = len(se_col)
     patched = protected = retran = 0
 
-    batch_updates = []
+    # AI-anrop per rad → flusha oftare än default så att framstegen sparas löpande
+    writer = SheetWriter(sh, flush_cells=200)
 
     for i, se in enumerate(se_col, start=1):
         en = en_col[i-1] if i-1 < len(en_col) else ""
@@ -152,30 +124,16 @@ def main():
                 retran += 1
                 reason = "ai-retranslate"
 
-            batch_updates.append({
-                "range": f"{EN_SHEET}!A{i}",
-                "values": [[new_val]],
-            })
+            writer.set(EN_SHEET, i, "A", new_val)
             patched += 1
             print(f"✅ Patched rad {i}: {se_str} -> {new_val} ({reason})")
 
-        # Flush in controlled batches
-        if len(batch_updates) >= BATCH_SIZE:
-            body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-            sh.values_batch_update(body)
-            print(f"💾 Sparade batch upp till rad {i}")
-            batch_updates.clear()
-            time.sleep(SLEEP_SECONDS)
-
         # Progress
         if i % 50 == 0 or i == total:
             print(f"✅ EN progress: {i}/{total}")
 
     # Final flush
-    if batch_updates:
-        body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-        sh.values_batch_update(body)
-        print("💾 Sparade sista batchen")
+    writer.flush()
 
     print("🚀 Klar!")
     print(f"Totals: patched={patched}, protected={protected}, retranslated={retran}")
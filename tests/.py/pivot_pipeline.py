@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pivot_pipeline.py
+-----------------
+Strömmande pivot-översättning SE → EN → DA/DE i stället för "hela SE→EN först, sedan EN→DA/DE".
+- Steg 1 (SE→EN) och steg 2 (EN→DA, EN→DE) körs samtidigt med begränsade köer emellan
+- Så fort en rad har EN-text går den vidare till DA- och DE-arbetarna
+- on_result(rad, språk, fält) anropas direkt när ett resultat är klart → delresultat kan sparas löpande
+- on_row_done(rad) när alla mål för raden är klara (för checkpoints)
+- Identiska texter (samma språkpar) översätts en gång, även när de är i luften samtidigt
+
+Total tid närmar sig det långsammaste steget i stället för summan av stegen.
+
+Antal arbetare per steg: PIPELINE_WORKERS (default = TRANSLATE_CONCURRENCY),
+köstorlek: PIPELINE_QUEUE_SIZE (32).
+
+Självtest med fejkad översättning (jämför fas-för-fas mot pipeline):
+    python tests/.py/pivot_pipeline.py --selftest
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from translate_engine import DEFAULT_CONCURRENCY
+from llm_telemetry import tagged
+
+DEFAULT_WORKERS = int(os.getenv("PIPELINE_WORKERS", str(DEFAULT_CONCURRENCY)))
+DEFAULT_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+
+log = logging.getLogger("pivot_pipeline")
+
+# translate(text, källspråk, målspråk, fält) -> översättning
+TranslateFn = Callable[[str, str, str, str], Awaitable[str]]
+Row = Tuple[Hashable, Dict[str, str]]
+
+
+class PivotPipeline:
+    """SE→EN-steget matar DA/DE-stegen rad för rad via begränsade köer."""
+
+    def __init__(
+        self,
+        translate: TranslateFn,
+        source: str = "SE",
+        pivot: str = "EN",
+        targets: Sequence[str] = ("DA", "DE"),
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        on_result: Optional[Callable[[Hashable, str, Dict[str, str]], Any]] = None,
+        on_row_done: Optional[Callable[[Hashable], Any]] = None,
+    ):
+        self.translate = translate
+        self.source = source
+        self.pivot = pivot
+        self.targets = list(targets)
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.on_result = on_result
+        self.on_row_done = on_row_done
+        # rad -> {språk: {fält: text}}; fylls på medan pipelinen kör
+        self.results: Dict[Hashable, Dict[str, Dict[str, str]]] = {}
+        self.failed: List[Tuple[Hashable, str, BaseException]] = []
+        self._memo: Dict[Tuple[str, str, str], "asyncio.Task"] = {}
+        self._pending: Dict[Hashable, int] = {}
+
+    # --------- Översättning med delade jobb ---------
+    def _once(self, text: str, src: str, tgt: str, field: str) -> "asyncio.Future":
+        key = (src, tgt, text.strip())
+        task = self._memo.get(key)
+        if task is None:
+            # Tasken ärver steg/språk för telemetrin
+            with tagged(stage=f"{src}→{tgt}", lang=tgt):
+                task = asyncio.ensure_future(self.translate(text, src, tgt, field))
+            task.add_done_callback(lambda t, key=key: self._forget_failed(key, t))
+            self._memo[key] = task
+        return task
+
+    def _forget_failed(self, key, task: "asyncio.Future"):
+        # Misslyckat jobb glöms: nästa rad med samma text försöker igen i stället för att ärva felet
+        if (task.cancelled() or task.exception() is not None) and self._memo.get(key) is task:
+            del self._memo[key]
+
+    async def _translate_fields(self, row_id, fields: Dict[str, str], src: str, tgt: str) -> Optional[Dict[str, str]]:
+        names = list(fields)
+
+        async def one(name):
+            text = fields[name]
+            if not isinstance(text, str) or not text.strip():
+                return text if isinstance(text, str) else ""
+            return await self._once(text, src, tgt, name)
+
+        try:
+            values = await asyncio.gather(*(one(n) for n in names))
+        except Exception as e:
+            log.warning(f"❌ Rad {row_id} {src}→{tgt} misslyckades: {e}")
+            self.failed.append((row_id, tgt, e))
+            return None
+        out = dict(zip(names, values))
+        self.results.setdefault(row_id, {})[tgt] = out
+        if self.on_result:
+            self.on_result(row_id, tgt, out)
+        return out
+
+    def _target_done(self, row_id):
+        self._pending[row_id] -= 1
+        if self._pending[row_id] == 0:
+            del self._pending[row_id]
+            if self.on_row_done:
+                self.on_row_done(row_id)
+
+    # --------- Körning ---------
+    async def run(self, rows: Iterable[Row]) -> Dict[Hashable, Dict[str, Dict[str, str]]]:
+        """rows = [(rad-id, {fält: källtext})]; returnerar {rad-id: {språk: {fält: text}}}."""
+        q_src: asyncio.Queue = asyncio.Queue(self.queue_size)
+        q_tgt = {lang: asyncio.Queue(self.queue_size) for lang in self.targets}
+        counts = {self.pivot: 0, **{lang: 0 for lang in self.targets}}
+        t0 = time.monotonic()
+
+        async def feed():
+            for row in rows:
+                await q_src.put(row)
+            for _ in range(self.workers):
+                await q_src.put(None)
+
+        async def pivot_worker():
+            while True:
+                item = await q_src.get()
+                if item is None:
+                    return
+                row_id, fields = item
+                self._pending[row_id] = len(self.targets)
+                out = await self._translate_fields(row_id, fields, self.source, self.pivot)
+                if out is None:
+                    self._pending.pop(row_id, None)
+                    continue
+                counts[self.pivot] += 1
+                for q in q_tgt.values():
+                    await q.put((row_id, out))
+
+        async def target_worker(lang):
+            q = q_tgt[lang]
+            while True:
+                item = await q.get()
+                if item is None:
+                    return
+                row_id, fields = item
+                if await self._translate_fields(row_id, fields, self.pivot, lang) is None:
+                    continue
+                counts[lang] += 1
+                self._target_done(row_id)
+                if counts[lang] % 20 == 0:
+                    log.info(f"--- {self.pivot}→{lang}: {counts[lang]} rader klara ({self.pivot}: {counts[self.pivot]}) ---")
+
+        async def pivot_stage():
+            await asyncio.gather(feed(), *(pivot_worker() for _ in range(self.workers)))
+            for q in q_tgt.values():
+                for _ in range(self.workers):
+                    await q.put(None)
+
+        tasks = [asyncio.ensure_future(pivot_stage())]
+        tasks += [asyncio.ensure_future(target_worker(lang)) for lang in self.targets for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            raise
+        summary = ", ".join(f"{lang}={n}" for lang, n in counts.items())
+        log.info(f"🏁 Pipeline klar på {time.monotonic() - t0:.1f}s: {summary}, fel={len(self.failed)}")
+        return self.results
+
+
+def run_pipeline(rows: Iterable[Row], translate: TranslateFn, **kwargs) -> PivotPipeline:
+    """Synkron ingång; returnerar pipelinen (results/failed) när allt är klart."""
+    pipeline = PivotPipeline(translate, **kwargs)
+    asyncio.run(pipeline.run(rows))
+    return pipeline
+
+
+# --------- Självtest ---------
+def _selftest(n_rows: int = 40, delay: float = 0.05):
+    """Fejkad översättning med fast fördröjning och samma tak för samtidiga anrop i båda lägena."""
+    limit = {}
+
+    async def fake(text, src, tgt, field):
+        async with limit["sem"]:
+            await asyncio.sleep(delay * (2 if field == "answer" else 1))
+        return f"[{tgt}] {text}"
+
+    rows = [(i, {"question": f"Fråga {i}", "answer": f"Svar {i}"}) for i in range(n_rows)]
+
+    async def phased():
+        limit["sem"] = asyncio.Semaphore(8)
+        t = time.monotonic()
+        en = await asyncio.gather(*(
+            asyncio.gather(*(fake(text, "SE", "EN", f) for f, text in fields.items())) for _, fields in rows
+        ))
+        first_da = time.monotonic() - t
+        await asyncio.gather(*(
+            fake(text, "EN", lang, f) for pair in en for f, text in zip(("question", "answer"), pair) for lang in ("DA", "DE")
+        ))
+        return n_rows, first_da
+
+    async def piped():
+        limit["sem"] = asyncio.Semaphore(8)
+        done, first = [], {}
+        t = time.monotonic()
+        p = PivotPipeline(
+            fake,
+            workers=4,
+            on_result=lambda row_id, lang, fields: first.setdefault(lang, time.monotonic() - t),
+            on_row_done=done.append,
+        )
+        await p.run(rows)
+        return len(done), first["DA"]
+
+    results = {}
+    for name, fn in (("fas-för-fas", phased), ("pipeline", piped)):
+        t0 = time.monotonic()
+        done, first_da = asyncio.run(fn())
+        results[name] = done
+        print(f"⏱️ {name:12s} total {time.monotonic() - t0:.2f}s, första DA-rad efter {first_da:.2f}s, rader {done}/{n_rows}")
+    return results["pipeline"] == n_rows
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        sys.exit(0 if _selftest() else 1)
+    print(__doc__)
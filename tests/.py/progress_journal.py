@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+progress_journal.py
+-------------------
+Write-ahead-journal för långa översättningskörningar (ersätter checkpoint-filer + backup-xlsx).
+- Varje klart resultat (rad, språk, fält, värde) läggs till som en JSON-rad direkt när det är klart
+- Filen skrivs bara i slutet (append) → O(1) I/O per resultat i stället för hela arbetsboken var 25:e rad
+- replay(): senaste värdet per (rad, språk, fält); en avhuggen sista rad (krasch mitt i skrivning) hoppas över
+- Kompaktering (en gång, sist) görs av skriptet: replay → DataFrames → en arbetsbok → truncate()
+
+JOURNAL_FSYNC=1 gör os.fsync efter varje rad (långsammare men tål strömavbrott).
+
+Exempel:
+    journal = ProgressJournal("översättning/missing_pivot.journal.jsonl")
+    for (row, lang, field), value in journal.replay().items():
+        frames[lang].at[row, field] = value
+    journal.record(12, "DA", "answer", "…")
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, Hashable, Iterator, Tuple
+
+FSYNC = os.getenv("JOURNAL_FSYNC", "0") == "1"
+
+Key = Tuple[Hashable, str, str]
+
+
+class ProgressJournal:
+    def __init__(self, path: str, fsync: bool = FSYNC):
+        self.path = path
+        self.fsync = fsync
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._fh = None
+        self.written = 0
+
+    def _file(self):
+        if self._fh is None:
+            # Avsluta en avhuggen sista rad så att nästa post hamnar på egen rad
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if torn:
+                self._fh.write("\n")
+        return self._fh
+
+    # --------- Skriv ---------
+    def record(self, row: Hashable, lang: str, field: str, value: Any, **meta):
+        entry = {"row": row, "lang": lang, "field": field, "value": value, "ts": round(time.time(), 3)}
+        entry.update(meta)
+        fh = self._file()
+        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+        self.written += 1
+
+    # --------- Läs ---------
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"⚠️ Hoppar över trasig journalrad {n} i {self.path}")
+
+    def replay(self) -> Dict[Key, Any]:
+        """{(rad, språk, fält): senaste värde}."""
+        state: Dict[Key, Any] = {}
+        for e in self.entries():
+            try:
+                state[(e["row"], e["lang"], e["field"])] = e["value"]
+            except KeyError:
+                continue
+        return state
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.entries())
+
+    def truncate(self):
+        """Tömmer journalen – när allt i den har sparats i arbetsboken."""
+        self.close()
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rate_limiter.py
+---------------
+Adaptiv rate limiter för alla skript som anropar OpenAI (ersätter fasta time.sleep).
+- Token bucket för både anrop/min (RPM) och tokens/min (TPM)
+- Läser x-ratelimit-*-headers och justerar hinkarna efter serverns siffror
+- Vid 429: hela limitern pausar till retry-after, sedan exponentiell backoff med jitter
+- acquire() för synkron kod, acquire_async() för asyncio
+
+Gränser via env: OPENAI_RPM (500), OPENAI_TPM (30000).
+
+Självtest mot lokal stubserver som svarar 429:
+    python tests/.py/rate_limiter.py --selftest
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Mapping, Optional
+
+DEFAULT_RPM = float(os.getenv("OPENAI_RPM", "500"))
+DEFAULT_TPM = float(os.getenv("OPENAI_TPM", "30000"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+_DURATION_RX = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """'6m0s' / '1.5s' / '20ms' / '12' → sekunder."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RX.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNITS[u] for n, u in parts)
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponentiell backoff med full jitter; retry-after från servern är golvet."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60.0
+        self.stamp = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_for(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    # --------- Reservation ---------
+    def _reserve(self, tokens: float) -> float:
+        """Tar ut ett anrop + tokens om det går; annars hur länge man ska vänta."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_for(1), self.tokens.wait_for(tokens))
+            if wait > 0:
+                return wait
+            self.requests.level -= 1
+            self.tokens.level -= min(tokens, self.tokens.capacity)
+            return 0.0
+
+    def acquire(self, tokens: float = 1):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    # --------- Återkoppling från servern ---------
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Synkar hinkarna mot x-ratelimit-limit/remaining/reset-* från svaret."""
+        if not headers:
+            return
+        h = {k.lower(): v for k, v in dict(headers).items()}
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = h.get(f"x-ratelimit-limit-{name}")
+                remaining = h.get(f"x-ratelimit-remaining-{name}")
+                reset = parse_duration(h.get(f"x-ratelimit-reset-{name}"))
+                bucket.refill(now)
+                if limit:
+                    try:
+                        bucket.capacity = float(limit)
+                        bucket.rate = bucket.capacity / 60.0
+                    except ValueError:
+                        pass
+                if remaining is not None:
+                    try:
+                        bucket.level = min(bucket.level, float(remaining))
+                    except ValueError:
+                        pass
+                if reset and bucket.level < 1:
+                    # Servern säger när hinken är full igen → fyll i den takten
+                    bucket.rate = max(bucket.rate, (bucket.capacity - bucket.level) / reset)
+
+    def on_429(self, headers: Optional[Mapping[str, str]] = None, attempt: int = 0) -> float:
+        """Pausar alla anropare; returnerar väntetiden (retry-after eller backoff med jitter)."""
+        h = {k.lower(): v for k, v in dict(headers or {}).items()}
+        retry_after = parse_duration(h.get("retry-after-ms"))
+        retry_after = retry_after / 1000.0 if retry_after is not None else parse_duration(h.get("retry-after"))
+        delay = backoff_delay(attempt, retry_after)
+        with self._lock:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.requests.level = 0
+        self.update_from_headers(headers or {})
+        return delay
+
+
+# --------- Delad limiter per process ---------
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+def get_limiter(model: str = "gpt-4o") -> RateLimiter:
+    """Samma limiter för alla anrop mot samma modell i processen."""
+    with _registry_lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter()
+        return _limiters[model]
+
+def estimate_request_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    from batch_packer import OUTPUT_RATIO, estimate_tokens
+    prompt = sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)
+    return prompt + (max_tokens or int(prompt * OUTPUT_RATIO))
+
+def is_rate_limit_error(err: BaseException) -> bool:
+    return getattr(err, "status_code", None) == 429 or type(err).__name__ == "RateLimitError"
+
+def error_headers(err: BaseException) -> Mapping[str, str]:
+    resp = getattr(err, "response", None)
+    return getattr(resp, "headers", None) or {}
+
+
+# --------- Självtest ---------
+def _selftest():
+    """Stubserver: var tredje förfrågan får 429 + retry-after; limitern ska klara alla."""
+    import json
+    import urllib.request
+    import urllib.error
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = {"n": 0, "429": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            hits["n"] += 1
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if hits["n"] % 3 == 0:
+                hits["429"] += 1
+                self.send_response(429)
+                self.send_header("retry-after-ms", "200")
+                self.end_headers()
+                return
+            body = json.dumps({"ok": True}).encode()
+            self.send_response(200)
+            self.send_header("x-ratelimit-limit-requests", "120")
+            self.send_header("x-ratelimit-remaining-requests", "100")
+            self.send_header("x-ratelimit-reset-requests", "500ms")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+    limiter = RateLimiter(rpm=600, tpm=100000)
+
+    def post():
+        req = urllib.request.Request(url, data=b"{}", method="POST")
+        try:
+            with urllib.request.urlopen(req) as resp:
+                return resp.status, resp.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers
+
+    def call():
+        for attempt in range(6):
+            limiter.acquire(100)
+            status, headers = post()
+            if status != 429:
+                limiter.update_from_headers(headers)
+                return status == 200
+            time.sleep(limiter.on_429(headers, attempt))
+        return False
+
+    async def call_async():
+        loop = asyncio.get_running_loop()
+        for attempt in range(6):
+            await limiter.acquire_async(100)
+            status, headers = await loop.run_in_executor(None, post)
+            if status != 429:
+                limiter.update_from_headers(headers)
+                return status == 200
+            await asyncio.sleep(limiter.on_429(headers, attempt))
+        return False
+
+    async def run_async():
+        return await asyncio.gather(*(call_async() for _ in range(10)))
+
+    t0 = time.monotonic()
+    ok_sync = all(call() for _ in range(10))
+    ok_async = all(asyncio.run(run_async()))
+    server.shutdown()
+    print(f"✅ sync={ok_sync} async={ok_async} förfrågningar={hits['n']} 429={hits['429']} "
+          f"throttled={limiter.throttled} tid={time.monotonic()-t0:.1f}s")
+    return ok_sync and ok_async
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        sys.exit(0 if _selftest() else 1)
+    print(__doc__)
@@ -1,36 +1,17 @@
 import os
-import gspread
 import json
 import re
 from dotenv import load_dotenv
 
+from catalog_templates import load_facit, render_catalog_answer
+from sheets_client import open_spreadsheet
+
 # 🔑 Ladda miljövariabler
 load_dotenv(".env.local")
 
 SHEET_ID = os.getenv("SHEET_ID_MAIN")
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-# 🔐 Google auth via service account
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
 
-# ✅ Peka på rätt facit-fil
-FACIT_FILE = "faq-extended/valid_formats_by_series.series.json"
-
-def load_facit():
-    with open(FACIT_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+sh = open_spreadsheet(SHEET_ID)
 
 def sanitize_faq_se():
     facit = load_facit()
@@ -45,14 +26,11 @@ def sanitize_faq_se():
         a = row.get("answer_se", "")
 
         matched = False
-        for serie, info in facit.items():
+        for serie in facit:
             if serie.lower() in q.lower():
                 matched = True
-                valid_formats = info["formats"]
-                colors = info["colors"]
-
-                # Bygg nytt svar
-                new_answer = f"Följande färger finns i serien {serie}: {', '.join(colors)}\nTillgängliga format: {', '.join(valid_formats)}"
+                # Bygg nytt svar från mallen (samma mall renderar EN/DA/DE utan API-anrop)
+                new_answer = render_catalog_answer(serie, "SE", facit)
 
                 if new_answer != a:
                     col_idx = list(row.keys()).index("answer_se") + 1
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+segment_translate.py
+--------------------
+Översätter FAQ-svar segment för segment i stället för hela svar.
+- Svaren delas i rader, listpunkter och meningar; layouten (indrag, "- ", radbrytningar) sparas
+- Inbäddade listor ("Följande färger finns i X: Grå, Ljusgrå, Mörkgrå") delas i rubrik + poster
+- Bara globalt unika segment skickas till modellen (samma rubrik/listpunkt en gång per språk)
+- Segment utan bokstäver (t.ex. "430x120") översätts inte
+- Svaren sätts ihop igen med exakt samma layout som källan
+- InflightSegments: samtidiga anrop (t.ex. en rad i taget i pivot_pipeline) delar segment som redan
+  är i luften i stället för att var och en missa minnet och fråga modellen
+
+Exempel:
+    plan = SegmentPlan(answers)
+    res = await translate_all([(seg, "EN", "", "SE") for seg in plan.unique])
+    answers_en = plan.assemble([t for t, _ in res])
+
+Rapport över hur mycket som sparas på en korpus:
+    python tests/.py/segment_translate.py --corpus faq-extended/faq_multilang_preview.json
+"""
+
+import re
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from cache_keys import canonical_text
+
+# Indrag + listmarkör ("- ", "• ", "* ", "1. ", "2) ") + innehåll + avslutande blanktecken
+_LINE_RX = re.compile(r"^(\s*(?:[-–•*]\s+|\d{1,2}[.)]\s+)?)(.*?)(\s*)$", re.S)
+# Meningsgräns: . ! ? … följt av blanksteg och versal/siffra
+_SENTENCE_RX = re.compile(r"(?<=[.!?…])(\s+)(?=[A-ZÅÄÖÆØÜ0-9\"'(])")
+_LETTER_RX = re.compile(r"[^\W\d_]")
+# "Rubrik: a, b, c" – kolon följt av minst två kommaseparerade korta poster
+_INLINE_LIST_RX = re.compile(r"^(.*?:)(\s+)([^.!?:…]+?(?:,\s*[^.!?:,…]+)+)(\s*…?)$")
+INLINE_ITEM_MAX_WORDS = 4
+
+# Förkortningar som inte avslutar en mening
+_ABBREVIATIONS = ("t.ex.", "bl.a.", "ca.", "inkl.", "exkl.", "resp.", "m.m.", "o.s.v.", "etc.", "z.B.", "bzw.", "f.eks.")
+
+# Del av ett svar: (text, True) = segment som ska översättas, (text, False) = layout/literal
+Part = Tuple[str, bool]
+
+
+def _split_sentences(body: str) -> List[Part]:
+    parts: List[Part] = []
+    pieces = _SENTENCE_RX.split(body)
+    # pieces = [mening, blanksteg, mening, blanksteg, ...]
+    current = pieces[0]
+    for i in range(1, len(pieces), 2):
+        sep, nxt = pieces[i], pieces[i + 1]
+        if current.endswith(_ABBREVIATIONS):
+            current += sep + nxt
+            continue
+        parts.append((current, True))
+        parts.append((sep, False))
+        current = nxt
+    parts.append((current, True))
+    return parts
+
+def _split_inline_list(sentence: str) -> List[Part]:
+    m = _INLINE_LIST_RX.match(sentence)
+    if not m:
+        return [(sentence, True)]
+    head, sep, items, tail = m.groups()
+    stripped = items.rstrip()
+    items, tail = stripped, items[len(stripped):] + tail
+    pieces = re.split(r"(,\s*)", items)
+    if any(len(p.split()) > INLINE_ITEM_MAX_WORDS for p in pieces[::2]):
+        return [(sentence, True)]
+    parts: List[Part] = [(head, True), (sep, False)]
+    for i, piece in enumerate(pieces):
+        parts.append((piece, i % 2 == 0))
+    if tail:
+        parts.append((tail, False))
+    return parts
+
+def split_segments(text: str) -> List[Part]:
+    """Delar text i segment + layout; "".join(p for p, _ in parts) == text."""
+    if not isinstance(text, str) or not text:
+        return [(text or "", False)]
+    parts: List[Part] = []
+    lines = text.split("\n")
+    for n, line in enumerate(lines):
+        if n:
+            parts.append(("\n", False))
+        m = _LINE_RX.match(line)
+        prefix, body, suffix = m.group(1), m.group(2), m.group(3)
+        if prefix:
+            parts.append((prefix, False))
+        if body:
+            for sentence, _ in _split_sentences(body):
+                for seg, translatable in _split_inline_list(sentence):
+                    parts.append((seg, translatable and bool(_LETTER_RX.search(seg))))
+        if suffix:
+            parts.append((suffix, False))
+    return parts
+
+
+class SegmentPlan:
+    """Segmenterar alla texter och håller reda på unika segment och hur svaren sätts ihop."""
+
+    def __init__(self, texts: Sequence[str]):
+        self.texts = list(texts)
+        self.parts: List[List[Part]] = [split_segments(t) for t in self.texts]
+        self.unique: List[str] = []
+        self._index: Dict[str, int] = {}
+        # per text: index i self.unique för varje översättningsbart segment
+        self.indices: List[List[int]] = []
+        for parts in self.parts:
+            ids = []
+            for seg, translatable in parts:
+                if not translatable:
+                    continue
+                key = canonical_text(seg)
+                if key not in self._index:
+                    self._index[key] = len(self.unique)
+                    self.unique.append(seg)
+                ids.append(self._index[key])
+            self.indices.append(ids)
+
+    @property
+    def segment_count(self) -> int:
+        return sum(len(ids) for ids in self.indices)
+
+    def assemble(self, translations: Sequence[str]) -> List[str]:
+        """translations[i] hör till self.unique[i]; saknas den behålls källsegmentet."""
+        out = []
+        for parts, ids in zip(self.parts, self.indices):
+            it = iter(ids)
+            buf = []
+            for seg, translatable in parts:
+                if translatable:
+                    tr = translations[next(it)]
+                    buf.append(tr.strip() if isinstance(tr, str) and tr.strip() else seg)
+                else:
+                    buf.append(seg)
+            out.append("".join(buf))
+        return out
+
+async def translate_segmented(
+    texts: Sequence[str],
+    translate_many: Callable[[List[str]], Awaitable[Sequence[str]]],
+) -> List[str]:
+    """translate_many(unika segment) -> översättningar i samma ordning; returnerar hela texterna."""
+    plan = SegmentPlan(texts)
+    translations = await translate_many(plan.unique) if plan.unique else []
+    return plan.assemble(translations)
+
+
+class InflightSegments:
+    """Delade segmentöversättningar mellan samtidiga anrop, nyckel (källspråk, målspråk, kanoniskt segment).
+
+    Som PivotPipeline._once fast för segment: ett segment som redan översätts av en annan rad
+    väntas in i stället för att skickas igen.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Tuple[str, str, str], Tuple["asyncio.Future", int]] = {}
+        self.shared = 0
+
+    async def translate(
+        self,
+        segments: Sequence[str],
+        src: str,
+        tgt: str,
+        translate_many: Callable[[List[str]], Awaitable[Sequence[Any]]],
+    ) -> List[Any]:
+        """translate_many(nya segment) körs en gång för de segment som ingen annan redan skickat."""
+        keys = [(src, tgt, canonical_text(seg)) for seg in segments]
+        new = []
+        for i, key in enumerate(keys):
+            if key not in self._tasks:
+                self._tasks[key] = (None, len(new))
+                new.append(i)
+            elif self._tasks[key][0] is not None:
+                self.shared += 1
+        if new:
+            batch = asyncio.ensure_future(translate_many([segments[i] for i in new]))
+            for i in new:
+                self._tasks[keys[i]] = (batch, self._tasks[keys[i]][1])
+            batch.add_done_callback(self._forget_failed)
+        # Slå upp alla innan något inväntas – en misslyckad batch kan hinna glömmas under tiden
+        pending = [self._tasks[key] for key in keys]
+        return [(await task)[n] for task, n in pending]
+
+    def _forget_failed(self, batch: "asyncio.Future"):
+        # Misslyckad batch glöms: nästa anropare skickar segmenten igen i stället för att få samma fel
+        if batch.cancelled() or batch.exception() is not None:
+            for key in [k for k, (task, _) in self._tasks.items() if task is batch]:
+                del self._tasks[key]
+
+
+# --------- Rapport ---------
+def main():
+    import argparse
+    from migrate_translation_caches import DEFAULT_CORPUS, load_rows
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="FAQ-korpus (t.ex. faq-cache.json)")
+    parser.add_argument("--field", default="answer_se", help="fält som ska segmenteras (answer i faq-cache.json)")
+    args = parser.parse_args()
+
+    texts = [r[args.field] for r in load_rows(args.corpus) if isinstance(r.get(args.field), str) and r[args.field].strip()]
+    if not texts:
+        print(f"⚠️ Inga texter i fältet '{args.field}' i {args.corpus}")
+        return
+
+    whole = {canonical_text(t) for t in texts}
+    plan = SegmentPlan(texts)
+    whole_chars = sum(len(t) for t in whole)
+    seg_chars = sum(len(s) for s in plan.unique)
+    print(f"📊 {args.corpus} / {args.field}: {len(texts)} svar")
+    print(f"   hela svar:  {len(whole)} unika anrop, {whole_chars} tecken")
+    print(f"   segment:    {plan.segment_count} segment → {len(plan.unique)} unika, {seg_chars} tecken "
+          f"({1 - seg_chars / max(1, whole_chars):.0%} mindre text till modellen)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sheet_mirror.py
+---------------
+Lokal spegel (SQLite) av kalkylarkets flikar – läsningar går mot spegeln, nätet bara när arket ändrats.
+- Varje flik sparas med arkets revision (Drive modifiedTime) vid hämtningen
+- Första läsningen i en process kollar revisionen (ett litet Drive-anrop); samma revision → allt läses lokalt,
+  ny revision → bara flikarna som faktiskt läses hämtas om (en get_all_values per flik)
+- MirroredWorksheet har samma läs-API som skripten använder: get_all_values, get_all_records, col_values, row_values;
+  allt annat går till den riktiga fliken; bara skrivmetoderna (WRITE_METHODS: update, append_rows, clear …)
+  gör fliken inaktuell i spegeln, liksom skrivningar via sheet_writer/sheet_sync (WRITE_HOOKS)
+- Offline-läge (SHEET_MIRROR_OFFLINE=1): ingen revisionskoll alls – analyser och torrkörningar utan nätverksanrop
+- SHEET_MIRROR_TTL (sekunder, default 0): så länge senaste revisionskollen är yngre än så görs ingen ny
+- prefetch(): alla inaktuella flikar i ETT values_batch_get (t.ex. de fyra FULL_LOOKUP + fyra FAQ-flikarna);
+  columns()/frame() ger flikarna kolumnvis (lika långa listor per rubrik) eller som DataFrame
+
+Spegeln ligger i faq-extended/cache/sheet_mirror.sqlite (en databas för alla ark, nyckel = spreadsheet-id).
+
+Exempel:
+    mirror = open_mirror()                      # SHEET_ID_MAIN
+    ws_se = mirror.worksheet("SE_FULL_LOOKUP")
+    words = ws_se.col_values(1)                 # lokalt om arket inte ändrats sedan sist
+    rows = mirror.worksheet("FAQ_SE").get_all_records()
+
+    mirror.prefetch(FULL_LOOKUP_TABS + FAQ_TABS)   # ett anrop för allt som ändrats
+    df_en = mirror.frame("EN_FULL_LOOKUP")
+
+Status för spegeln:
+    python tests/.py/sheet_mirror.py [--refresh]
+"""
+
+import os
+import re
+import json
+import time
+import functools
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from sheet_writer import WRITE_HOOKS
+
+MIRROR_DB = os.path.join("faq-extended", "cache", "sheet_mirror.sqlite")
+OFFLINE = os.getenv("SHEET_MIRROR_OFFLINE", "0") == "1"
+TTL = float(os.getenv("SHEET_MIRROR_TTL", "0"))
+
+FULL_LOOKUP_TABS = ["SE_FULL_LOOKUP", "EN_FULL_LOOKUP", "DA_FULL_LOOKUP", "DE_FULL_LOOKUP"]
+FAQ_TABS = ["FAQ_SE", "FAQ_EN", "FAQ_DA", "FAQ_DE"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tabs (
+    sheet_id   TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    revision   TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    n_rows     INTEGER NOT NULL,
+    PRIMARY KEY (sheet_id, title)
+);
+CREATE TABLE IF NOT EXISTS rows (
+    sheet_id TEXT NOT NULL,
+    title    TEXT NOT NULL,
+    r        INTEGER NOT NULL,
+    cells    TEXT NOT NULL,
+    PRIMARY KEY (sheet_id, title, r)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checks (
+    sheet_id   TEXT PRIMARY KEY,
+    revision   TEXT NOT NULL,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def remote_revision(sh) -> str:
+    """Arkets senaste ändringstid enligt Drive (ändras vid varje redigering i någon flik)."""
+    client = getattr(sh, "client", None)
+    http = getattr(getattr(client, "gc", client), "http_client", None)
+    if http is not None and hasattr(http, "get_file_drive_metadata"):
+        return http.get_file_drive_metadata(sh.id)["modifiedTime"]  # gspread 6, öppnar inte arket
+    if hasattr(sh, "get_lastUpdateTime"):
+        return sh.get_lastUpdateTime()
+    return sh.lastUpdateTime  # gspread 5
+
+
+def tab_range(title: str) -> str:
+    """Hela fliken som A1-intervall (namn med mellanslag o.d. citeras)."""
+    return title if re.fullmatch(r"\w+", title) else "'" + title.replace("'", "''") + "'"
+
+def _fill_gaps(values: List[List[str]]) -> List[List[str]]:
+    """Rektangulär tabell som gspreads get_all_values (API:t klipper tomma celler i radslut)."""
+    width = max((len(r) for r in values), default=0)
+    return [list(r) + [""] * (width - len(r)) for r in values]
+
+def batch_get_values(sh, titles: List[str]) -> Dict[str, List[List[str]]]:
+    """Flera hela flikar i ett values_batch_get-anrop → {flik: värden som get_all_values}."""
+    if not titles:
+        return {}
+    resp = sh.values_batch_get([tab_range(t) for t in titles], params={"majorDimension": "ROWS"})
+    # valueRanges kommer i samma ordning som intervallen; "values" saknas för tomma flikar
+    return {t: _fill_gaps(vr.get("values", [])) for t, vr in zip(titles, resp.get("valueRanges", []))}
+
+
+def _numericise(value: str):
+    """Som gspread.utils.numericise (get_all_records): "12" → 12, "1.5" → 1.5, annars texten."""
+    if value == "" or "_" in value:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+class SheetMirror:
+    def __init__(self, sh, path: str = MIRROR_DB, offline: bool = OFFLINE, ttl: float = TTL):
+        self.sh = sh
+        self.sheet_id = sh.id
+        self.path = path
+        self.offline = offline
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._revision: Optional[str] = None
+        self._values: Dict[str, List[List[str]]] = {}
+        self.stats = {"local": 0, "fetched": 0, "batch_calls": 0, "revision_checks": 0}
+        WRITE_HOOKS.append(self._on_write)
+
+    def _on_write(self, sheet_id: str, tab: str):
+        # Egna skrivningar (SheetWriter/sync_table): fliken hämtas om, övriga flikar gäller resten av körningen.
+        # Arkets revision har ändrats av skrivningen → nästa process kollar om allt
+        if sheet_id == self.sheet_id:
+            self.invalidate(tab)
+            self.conn.execute("DELETE FROM checks WHERE sheet_id=?", (self.sheet_id,))
+            self.conn.commit()
+
+    # --------- Revision ---------
+    def revision(self) -> Optional[str]:
+        """Arkets revision; kollas en gång per process (eller per TTL), None i offline-läge."""
+        if self.offline:
+            return None
+        if self._revision is None:
+            row = self.conn.execute("SELECT revision, checked_at FROM checks WHERE sheet_id=?", (self.sheet_id,)).fetchone()
+            if row and self.ttl and time.time() - row[1] < self.ttl:
+                self._revision = row[0]
+            else:
+                self._revision = remote_revision(self.sh)
+                self.stats["revision_checks"] += 1
+                self.conn.execute("INSERT OR REPLACE INTO checks VALUES (?,?,?)", (self.sheet_id, self._revision, time.time()))
+                self.conn.commit()
+        return self._revision
+
+    def refresh(self):
+        """Glöm revisionen (t.ex. efter egna skrivningar) – nästa läsning kollar Drive igen."""
+        self._revision = None
+        self._values.clear()
+        self.conn.execute("DELETE FROM checks WHERE sheet_id=?", (self.sheet_id,))
+        self.conn.commit()
+
+    def invalidate(self, title: Optional[str] = None):
+        """Flik (eller alla) hämtas om vid nästa läsning oavsett revision."""
+        if title is None:
+            self.conn.execute("DELETE FROM tabs WHERE sheet_id=?", (self.sheet_id,))
+            self._values.clear()
+        else:
+            self.conn.execute("DELETE FROM tabs WHERE sheet_id=? AND title=?", (self.sheet_id, title))
+            self._values.pop(title, None)
+        self.conn.commit()
+
+    # --------- Data ---------
+    def cached_revision(self, title: str) -> Optional[str]:
+        row = self.conn.execute("SELECT revision FROM tabs WHERE sheet_id=? AND title=?", (self.sheet_id, title)).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, title: str) -> bool:
+        stored = self.cached_revision(title)
+        if stored is None:
+            return False
+        return self.offline or stored == self.revision()
+
+    def store(self, title: str, values: List[List[Any]], revision: Optional[str] = None):
+        """Sparar en hämtad flik (revisionen ska vara hämtad FÖRE värdena)."""
+        revision = revision if revision is not None else (self._revision or "")
+        with self.conn:
+            self.conn.execute("DELETE FROM rows WHERE sheet_id=? AND title=?", (self.sheet_id, title))
+            self.conn.executemany(
+                "INSERT INTO rows VALUES (?,?,?,?)",
+                ((self.sheet_id, title, r, json.dumps(row, ensure_ascii=False)) for r, row in enumerate(values)),
+            )
+            self.conn.execute("INSERT OR REPLACE INTO tabs VALUES (?,?,?,?,?)",
+                              (self.sheet_id, title, revision, time.time(), len(values)))
+        self._values[title] = [list(r) for r in values]
+
+    def _load(self, title: str) -> List[List[str]]:
+        rows = self.conn.execute(
+            "SELECT cells FROM rows WHERE sheet_id=? AND title=? ORDER BY r", (self.sheet_id, title)
+        ).fetchall()
+        return [json.loads(c) for (c,) in rows]
+
+    def values(self, title: str) -> List[List[str]]:
+        """Hela fliken som get_all_values() – lokalt om spegeln är aktuell, annars hämtad och sparad."""
+        if title in self._values and (self.offline or self._revision is not None):
+            self.stats["local"] += 1
+            return self._values[title]
+        if self.is_fresh(title):
+            self.stats["local"] += 1
+            self._values[title] = self._load(title)
+            return self._values[title]
+        if self.offline:
+            raise RuntimeError(f"❌ {title} finns inte i spegeln ({self.path}) – kör en gång utan SHEET_MIRROR_OFFLINE")
+        revision = self.revision()
+        values = self.sh.worksheet(title).get_all_values()
+        self.stats["fetched"] += 1
+        self.store(title, values, revision)
+        return self._values[title]
+
+    def prefetch(self, titles: List[str]) -> int:
+        """Hämtar alla inaktuella flikar bland titles i ett anrop; returnerar antal hämtade flikar."""
+        if self.offline:
+            return 0
+        stale = [t for t in dict.fromkeys(titles) if not self.is_fresh(t)]
+        if not stale:
+            return 0
+        revision = self.revision()
+        for title, values in batch_get_values(self.sh, stale).items():
+            self.store(title, values, revision)
+        self.stats["fetched"] += len(stale)
+        self.stats["batch_calls"] += 1
+        print(f"📥 Hämtade {len(stale)} flikar i ett anrop: {', '.join(stale)}")
+        return len(stale)
+
+    def columns(self, title: str, header: int = 1) -> Dict[str, List[str]]:
+        """{rubrik: kolumn} – alla kolumner lika långa (rader efter rubrikraden, tomma celler = "")."""
+        values = self.values(title)
+        if len(values) < header:
+            return {}
+        keys = values[header - 1]
+        body = values[header:]
+        return {k or f"Col{c + 1}": [row[c] if c < len(row) else "" for row in body] for c, k in enumerate(keys)}
+
+    def frame(self, title: str, header: int = 1):
+        """Fliken som pandas.DataFrame (strängar, rubrikraden som kolumnnamn)."""
+        import pandas as pd
+        return pd.DataFrame(self.columns(title, header))
+
+    def worksheet(self, title: str) -> "MirroredWorksheet":
+        return MirroredWorksheet(self, title)
+
+    def tabs(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT title, revision, fetched_at, n_rows FROM tabs WHERE sheet_id=? ORDER BY title", (self.sheet_id,)
+        ).fetchall()
+        return [dict(zip(("title", "revision", "fetched_at", "rows"), r)) for r in rows]
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['local']} lokala läsningar, {s['fetched']} flikar hämtade "
+                f"({s['batch_calls']} batchanrop), {s['revision_checks']} revisionskoll")
+
+
+# gspread.Worksheet-metoder som ändrar cellvärden eller radernas läge
+WRITE_METHODS = frozenset({
+    "update", "update_acell", "update_cell", "update_cells", "batch_update", "batch_clear", "clear",
+    "append_row", "append_rows", "insert_row", "insert_rows", "insert_cols", "add_rows", "add_cols",
+    "delete_row", "delete_rows", "delete_columns", "resize", "sort", "update_title",
+})
+
+
+class MirroredWorksheet:
+    """Läs-API som gspread.Worksheet mot spegeln; övriga attribut går till den riktiga fliken."""
+
+    def __init__(self, mirror: SheetMirror, title: str):
+        self.mirror = mirror
+        self.title = title
+
+    def get_all_values(self) -> List[List[str]]:
+        return [list(r) for r in self.mirror.values(self.title)]
+
+    def get_all_records(self, head: int = 1, default_blank: Any = "", numericise: bool = True) -> List[Dict[str, Any]]:
+        values = self.mirror.values(self.title)
+        if len(values) < head:
+            return []
+        keys = values[head - 1]
+        out = []
+        for row in values[head:]:
+            row = list(row) + [""] * (len(keys) - len(row))
+            cells = [_numericise(v) if numericise else v for v in row[:len(keys)]]
+            out.append({k: (default_blank if v == "" else v) for k, v in zip(keys, cells)})
+        return out
+
+    def col_values(self, col: int) -> List[str]:
+        out = [row[col - 1] if col - 1 < len(row) else "" for row in self.mirror.values(self.title)]
+        while out and out[-1] == "":
+            out.pop()
+        return out
+
+    def row_values(self, row: int) -> List[str]:
+        values = self.mirror.values(self.title)
+        out = list(values[row - 1]) if row - 1 < len(values) else []
+        while out and out[-1] == "":
+            out.pop()
+        return out
+
+    def __getattr__(self, name):
+        # Allt annat → riktiga fliken (id, row_count, spreadsheet … påverkar inte spegeln)
+        attr = getattr(self.mirror.sh.worksheet(self.title), name)
+        if name not in WRITE_METHODS:
+            return attr
+
+        @functools.wraps(attr)
+        def write(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                # Även om anropet misslyckades kan en del ha skrivits → spegeln för fliken gäller inte längre
+                self.mirror.invalidate(self.title)
+        return write
+
+
+_mirrors: Dict[str, SheetMirror] = {}
+
+def open_mirror(key: Optional[str] = None, **kwargs) -> SheetMirror:
+    """Spegeln för arket key (default SHEET_ID_MAIN) via den delade Sheets-klienten."""
+    from sheets_client import open_spreadsheet
+    sh = open_spreadsheet(key)
+    if sh.id not in _mirrors:
+        _mirrors[sh.id] = SheetMirror(sh, **kwargs)
+    return _mirrors[sh.id]
+
+
+# --------- CLI ---------
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sheet", help="spreadsheet-id (default SHEET_ID_MAIN)")
+    parser.add_argument("--refresh", action="store_true", help="kolla revisionen och hämta inaktuella flikar")
+    args = parser.parse_args()
+
+    mirror = open_mirror(args.sheet)
+    if args.refresh:
+        for tab in mirror.tabs():
+            mirror.values(tab["title"])
+        print(f"🔄 Revision {mirror.revision()} – {mirror.summary()}")
+    for tab in mirror.tabs():
+        fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(tab["fetched_at"]))
+        print(f"- {tab['title']:20s} {tab['rows']:6d} rader  revision {tab['revision']}  hämtad {fetched}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sheet_sync.py
+-------------
+Diffbaserad synk av en hel flik (ersätter ws.clear() + append_rows i bitar + time.sleep, och ws.update(allt)).
+- Önskad tabell (2-D, rubrik först) jämförs med fliken som den ser ut nu (get_all_values)
+- Raderna linjeras med difflib: borttagna rader mitt i fliken → deleteDimension, nya rader → insertDimension
+  (ett enda batch_update-anrop), så att raderna efter inte behöver skrivas om
+- Ändrade rader jämförs cell för cell; bara celler som skiljer sig skrivs (via sheet_writer → sammanslagna block)
+- Rader/kolumner efter tabellens slut töms cellvis; för liten flik utökas med appendDimension
+- Fliken töms aldrig → den som läser arket under körningen ser aldrig ett tomt ark
+- Jämförelsen görs på strängnivå (get_all_values ger strängar; 12 och "12" räknas som lika, None = "")
+
+Exempel:
+    plan = sync_table(sh, "FAQ_EN", [header] + rows)
+    print(plan.describe())             # "3 celler i 2 rader ändrade, 1 rad borttagen, 0 rader infogade"
+
+Torrkörning (bara planen):
+    plan = sync_table(sh, "FAQ_EN", table, dry_run=True)
+
+Självtest (utan nätverk):
+    python tests/.py/sheet_sync.py --selftest
+"""
+
+import difflib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sheet_writer import SheetWriter, notify_write
+
+
+def _cell(value: Any) -> str:
+    return "" if value is None else str(value)
+
+def _row_key(row: Sequence[Any]) -> Tuple[str, ...]:
+    cells = [_cell(v) for v in row]
+    while cells and cells[-1] == "":
+        cells.pop()
+    return tuple(cells)
+
+
+@dataclass
+class SyncPlan:
+    deletes: List[Tuple[int, int]] = field(default_factory=list)   # [start, slut) 0-baserat i nuvarande flik
+    inserts: List[Tuple[int, int]] = field(default_factory=list)   # (före rad, antal) 0-baserat i nuvarande flik
+    cells: Dict[Tuple[int, int], Any] = field(default_factory=dict)  # (rad, kol) 1-baserat i önskad tabell
+    rows: int = 0   # önskat antal rader
+    cols: int = 0   # önskat antal kolumner
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.deletes or self.inserts or self.cells)
+
+    def describe(self) -> str:
+        deleted = sum(b - a for a, b in self.deletes)
+        inserted = sum(n for _, n in self.inserts)
+        touched = len({r for r, _ in self.cells})
+        return (f"{len(self.cells)} celler i {touched} rader ändrade, "
+                f"{deleted} rader borttagna, {inserted} rader infogade")
+
+
+def plan_sync(current: Sequence[Sequence[Any]], desired: Sequence[Sequence[Any]]) -> SyncPlan:
+    """Minsta ändring från current till desired: strukturella rad-operationer + cellvärden."""
+    old = [_row_key(r) for r in current]
+    new = [_row_key(r) for r in desired]
+    plan = SyncPlan(rows=len(new), cols=max((len(r) for r in new), default=0))
+
+    def diff_row(j: int, before: Tuple[str, ...], after: Tuple[str, ...]):
+        for c in range(max(len(before), len(after))):
+            a = before[c] if c < len(before) else ""
+            b = after[c] if c < len(after) else ""
+            if a != b:
+                plan.cells[(j + 1, c + 1)] = desired[j][c] if c < len(desired[j]) else ""
+
+    sm = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for op, i1, i2, j1, j2 in sm.get_opcodes():
+        if op == "equal":
+            continue
+        common = min(i2 - i1, j2 - j1) if op == "replace" else 0
+        for k in range(common):
+            diff_row(j1 + k, old[i1 + k], new[j1 + k])
+        if i2 - i1 > common:
+            if i2 == len(old):
+                # Rader efter tabellens slut töms i stället för att tas bort (fliken behåller sin storlek)
+                for i in range(i1 + common, i2):
+                    for c, value in enumerate(old[i]):
+                        if value != "":
+                            plan.cells[(_tail_row(plan, i), c + 1)] = ""
+            else:
+                plan.deletes.append((i1 + common, i2))
+        if j2 - j1 > common:
+            if i2 < len(old):
+                plan.inserts.append((i2, j2 - j1 - common))
+            for j in range(j1 + common, j2):
+                diff_row(j, (), new[j])
+    return plan
+
+def _tail_row(plan: SyncPlan, i: int) -> int:
+    """1-baserad rad i fliken efter rad-operationerna för gammal rad i (bara rader efter alla operationer)."""
+    deleted = sum(b - a for a, b in plan.deletes)
+    inserted = sum(n for _, n in plan.inserts)
+    return i - deleted + inserted + 1
+
+
+def _structure_requests(sheet_id: int, plan: SyncPlan, grid_rows: int, grid_cols: int) -> List[Dict[str, Any]]:
+    ops = [(start, "delete", end - start) for start, end in plan.deletes] + [(at, "insert", n) for at, n in plan.inserts]
+    requests = []
+    # Nerifrån och upp → index ovanför påverkas inte av tidigare operationer
+    for start, kind, n in sorted(ops, key=lambda o: (o[0], o[1] == "delete"), reverse=True):
+        rng = {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": start, "endIndex": start + n}
+        if kind == "delete":
+            requests.append({"deleteDimension": {"range": rng}})
+        else:
+            requests.append({"insertDimension": {"range": rng, "inheritFromBefore": start > 0}})
+    rows_after = grid_rows - sum(b - a for a, b in plan.deletes) + sum(n for _, n in plan.inserts)
+    needed_rows = max([plan.rows] + [r for r, _ in plan.cells])
+    if needed_rows > rows_after:
+        requests.append({"appendDimension": {"sheetId": sheet_id, "dimension": "ROWS", "length": needed_rows - rows_after}})
+    needed_cols = max([plan.cols] + [c for _, c in plan.cells])
+    if needed_cols > grid_cols:
+        requests.append({"appendDimension": {"sheetId": sheet_id, "dimension": "COLUMNS", "length": needed_cols - grid_cols}})
+    return requests
+
+
+def sync_table(sh, tab: str, desired: Sequence[Sequence[Any]], current: Optional[Sequence[Sequence[Any]]] = None,
+               writer: Optional[SheetWriter] = None, dry_run: bool = False) -> SyncPlan:
+    """Gör fliken tab lik desired med så få ändringar som möjligt; current = redan hämtad get_all_values()."""
+    ws = sh.worksheet(tab)
+    if current is None:
+        current = ws.get_all_values()
+    plan = plan_sync(current, desired)
+    if dry_run or not plan.changed:
+        return plan
+
+    requests = _structure_requests(ws.id, plan, ws.row_count, ws.col_count)
+    if requests:
+        sh.batch_update({"requests": requests})
+        notify_write(sh, tab)
+        if hasattr(sh, "refresh"):
+            sh.refresh()  # radantalet i cachade worksheet-handtag stämmer inte längre
+
+    own = writer is None
+    writer = writer or SheetWriter(sh, flush_cells=0)
+    for (row, col), value in plan.cells.items():
+        writer.set(tab, row, col, value)
+    if own:
+        writer.flush()
+    return plan
+
+
+# --------- Självtest ---------
+def _apply(grid: List[List[str]], requests, data) -> List[List[str]]:
+    """Som Sheets: struktur-anrop först, sedan värden (för självtestet)."""
+    import re
+    from sheets_client import col_number
+    grid = [list(r) for r in grid]
+    for req in requests:
+        if "deleteDimension" in req:
+            r = req["deleteDimension"]["range"]
+            del grid[r["startIndex"]:r["endIndex"]]
+        elif "insertDimension" in req:
+            r = req["insertDimension"]["range"]
+            grid[r["startIndex"]:r["startIndex"]] = [[] for _ in range(r["endIndex"] - r["startIndex"])]
+    for vr in data:
+        m = re.fullmatch(r"'?(.+?)'?!([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?", vr["range"])
+        c1, r1 = col_number(m.group(2)), int(m.group(3))
+        for dr, row in enumerate(vr["values"]):
+            while len(grid) < r1 + dr:
+                grid.append([])
+            line = grid[r1 + dr - 1]
+            for dc, value in enumerate(row):
+                while len(line) < c1 + dc:
+                    line.append("")
+                line[c1 + dc - 1] = _cell(value)
+    out = [list(_row_key(r)) for r in grid]
+    while out and not out[-1]:
+        out.pop()  # tömda rader i slutet = som om de inte fanns
+    return out
+
+def _selftest():
+    class FakeWorksheet:
+        id, title = 7, "FAQ_EN"
+
+        def __init__(self, values):
+            self.values = values
+            self.row_count, self.col_count = 1000, 26
+
+        def get_all_values(self):
+            return [list(r) for r in self.values]
+
+    class FakeSheet:
+        def __init__(self, values):
+            self.ws = FakeWorksheet(values)
+            self.requests, self.data, self.calls = [], [], 0
+
+        def worksheet(self, title):
+            return self.ws
+
+        def batch_update(self, body):
+            self.calls += 1
+            self.requests.extend(body["requests"])
+
+        def values_batch_update(self, body):
+            self.calls += 1
+            self.data.extend(body["data"])
+
+    header = ["question_en", "answer_en", "answer_full_en", "Source"]
+    current = [header] + [[f"q{i}", f"a{i}", f"a{i}", "CACHE"] for i in range(1, 301)]
+    desired = [list(r) for r in current]
+    desired[10][1] = "a10 (ny)"         # en ändrad cell
+    del desired[100:103]                # tre rader borttagna mitt i
+    desired.insert(200, ["ny", "rad", "", "OPENAI"])
+    desired[-1] = desired[-1][:2]       # tömda celler i sista raden
+    desired = desired[:-5] + [desired[-1]]  # fyra rader före slutet borta → svansen töms
+
+    ok = True
+    for name, cur, want in (("ändringar", current, desired), ("oförändrad", current, current), ("kortare", current, current[:50])):
+        sh = FakeSheet(cur)
+        plan = sync_table(sh, "FAQ_EN", want)
+        got = _apply(cur, sh.requests, sh.data)
+        good = got == [list(_row_key(r)) for r in want]
+        ok = ok and good
+        print(f"{'✅' if good else '❌'} {name}: {plan.describe()} – {sh.calls} anrop")
+    return ok
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        sys.exit(0 if _selftest() else 1)
+    print(__doc__)
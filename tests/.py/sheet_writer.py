@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sheet_writer.py
+---------------
+Buffrad cellskrivning för kalkylarken (ersätter en {"range": "FLIK!A{i}"} per cell + time.sleep(2)).
+- Cellerna samlas i minnet över valfria flikar; samma cell två gånger → sista värdet vinner
+- Vid flush slås intilliggande kolumner i en rad ihop, och rader med samma kolumnspann i följd
+  blir ETT rektangulärt block ("DA_FULL_LOOKUP!A2:A900" i stället för 899 enskilda celler)
+- Celler som inte satts skrivs aldrig över: ett hål i raden/kolumnen bryter blocket
+- Blocken packas i så få values_batch_update-anrop som gränserna tillåter (celler + ungefärlig bytestorlek);
+  för stora block delas radvis
+- Inga fasta pauser: 429/5xx ger backoff (rate_limiter.backoff_delay, eller backoff= per writer) och nytt försök
+- Med flush_cells skrivs bufferten automatiskt när den blir så stor (framsteg sparas under långa körningar)
+
+Gränser via env: SHEET_WRITER_MAX_CELLS (50000), SHEET_WRITER_MAX_BYTES (2000000),
+SHEET_WRITER_FLUSH_CELLS (5000, 0 = bara vid flush()/slutet).
+
+Exempel:
+    with SheetWriter(sh) as writer:
+        for i, word in enumerate(col, start=1):
+            writer.set("DA_FULL_LOOKUP", i, "A", word)
+            writer.set("DA_FULL_LOOKUP", i, "C", "normalized")
+    # → 2 block (A och C), ett anrop
+
+Självtest (utan nätverk):
+    python tests/.py/sheet_writer.py --selftest
+"""
+
+import os
+import re
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from rate_limiter import backoff_delay
+from sheets_client import col_letter, col_number
+
+MAX_CELLS = int(os.getenv("SHEET_WRITER_MAX_CELLS", "50000"))
+MAX_BYTES = int(os.getenv("SHEET_WRITER_MAX_BYTES", "2000000"))
+FLUSH_CELLS = int(os.getenv("SHEET_WRITER_FLUSH_CELLS", "5000"))
+RETRIES = 5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+Column = Union[int, str]
+
+# Anropas med (spreadsheet-id, flik) efter varje skrivning – t.ex. sheet_mirror som glömmer fliken
+WRITE_HOOKS: List[Callable[[str, str], None]] = []
+
+def notify_write(sh, tab: str):
+    for hook in WRITE_HOOKS:
+        hook(getattr(sh, "id", ""), tab)
+
+
+def a1_range(tab: str, row1: int, col1: int, row2: int, col2: int) -> str:
+    quoted = tab if re.fullmatch(r"\w+", tab) else "'" + tab.replace("'", "''") + "'"
+    start, end = f"{col_letter(col1)}{row1}", f"{col_letter(col2)}{row2}"
+    return f"{quoted}!{start}" if start == end else f"{quoted}!{start}:{end}"
+
+
+def coalesce(cells: Dict[Tuple[int, int], Any]) -> List[Tuple[int, int, int, int, List[List[Any]]]]:
+    """{(rad, kol): värde} → rektanglar (rad1, kol1, rad2, kol2, värden) utan att täcka osatta celler."""
+    # 1) Kolumnspann per rad
+    runs: List[Tuple[int, int, int]] = []  # (kol1, kol2, rad)
+    for (row, col) in sorted(cells):
+        if runs and runs[-1][2] == row and runs[-1][1] == col - 1:
+            runs[-1] = (runs[-1][0], col, row)
+        else:
+            runs.append((col, col, row))
+    # 2) Samma spann i rader i följd → ett block
+    blocks: List[List[int]] = []  # [rad1, kol1, rad2, kol2]
+    for c1, c2, row in sorted(runs):
+        last = blocks[-1] if blocks else None
+        if last and last[1] == c1 and last[3] == c2 and last[2] == row - 1:
+            last[2] = row
+        else:
+            blocks.append([row, c1, row, c2])
+    blocks.sort()
+    return [
+        (r1, c1, r2, c2, [[cells[(r, c)] for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)])
+        for r1, c1, r2, c2 in blocks
+    ]
+
+
+def _status(err: BaseException) -> Optional[int]:
+    resp = getattr(err, "response", None)
+    return getattr(resp, "status_code", None) or getattr(err, "status_code", None) or getattr(err, "code", None)
+
+
+class SheetWriter:
+    """Samlar celländringar och skriver dem som sammanslagna block via sh.values_batch_update."""
+
+    def __init__(self, sh, value_input_option: str = "USER_ENTERED", max_cells: int = MAX_CELLS,
+                 max_bytes: int = MAX_BYTES, flush_cells: int = FLUSH_CELLS,
+                 backoff: Optional[Callable[[int], float]] = None):
+        self.sh = sh
+        self.backoff = backoff or backoff_delay  # attempt → sekunder (kortare i tester/självtest)
+        self.value_input_option = value_input_option
+        self.max_cells = max_cells
+        self.max_bytes = max_bytes
+        self.flush_cells = flush_cells
+        self.pending: Dict[str, Dict[Tuple[int, int], Any]] = {}
+        self.stats = {"cells": 0, "ranges": 0, "calls": 0, "retries": 0}
+
+    def __enter__(self) -> "SheetWriter":
+        return self
+
+    def __exit__(self, *exc):
+        # Även vid fel: det som redan är klart ska sparas
+        self.flush()
+
+    def __len__(self) -> int:
+        return sum(len(cells) for cells in self.pending.values())
+
+    # --------- Buffra ---------
+    def set(self, tab: str, row: int, col: Column, value: Any):
+        """En cell (rad 1-baserad, kolumn som bokstav eller 1-baserat tal)."""
+        self.pending.setdefault(tab, {})[(row, col_number(col))] = value
+        if self.flush_cells and len(self) >= self.flush_cells:
+            self.flush()
+
+    def set_row(self, tab: str, row: int, values: Union[Dict[Column, Any], Iterable[Any]], start: Column = 1):
+        """Flera celler i samma rad: {"A": x, "C": y} eller en lista från kolumn start."""
+        items = values.items() if isinstance(values, dict) else enumerate(values, start=col_number(start))
+        for col, value in items:
+            self.set(tab, row, col, value)
+
+    def set_column(self, tab: str, col: Column, values: Iterable[Any], start_row: int = 1):
+        for row, value in enumerate(values, start=start_row):
+            self.set(tab, row, col, value)
+
+    # --------- Skriva ---------
+    def value_ranges(self) -> List[Dict[str, Any]]:
+        """Alla väntande celler som ValueRange-objekt (block delas radvis om de är större än max_cells)."""
+        out = []
+        for tab, cells in self.pending.items():
+            for r1, c1, r2, c2, values in coalesce(cells):
+                step = max(1, self.max_cells // (c2 - c1 + 1))
+                for k in range(0, len(values), step):
+                    part = values[k:k + step]
+                    out.append({
+                        "range": a1_range(tab, r1 + k, c1, r1 + k + len(part) - 1, c2),
+                        "majorDimension": "ROWS",
+                        "values": part,
+                    })
+        return out
+
+    def _calls(self, ranges: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        calls, current, cells, size = [], [], 0, 0
+        for vr in ranges:
+            n = sum(len(r) for r in vr["values"])
+            b = len(json.dumps(vr, ensure_ascii=False).encode("utf-8"))
+            if current and (cells + n > self.max_cells or size + b > self.max_bytes):
+                calls.append(current)
+                current, cells, size = [], 0, 0
+            current.append(vr)
+            cells += n
+            size += b
+        if current:
+            calls.append(current)
+        return calls
+
+    def _send(self, data: List[Dict[str, Any]]):
+        body = {"valueInputOption": self.value_input_option, "data": data}
+        for attempt in range(RETRIES + 1):
+            try:
+                return self.sh.values_batch_update(body)
+            except Exception as e:
+                if _status(e) not in RETRY_STATUS or attempt == RETRIES:
+                    raise
+                self.stats["retries"] += 1
+                delay = self.backoff(attempt)
+                print(f"⏳ Sheets svarade {_status(e)} – nytt försök om {delay:.1f}s")
+                time.sleep(delay)
+
+    def flush(self) -> int:
+        """Skriver allt som väntar; returnerar antal anrop."""
+        if not self.pending:
+            return 0
+        cells = len(self)
+        ranges = self.value_ranges()
+        calls = self._calls(ranges)
+        for data in calls:
+            self._send(data)
+            self.stats["calls"] += 1
+        for tab in self.pending:
+            notify_write(self.sh, tab)
+        self.pending.clear()
+        self.stats["cells"] += cells
+        self.stats["ranges"] += len(ranges)
+        print(f"💾 Skrev {cells} celler som {len(ranges)} block i {len(calls)} anrop")
+        return len(calls)
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"{s['cells']} celler, {s['ranges']} block, {s['calls']} anrop" + (f", {s['retries']} omförsök" if s["retries"] else "")
+
+
+# --------- Självtest ---------
+def _selftest():
+    """Skrivmönstret från translate_en_to_da_de.py (A+C per rad, två flikar) + hål + överskrivning."""
+
+    class FakeSheet:
+        def __init__(self):
+            self.calls = []
+            self.grid: Dict[Tuple[str, int, int], Any] = {}
+            self.fail_next = 1
+
+        def values_batch_update(self, body):
+            if self.fail_next:
+                self.fail_next -= 1
+                err = Exception("rate limited")
+                err.code = 429
+                raise err
+            self.calls.append(body)
+            for vr in body["data"]:
+                m = re.fullmatch(r"'?(.+?)'?!([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?", vr["range"])
+                tab, c1, r1 = m.group(1), col_number(m.group(2)), int(m.group(3))
+                for dr, row in enumerate(vr["values"]):
+                    for dc, value in enumerate(row):
+                        self.grid[(tab, r1 + dr, c1 + dc)] = value
+
+    sh = FakeSheet()
+    expected = {}
+    with SheetWriter(sh, flush_cells=0, max_cells=1000, backoff=lambda attempt: 0.01) as writer:
+        for i in range(1, 901):
+            if i == 450:
+                continue  # hål – rad 450 får inte skrivas
+            for tab in ("DA_FULL_LOOKUP", "DE_FULL_LOOKUP"):
+                writer.set_row(tab, i, {"A": f"{tab[:2]}{i}", "C": "dictionary"})
+                expected[(tab, i, 1)] = f"{tab[:2]}{i}"
+                expected[(tab, i, 3)] = "dictionary"
+        writer.set("DA_FULL_LOOKUP", 5, "A", "sista")
+        expected[("DA_FULL_LOOKUP", 5, 1)] = "sista"
+        writer.set_row("FAQ EN", 2, ["q", "a", "af", "OPENAI"])
+        for k, v in enumerate(["q", "a", "af", "OPENAI"], start=1):
+            expected[("FAQ EN", 2, k)] = v
+    ok = sh.grid == expected
+    old_calls = -(-len(expected) // 40)  # 20 rader × 2 celler per anrop förut
+    print(f"{'✅' if ok else '❌'} {len(expected)} celler: {writer.summary()} (förut ~{old_calls} anrop + {old_calls * 2}s sömn)")
+    return ok and writer.stats["calls"] <= 4
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        sys.exit(0 if _selftest() else 1)
+    print(__doc__)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sheets_client.py
+----------------
+Delad Google Sheets-åtkomst för skripten (ersätter creds-blocket + open_by_key i varje skript).
+- Lat inloggning: ingenting händer vid import – första anropet mot arket loggar in och öppnar det
+- En inloggning per process: samma credentials/HTTP-session (keep-alive, större anslutningspool) för alla ark
+- Token återanvänds inom processen (förnyas automatiskt av google-auth när den löper ut under en lång körning)
+- Valfritt (SHEETS_TOKEN_CACHE=sökväg): access-token sparas i en fil och återanvänds av nästa körning tills den
+  går ut. OBS: filen innehåller en giltig bearer-token i klartext – den som kan läsa filen når arken med
+  servicekontots behörighet i upp till en timme. Lägg den utanför delade kataloger/repot; av som default
+- Flikar: ETT metadataanrop ger alla worksheet-handtag; sh.worksheet(namn) slår sedan upp i minnet
+  i stället för att hämta metadata för varje flik
+- Allt annat (values_batch_update, batch_update …) skickas vidare till gspreads Spreadsheet
+- A1-hjälp för skripten som bygger egna intervall: col_letter(27) → "AA", col_number("AA") → 27
+
+Miljö (.env.local): SHEET_ID_MAIN, GCP_PROJECT_ID, GCP_CLIENT_EMAIL, GCP_PRIVATE_KEY.
+SHEETS_TOKEN_CACHE (tokenfil, default tom = ingen fil), SHEETS_POOL_SIZE (default 10).
+
+Exempel:
+    from sheets_client import open_spreadsheet
+    sh = open_spreadsheet()              # SHEET_ID_MAIN, inget nätverksanrop än
+    ws = sh.worksheet("FAQ_SE")          # loggar in, öppnar arket, hämtar flikarna en gång
+    ws_en = sh.worksheet("FAQ_EN")       # ur minnet
+
+Flikar i arket (ersätter list_sheets.py):
+    python tests/.py/sheets_client.py
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(".env.local")
+except Exception:
+    pass
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+TOKEN_CACHE = os.getenv("SHEETS_TOKEN_CACHE", "")  # opt-in: token i klartext på disk
+POOL_SIZE = int(os.getenv("SHEETS_POOL_SIZE", "10"))
+TOKEN_MARGIN = timedelta(minutes=5)  # token som går ut inom marginalen återanvänds inte
+
+
+def credentials_from_env() -> dict:
+    """Service account-info från miljön (samma fält som skripten tidigare byggde själva)."""
+    email = os.getenv("GCP_CLIENT_EMAIL")
+    key = os.getenv("GCP_PRIVATE_KEY")
+    if not email or not key:
+        raise RuntimeError("❌ GCP_CLIENT_EMAIL/GCP_PRIVATE_KEY saknas i .env.local")
+    return {
+        "type": "service_account",
+        "project_id": os.getenv("GCP_PROJECT_ID") or "dummy",
+        "private_key_id": "dummy",
+        "private_key": key.replace("\\n", "\n"),
+        "client_email": email,
+        "client_id": "dummy",
+        "token_uri": TOKEN_URI,
+    }
+
+
+# --------- A1-notation ---------
+def col_letter(n: int) -> str:
+    """1 → A, 27 → AA."""
+    s = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+def col_number(col: Union[int, str]) -> int:
+    """"A" → 1, "AA" → 27; heltal returneras som de är."""
+    if isinstance(col, int):
+        return col
+    n = 0
+    for ch in col.strip().upper():
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+# --------- Token-cache ---------
+def _load_token(credentials, path: str, email: str) -> bool:
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("client_email") != email:
+            return False
+        expiry = datetime.utcfromtimestamp(float(data["expiry"]))
+    except Exception:
+        return False
+    if expiry - TOKEN_MARGIN <= datetime.utcnow():
+        return False
+    credentials.token = data["token"]
+    credentials.expiry = expiry
+    return True
+
+def _save_token(credentials, path: str, email: str):
+    if not path or not credentials.token or not credentials.expiry:
+        return
+    expiry = (credentials.expiry - datetime(1970, 1, 1)).total_seconds()
+    tmp = path + ".tmp"
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"client_email": email, "token": credentials.token, "expiry": expiry}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+# --------- Klient ---------
+class SheetsClient:
+    """En inloggning + HTTP-session per process; arken öppnas lat och cachas per id."""
+
+    def __init__(self, info: Optional[dict] = None, token_cache: str = TOKEN_CACHE, pool_size: int = POOL_SIZE):
+        self._info = info
+        self.token_cache = token_cache
+        self.pool_size = pool_size
+        self._gc = None
+        self._sheets: Dict[str, "LazySpreadsheet"] = {}
+        self._lock = threading.Lock()
+        self.stats = {"auth": 0, "token_cache": 0, "open": 0, "metadata": 0}
+
+    @property
+    def gc(self):
+        """gspread-klienten; första åtkomsten loggar in (eller återanvänder cachad token)."""
+        if self._gc is None:
+            with self._lock:
+                if self._gc is None:
+                    self._gc = self._connect()
+        return self._gc
+
+    def _connect(self):
+        import gspread
+        from google.oauth2.service_account import Credentials
+        from google.auth.transport.requests import Request
+        from requests.adapters import HTTPAdapter
+
+        info = self._info or credentials_from_env()
+        credentials = Credentials.from_service_account_info(info, scopes=gspread.auth.DEFAULT_SCOPES)
+        gc = gspread.authorize(credentials)
+        # gspread 6: gc.http_client.session, gspread 5: gc.session (båda AuthorizedSession)
+        session = getattr(getattr(gc, "http_client", None), "session", None) or getattr(gc, "session", None)
+        if session is not None:
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+
+        email = info["client_email"]
+        if _load_token(credentials, self.token_cache, email):
+            self.stats["token_cache"] += 1
+        else:
+            t0 = time.perf_counter()
+            credentials.refresh(Request(session) if session is not None else Request())
+            self.stats["auth"] += 1
+            _save_token(credentials, self.token_cache, email)
+            print(f"🔐 Inloggad som {email} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+        return gc
+
+    def spreadsheet(self, key: Optional[str] = None) -> "LazySpreadsheet":
+        # Saknat id märks först när arket används (skripten går att importera utan .env.local)
+        key = key or os.getenv("SHEET_ID_MAIN")
+        with self._lock:
+            if key not in self._sheets:
+                self._sheets[key] = LazySpreadsheet(self, key)
+            return self._sheets[key]
+
+
+class LazySpreadsheet:
+    """gspread.Spreadsheet som öppnas vid första användning och håller alla worksheet-handtag i minnet."""
+
+    def __init__(self, client: SheetsClient, key: str):
+        self.client = client
+        self.key = key
+        self._sh = None
+        self._tabs: Optional[Dict[str, object]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def spreadsheet(self):
+        if self._sh is None:
+            if not self.key:
+                raise RuntimeError("❌ SHEET_ID_MAIN saknas i .env.local")
+            with self._lock:
+                if self._sh is None:
+                    self._sh = self.client.gc.open_by_key(self.key)
+                    self.client.stats["open"] += 1
+        return self._sh
+
+    @property
+    def id(self) -> str:
+        return self.key
+
+    def _load_tabs(self) -> Dict[str, object]:
+        tabs = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        self.client.stats["metadata"] += 1
+        self._tabs = tabs
+        return tabs
+
+    def worksheets(self) -> List[object]:
+        tabs = self._tabs if self._tabs is not None else self._load_tabs()
+        return list(tabs.values())
+
+    def worksheet(self, title: str):
+        """Fliken ur minnet; okänd titel → metadata hämtas om en gång (fliken kan ha skapats utifrån)."""
+        tabs = self._tabs if self._tabs is not None else self._load_tabs()
+        if title not in tabs:
+            tabs = self._load_tabs()
+        if title not in tabs:
+            import gspread
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return tabs[title]
+
+    def refresh(self):
+        """Glöm flikarna (t.ex. efter ändringar gjorda i webbläsaren)."""
+        self._tabs = None
+
+    def add_worksheet(self, title: str, *args, **kwargs):
+        ws = self.spreadsheet.add_worksheet(title, *args, **kwargs)
+        if self._tabs is not None:
+            self._tabs[ws.title] = ws
+        return ws
+
+    def del_worksheet(self, worksheet):
+        res = self.spreadsheet.del_worksheet(worksheet)
+        if self._tabs is not None:
+            self._tabs.pop(worksheet.title, None)
+        return res
+
+    def duplicate_sheet(self, *args, **kwargs):
+        ws = self.spreadsheet.duplicate_sheet(*args, **kwargs)
+        self._tabs = None
+        return ws
+
+    def __getattr__(self, name):
+        # Bara attribut som inte finns här (values_batch_update, batch_update, title …)
+        return getattr(self.spreadsheet, name)
+
+
+_default: Optional[SheetsClient] = None
+
+def get_client() -> SheetsClient:
+    global _default
+    if _default is None:
+        _default = SheetsClient()
+    return _default
+
+def open_spreadsheet(key: Optional[str] = None) -> LazySpreadsheet:
+    """Arket med id key (default SHEET_ID_MAIN) via den delade klienten – öppnas först när det används."""
+    return get_client().spreadsheet(key)
+
+
+# --------- CLI ---------
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sheet", help="spreadsheet-id (default SHEET_ID_MAIN)")
+    args = parser.parse_args()
+
+    key = args.sheet or os.getenv("SHEET_ID_MAIN")
+    print("📌 Spreadsheet ID:", key)
+    print("📌 Servicekonto:", os.getenv("GCP_CLIENT_EMAIL"))
+    t0 = time.perf_counter()
+    try:
+        sh = open_spreadsheet(key)
+        tabs = sh.worksheets()
+    except Exception as e:
+        print("❌ Kunde inte öppna arket!")
+        print("Felmeddelande:", e)
+        print(f"Dela arket med servicekontot och kontrollera https://docs.google.com/spreadsheets/d/{key}/edit")
+        raise SystemExit(1)
+    print(f"✅ {len(tabs)} flikar ({(time.perf_counter() - t0) * 1000:.0f} ms, {get_client().stats}):")
+    for ws in tabs:
+        print("-", ws.title)
+
+if __name__ == "__main__":
+    main()
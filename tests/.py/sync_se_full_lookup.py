@@ -1,8 +1,8 @@
 import os
 import sys
 import csv
-import gspread
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
 
 # ----------------------------
 # Konfig
@@ -15,11 +15,6 @@ SOURCE_LABEL = "MERGED"
 # CLI: tillåt valfri CSV-sökväg, default "data/faq_keywords_se_corrected.csv"
 INPUT_CSV = sys.argv[1] if len(sys.argv) > 1 else "data/faq_keywords_se_corrected.csv"
 
-# Service account creds
-GCP_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_KEY = (os.getenv("GCP_PRIVATE_KEY") or "").replace("\\n", "\n")
-GCP_PROJECT = os.getenv("GCP_PROJECT_ID")
-
 # ----------------------------
 # Hjälpfunktioner
 # ----------------------------
@@ -95,18 +90,7 @@ def main():
             seen.add(key)
             csv_words.append(w)
 
-    # Anslut Sheets
-    creds = {
-        "type": "service_account",
-        "project_id": GCP_PROJECT or "dummy",
-        "private_key_id": "dummy",
-        "private_key": GCP_KEY,
-        "client_email": GCP_EMAIL,
-        "client_id": "dummy",
-        "token_uri": "https://oauth2.googleapis.com/token"
-    }
-    gc = gspread.service_account_from_dict(creds)
-    sh = gc.open_by_key(SPREADSHEET_ID)
+    sh = open_spreadsheet(SPREADSHEET_ID)
     ws = sh.worksheet(SE_SHEET)
 
     # Läs befintliga kolumner
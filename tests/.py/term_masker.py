@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+term_masker.py
+--------------
+Skyddar serie- och färgnamn med platshållare i stället för att hoppa över hela texten.
+- load_protected_terms(): DO_NOT_TRANSLATE från faq_colors_from_pronto_se_v2.json (serier + färger), en gemensam tolkning
+- TermMasker: Aho-Corasick-automat över alla termer → alla träffar i ett linjärt pass, O(len(text))
+- Hela ord, längsta träff först ("Sarawa Chevry" före "Sarawa"); skiftlägeskänsligt som standard
+- mask() byter termerna mot [[T1]], [[T2]] …; unmask() sätter tillbaka dem och kontrollerar att
+  varje platshållare finns exakt en gång – annars None (översätt utan maskning i stället)
+- Generiska färgord (catalog_templates.COLOR_WORDS: Grå, Svart …) maskas inte – de ska översättas
+
+Exempel:
+    masker = TermMasker(load_protected_terms())
+    masked, terms = masker.mask("Lava finns i Etna och Salina.")
+    # "[[T1]] finns i [[T2]] och [[T3]]."
+    translated = masker.unmask(llm(masked), terms)
+
+Rapport på en korpus:
+    python tests/.py/term_masker.py --corpus faq-extended/faq_multilang_preview.json
+"""
+
+import os
+import re
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog_templates import COLOR_WORDS
+
+COLORS_FILE = os.path.join("faq-extended", "faq_colors_from_pronto_se_v2.json")
+# Manuella undantag utöver det som står i JSON-filen
+EXTRA_TERMS = {"Konjak"}
+
+PLACEHOLDER = "[[T{n}]]"
+_PLACEHOLDER_RX = re.compile(r"\[\[T(\d+)\]\]")
+
+PLACEHOLDER_PROMPT = (
+    "Placeholders like [[T1]] are product series or color names: "
+    "copy every placeholder exactly once and unchanged."
+)
+
+
+# --------- Termlista ---------
+def load_protected_terms(path: str = COLORS_FILE, extra: Iterable[str] = EXTRA_TERMS) -> Set[str]:
+    """Serier (ur "… i serien X?") och färger (ur "- Färg (ton) – format: …") i original-skiftläge."""
+    terms = set(extra)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ Hittade inte {path} – fortsätter utan skyddad lista.")
+        return terms
+    for item in data:
+        q = item.get("question_se", "")
+        if "serien" in q:
+            serie = q.split("serien")[-1].strip(" ?")
+            if serie:
+                terms.add(serie)
+        # Äldre exporter har "\\n" i stället för radbrytningar
+        a = item.get("answer_se", "").replace("\\n", "\n")
+        for line in a.split("\n"):
+            if line.strip().startswith("-"):
+                color = line.split("(")[0].split("–")[0].strip("- ").strip()
+                if color:
+                    terms.add(color)
+    return terms
+
+
+# --------- Automat ---------
+def _fold(text: str) -> str:
+    """Gemener tecken för tecken utan att ändra längden (positionerna måste stämma)."""
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class TermMasker:
+    def __init__(self, terms: Iterable[str], ignore_case: bool = False, skip: Iterable[str] = COLOR_WORDS):
+        skip = {s.lower() for s in skip}
+        self.ignore_case = ignore_case
+        self.terms = sorted({t.strip() for t in terms if t and t.strip() and t.strip().lower() not in skip})
+        # Trie: _goto[nod] = {tecken: nod}, _out[nod] = längder på termer som slutar här (via fail-länkar)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for term in self.terms:
+            self._add(self._key(term))
+        self._build()
+
+    def _key(self, text: str) -> str:
+        return _fold(text) if self.ignore_case else text
+
+    def _add(self, term: str):
+        node = 0
+        for c in term:
+            nxt = self._goto[node].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if len(term) not in self._out[node]:
+            self._out[node].append(len(term))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                fc = self._goto[f].get(c, 0)
+                self._fail[child] = fc if fc != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    # --------- Sökning ---------
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """(start, slut) för icke-överlappande helordsträffar, längsta träff först vid samma start."""
+        if not isinstance(text, str) or not text or not self.terms:
+            return []
+        key = self._key(text)
+        n = len(key)
+        best: Dict[int, int] = {}
+        node = 0
+        for i, c in enumerate(key):
+            while node and c not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(c, 0)
+            end = i + 1
+            if end < n and _is_word_char(key[end]):
+                continue
+            for length in self._out[node]:
+                start = end - length
+                if start > 0 and _is_word_char(key[start - 1]):
+                    continue
+                if best.get(start, 0) < end:
+                    best[start] = end
+        spans = []
+        pos = 0
+        for start in sorted(best):
+            if start >= pos:
+                spans.append((start, best[start]))
+                pos = best[start]
+        return spans
+
+    def contains(self, text: str) -> bool:
+        return bool(self.find(text))
+
+    def is_term(self, text: str) -> bool:
+        """Hela texten är en skyddad term (t.ex. ett keyword som bara är ett serienamn)."""
+        if not isinstance(text, str):
+            return False
+        stripped = text.strip()
+        return self.find(stripped) == [(0, len(stripped))] if stripped else False
+
+    # --------- Maskning ---------
+    def mask(self, text: str) -> Tuple[str, List[str]]:
+        """Returnerar (maskerad text, termer) där termer[k] hör till [[T{k+1}]]."""
+        spans = self.find(text)
+        if not spans or _PLACEHOLDER_RX.search(text):
+            return text, []
+        out, terms = [], []
+        pos = 0
+        for start, end in spans:
+            out.append(text[pos:start])
+            terms.append(text[start:end])
+            out.append(PLACEHOLDER.format(n=len(terms)))
+            pos = end
+        out.append(text[pos:])
+        return "".join(out), terms
+
+    @staticmethod
+    def only_terms(masked: str) -> bool:
+        """Inget kvar att översätta när platshållarna tas bort (inga bokstäver)."""
+        return not re.search(r"[^\W\d_]", _PLACEHOLDER_RX.sub("", masked))
+
+    @staticmethod
+    def verify(translated: str, terms: List[str]) -> bool:
+        if not isinstance(translated, str):
+            return False
+        found = [int(n) for n in _PLACEHOLDER_RX.findall(translated)]
+        return sorted(found) == list(range(1, len(terms) + 1))
+
+    @classmethod
+    def unmask(cls, translated: str, terms: List[str]) -> Optional[str]:
+        """Sätter tillbaka termerna; None om modellen tappat, dubblerat eller hittat på platshållare."""
+        if not terms:
+            return translated
+        if not cls.verify(translated, terms):
+            return None
+        return _PLACEHOLDER_RX.sub(lambda m: terms[int(m.group(1)) - 1], translated)
+
+
+# --------- Rapport ---------
+def main():
+    import time
+    import argparse
+    from migrate_translation_caches import DEFAULT_CORPUS, CORPUS_FIELDS, load_rows
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--terms", default=COLORS_FILE, help="JSON med serier/färger")
+    args = parser.parse_args()
+
+    terms = load_protected_terms(args.terms)
+    t0 = time.perf_counter()
+    masker = TermMasker(terms)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    texts = [r[f] for r in load_rows(args.corpus) for f in CORPUS_FIELDS if isinstance(r.get(f), str) and r[f].strip()]
+    t0 = time.perf_counter()
+    hits = masked = only = 0
+    for text in texts:
+        m, found = masker.mask(text)
+        if found:
+            hits += 1
+            if masker.only_terms(m):
+                only += 1
+            else:
+                masked += 1
+            assert masker.unmask(m, found) == text
+    scan_ms = (time.perf_counter() - t0) * 1000
+    # Gamla sättet: "if word in text" för varje ord → hela texten hoppades över
+    t0 = time.perf_counter()
+    old = sum(1 for text in texts if any(w in text for w in terms))
+    old_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"🚫 {len(terms)} skyddade termer → {len(masker)} i automaten ({len(masker._goto)} noder, {build_ms:.1f} ms)")
+    print(f"📊 {args.corpus}: {len(texts)} texter")
+    print(f"   förr: {old} texter skickades oöversatta (delsträngsträff), {old_ms:.1f} ms")
+    print(f"   nu:   {masked} maskeras och översätts, {only} är bara termer, {scan_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
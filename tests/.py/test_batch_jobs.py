@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_batch_jobs.py
+------------------
+BatchRunner mot LocalBatchBackend (openai_stub_server i processen, inga anrop utåt).
+"""
+
+from batch_jobs import BatchRunner, get_backend, parse_output
+
+REQUESTS = {
+    "SE-EN-1": {"meta": ["SE", "EN", "Hej"], "messages": [{"role": "user", "content": "Translate into English:\n\nHej"}]},
+}
+
+
+def _runner(tmp_path):
+    return BatchRunner(str(tmp_path / "state.json"), get_backend("local", directory=str(tmp_path / "local")))
+
+
+def test_phase_is_collected_only_after_mark_collected(tmp_path):
+    runner = _runner(tmp_path)
+    assert runner.step("SE-EN", REQUESTS, "gpt-4o") is None      # skickat, inte hämtat än
+    first = runner.step("SE-EN", REQUESTS, "gpt-4o")
+    assert set(first) == {"SE-EN-1"} and first["SE-EN-1"]
+
+    # Krasch innan resultaten sparades: nästa körning hämtar samma jobb igen i stället för att skicka nytt
+    again = _runner(tmp_path)
+    job_id = again.phase("SE-EN")["job_id"]
+    assert again.step("SE-EN", REQUESTS, "gpt-4o") == first
+    assert again.phase("SE-EN")["job_id"] == job_id
+
+    again.mark_collected("SE-EN")
+    assert _runner(tmp_path).step("SE-EN", REQUESTS, "gpt-4o") is None
+    assert _runner(tmp_path).phase("SE-EN")["job_id"] != job_id
+
+
+def test_parse_output_marks_errors():
+    ok = '{"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": " Hi "}}]}}}'
+    bad = '{"custom_id": "b", "response": {"status_code": 500, "body": {}}}'
+    assert parse_output("\n".join([ok, bad, "inte json"])) == {"a": "Hi", "b": None}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_batch_packer.py
+--------------------
+Tokenbudget per anrop (uppskattning utan tiktoken) och packade batchanrop i ordning.
+"""
+
+import json
+import asyncio
+
+import pytest
+
+import batch_packer
+from batch_packer import ITEM_OVERHEAD, estimate_tokens, output_budget, pack_batches
+from batch_translate import batch_complete_packed
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken(monkeypatch):
+    # ≈ tecken/3.5 → samma siffror oavsett om tiktoken är installerat
+    monkeypatch.setattr(batch_packer, "tiktoken", None)
+
+
+def test_estimate_without_tiktoken():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 35) == 10
+
+
+def test_batches_stay_within_budget():
+    texts = ["fog", "alger", "x" * 350, "plattor", "y" * 2000, "sand"]
+    groups = pack_batches(texts, max_input_tokens=120, max_output_tokens=1000, solo_tokens=400)
+    assert sorted(i for g in groups for i in g) == list(range(len(texts)))
+    assert [4] in groups                                   # större än solo → eget anrop
+    for g in groups:
+        if len(g) > 1:
+            assert sum(estimate_tokens(texts[i]) + ITEM_OVERHEAD for i in g) <= 120
+    # Korta poster åker tillsammans
+    assert any({0, 1, 3, 5} <= set(g) for g in groups)
+
+
+def test_max_items_and_output_ratio_split_groups():
+    words = ["ord"] * 10
+    assert [len(g) for g in pack_batches(words, max_items=4)] == [4, 4, 2]
+    size = estimate_tokens("ord") + ITEM_OVERHEAD
+    # Utbudgeten räknas med ratio: 3 poster × 9 × 2.0 = 54 > 40 → högst 2 per anrop
+    assert max(len(g) for g in pack_batches(words, max_output_tokens=4 * size, output_ratio=2.0)) == 2
+    assert output_budget(["ord", "ord"], output_ratio=1.0) == 2 * size + 64
+
+
+def test_packed_results_come_back_in_input_order():
+    class Echo:
+        model = "gpt-4o"
+        calls = 0
+
+        async def complete(self, messages, **kwargs):
+            Echo.calls += 1
+            items = json.loads(messages[-1]["content"].split("Items:\n", 1)[1])
+            assert kwargs["max_tokens"] >= 64
+            return json.dumps({"items": {k: v.upper() for k, v in items.items()}})
+
+    texts = [" ".join(["lång"] * 600), "fog", "alger", "sand"]
+    out = asyncio.run(batch_complete_packed(Echo(), texts, "Upper", budget={"max_items": 2}))
+    assert out == [t.upper() for t in texts]
+    assert Echo.calls == 3
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_batch_translate.py
+-----------------------
+Id-taggade batchanrop: bara saknade id:n skickas om, inget fylls i tyst; en FAQ-rads fält (till ett eller
+flera språk) i ett anrop.
+"""
+
+import json
+import asyncio
+
+from batch_translate import (batch_complete, batch_complete_list, parse_response, translate_fields,
+                             translate_multi)
+
+
+class ScriptedEngine:
+    """engine.complete som svarar med nästa färdiga svar och sparar vilka id:n som skickades."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.sent = []
+
+    async def complete(self, messages, **kwargs):
+        payload = messages[-1]["content"].split("Items:\n", 1)[1]
+        self.sent.append(sorted(json.loads(payload)))
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply if isinstance(reply, str) else json.dumps({"items": reply})
+
+
+def test_parse_response_accepts_only_known_nonempty_ids():
+    raw = json.dumps({"items": {"1": " Grey ", "2": "", "3": 7, "9": "extra", " 4 ": "White"}})
+    assert parse_response(raw, ["1", "2", "3", "4"]) == {"1": "Grey", "4": "White"}
+    assert parse_response(json.dumps({"1": "Grey"}), ["1"]) == {"1": "Grey"}   # utan "items"-omslag
+    assert parse_response("inte json", ["1"]) == {}
+
+
+def test_missing_ids_are_resent_alone():
+    engine = ScriptedEngine({"1": "Grey", "3": "Black"}, {"2": "White"})
+    out = asyncio.run(batch_complete(engine, {"1": "Grå", "2": "Vit", "3": "Svart"}, "Translate"))
+    assert out == {"1": "Grey", "2": "White", "3": "Black"}
+    assert engine.sent == [["1", "2", "3"], ["2"]]
+
+
+def test_ids_still_missing_after_all_rounds_are_none():
+    engine = ScriptedEngine({"1": "Grey"}, RuntimeError("500"), "{}")
+    out = asyncio.run(batch_complete_list(engine, ["Grå", "Vit"], "Translate", rounds=3))
+    assert out == ["Grey", None]
+    assert engine.sent == [["1", "2"], ["2"], ["2"]]
+
+
+def test_translate_fields_one_call_per_row_missing_field_none():
+    engine = ScriptedEngine({"question": "Which colours?", "answer": "Grey"})
+    fields = {"question": "Vilka färger?", "answer": "Grå", "answer_full": "Grå och vit."}
+    out = asyncio.run(translate_fields(engine, fields, "Swedish", "English"))
+    assert out == {"question": "Which colours?", "answer": "Grey", "answer_full": None}
+    assert engine.sent == [["answer", "answer_full", "question"]]   # ett varv: anroparen faller tillbaka per fält
+
+
+class SwedishLeft:
+    """Underkänner svar som fortfarande innehåller svenska "och"."""
+
+    def needs_retry(self, text, target, source):
+        return " och " in f" {text} "
+
+
+def test_translate_multi_validates_each_language_separately():
+    reply = json.dumps({"translations": {
+        "en": {"question": "Which colours?", "answer": "Grey and white"},
+        "DA": {"question": "Hvilke farver?", "answer": "Grå och vit"},   # kvar på svenska
+        "DE": "trasigt",
+    }})
+    engine = ScriptedEngine(reply)
+    fields = {"question": "Vilka färger?", "answer": "Grå och vit"}
+    targets = {"EN": "English", "DA": "Danish", "DE": "German"}
+    out = asyncio.run(translate_multi(engine, fields, "Swedish", targets, verifier=SwedishLeft()))
+    assert out == {
+        "EN": {"question": "Which colours?", "answer": "Grey and white"},
+        "DA": {"question": "Hvilke farver?", "answer": None},
+        "DE": {"question": None, "answer": None},
+    }
+    assert len(engine.sent) == 1
+
+
+def test_translate_multi_failed_call_returns_all_none():
+    engine = ScriptedEngine(RuntimeError("timeout"))
+    out = asyncio.run(translate_multi(engine, {"q": "Fråga"}, "Swedish", {"EN": "English"}, verifier=SwedishLeft()))
+    assert out == {"EN": {"q": None}}
+
+
+def _root_keywords_script():
+    import importlib.util
+    import os
+    import pytest
+    for package in ("pandas", "openpyxl", "dotenv", "openai"):
+        pytest.importorskip(package)
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "translate_keywords.py")
+    spec = importlib.util.spec_from_file_location("translate_keywords_root", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_keyword_missing_from_reply_stays_empty(monkeypatch):
+    script = _root_keywords_script()
+    sent = []
+
+    async def fake_translate_list(engine, words, src, tgt, **kwargs):
+        return ["algae", None]
+
+    async def fake_packed(engine, words, instructions, **kwargs):
+        sent.append(list(words))
+        return ["seaweed" for _ in words]
+
+    monkeypatch.setattr(script, "translate_list", fake_translate_list)
+    monkeypatch.setattr(script, "batch_complete_packed", fake_packed)
+    en = asyncio.run(script.translate_batch(["alger", "fog"], "English"))
+    assert en == ["algae", ""]   # inte det svenska ordet
+    assert asyncio.run(script.generate_synonyms_batch(en, "English")) == ["seaweed", ""]
+    assert sent == [["algae"]]   # tom översättning skickas inte
+    assert script.make_check("fog", "", "fuge", "Fuge") == "NEED_CHECK"
+    assert script.make_check("fog", "fog", "fuge", "Fuge") == "NEED_CHECK"
+    assert script.make_check("alger", "algae", "alger ", "Algen") == "NEED_CHECK"
+    assert script.make_check("kakel", "tiles", "fliser", "Fliesen") == "OK"
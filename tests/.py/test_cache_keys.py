@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_cache_keys.py
+------------------
+Kanoniska nycklar och de gamla JSON-cachernas nyckelformat.
+"""
+
+from cache_keys import canonical_key, canonical_text, lang_code, legacy_key_parser, parse_legacy_key
+from translation_memory import TranslationMemory
+
+
+def test_canonical_text_ignores_layout_noise():
+    a = "Vilka  färger\r\nfinns?\t"
+    b = "‹KEEP›Vilka färger‹/KEEP›\\nfinns?"
+    assert canonical_text(a) == canonical_text(b) == "Vilka färger\nfinns?"
+    assert canonical_key(a, "sv", "English", "m", "v1") == canonical_key(b, "SE", "en", "m", "v1")
+    assert canonical_key(a, "SE", "EN", "m", "v1") != canonical_key(a, "SE", "EN", "m", "v2")
+
+
+def test_lang_code_aliases():
+    assert lang_code("Engelska") == lang_code(" en ") == "EN"
+    assert lang_code("dansk") == "DA"
+    assert lang_code("klingon") is None
+
+
+def test_parse_legacy_key_formats():
+    assert parse_legacy_key("EN::Hur lägger jag plattor?") == ("EN", "", "Hur lägger jag plattor?")
+    assert parse_legacy_key("DA::Q::Vilka färger finns?") == ("DA", "Q", "Vilka färger finns?")
+    assert parse_legacy_key("DE::A::Grå::Svart") == ("DE", "A", "Grå::Svart")
+    assert parse_legacy_key("Vilka färger finns?::English") == ("EN", "", "Vilka färger finns?")
+    # Text som råkar innehålla "::" men inget språk
+    assert parse_legacy_key("Obs::viktigt") is None
+    assert parse_legacy_key("bara text") is None
+
+
+def test_legacy_key_parser_pivot():
+    direct = legacy_key_parser()
+    pivot = legacy_key_parser(pivot=True)
+    assert direct("DA::Grå") == ("SE", "DA", "Grå")
+    assert pivot("DA::Grey") == ("EN", "DA", "Grey")
+    assert pivot("EN::Grå") == ("SE", "EN", "Grå")
+    assert pivot("nonsens") is None
+
+
+def test_memory_hits_legacy_variants_of_same_text(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    tm.put("‹KEEP›Hexagon‹/KEEP› finns i grå", "‹KEEP›Hexagon‹/KEEP› comes in grey", "SE", "EN", "m", "v1")
+    assert tm.get("Hexagon  finns i grå\r\n", "SE", "EN", "m", "v1") == "‹KEEP›Hexagon‹/KEEP› comes in grey"
+    assert tm.get("Hexagon finns i grå", "SE", "EN", "m", "v2") is None
+    assert tm.get_any("Hexagon finns i grå", "SE", "EN") is not None
+
+
+def test_canonical_hits_only_count_the_scripts_own_namespace(tmp_path):
+    from migrate_translation_caches import canonical_hits
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    tm.put("Vilka färger finns?", "Which colours are available?", "SE", "EN", "gpt-4o-mini", "faq-local-v1")
+    tm.put("Hur lägger jag plattor?", "How do I lay tiles?", "SE", "EN", "gpt-4o", "faq-sheets-v1")
+    texts = ["Vilka färger finns? ", "Hur lägger jag plattor?", "Okänd text"]
+    assert canonical_hits(tm, texts, "gpt-4o-mini", "faq-local-v1") == {"EN": 1, "DA": 0, "DE": 0}
+    assert canonical_hits(tm, texts, "gpt-4o", "faq-sheets-v1")["EN"] == 1
+    assert canonical_hits(tm, texts, "gpt-4o-mini", "faq-protect-v1")["EN"] == 0
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_catalog_templates.py
+-------------------------
+Katalogsvar från mallar: rendering från facit, tolkning av malltexter och färgord.
+"""
+
+from catalog_templates import parse_text, render_catalog_answer, render_catalog_question, render_text, translate_word
+
+FACIT = {"Hexagon": {"colors": ["Grå", "Etna"], "formats": ["20x20", "40x40 cm"]},
+         "Bocote": {"colors": ["Bocote"], "formats": []}}
+
+
+def test_render_catalog_answer_per_language():
+    se = render_catalog_answer("Hexagon", "SE", FACIT)
+    assert se == "Följande färger finns i serien Hexagon: Grå, Etna\nTillgängliga format: 20x20, 40x40 cm"
+    assert render_catalog_answer("Hexagon", "DE", FACIT) == (
+        "Folgende Farben gibt es in der Serie Hexagon: Grau, Etna\nVerfügbare Formate: 20x20, 40x40 cm"
+    )
+    assert render_catalog_answer("Okänd", "SE", FACIT) is None
+    assert render_catalog_question("Hexagon", "EN") == "What colors are available in the Hexagon series?"
+
+
+def test_format_line_kept_when_series_has_no_formats():
+    # Samma text som de befintliga svaren i FAQ_SE → sanitize skriver inte om dem
+    se = render_catalog_answer("Bocote", "SE", FACIT)
+    assert se == "Följande färger finns i serien Bocote: Bocote\nTillgängliga format: "
+    assert render_catalog_answer("Bocote", "EN", FACIT).endswith("\nAvailable formats: ")
+    assert render_text(se, "DA") == "Følgende farver findes i serien Bocote: Bocote\nTilgængelige formater:"
+
+
+def test_render_text_round_trip_from_swedish():
+    se = "Följande färger finns i Hexagon:\n  - Grå (Ljusgrå) – format: 20x20, 40x40\n  - Etna"
+    assert render_text(se, "EN") == (
+        "The following colors are available in Hexagon:\n  - Grey (Light grey) – format: 20x20, 40x40\n  - Etna"
+    )
+    assert render_text(render_text(se, "DA"), "SE", src="DA") == se
+
+
+def test_non_template_text_goes_to_llm():
+    assert render_text("Följande färger finns i Hexagon: Grå, Vit … Vill du se fler?", "EN") is None
+    assert parse_text("Hur lägger jag plattor?") is None
+
+
+def test_translate_word_leaves_product_names():
+    assert translate_word("Mörkgrå", "SE", "DE") == "Dunkelgrau"
+    assert translate_word("Hellgrau", "DE", "EN") == "Light grey"
+    assert translate_word("Bocote", "SE", "EN") == "Bocote"
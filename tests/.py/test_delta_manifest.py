@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_delta_manifest.py
+----------------------
+Manifest-diffen och write_delta mot ett ark i minnet.
+"""
+
+from conftest import MemorySpreadsheet
+from delta_manifest import DeltaManifest, write_delta
+
+FIELDS = ["question_se", "answer_se"]
+HEADER = ["question_en", "answer_en", "Källa FAQ / AI"]
+
+
+def _rows(n):
+    return [{"question_se": f"Fråga {i}", "answer_se": f"Svar {i}"} for i in range(n)]
+
+
+def test_diff_and_pending(tmp_path):
+    manifest = DeltaManifest("t", namespace="m/v1", directory=str(tmp_path))
+    rows = _rows(4)
+    assert manifest.diff(rows, FIELDS).full
+    manifest.commit(rows, FIELDS, pending=[2])
+
+    rows[1]["answer_se"] = "Nytt svar"
+    delta = DeltaManifest("t", namespace="m/v1", directory=str(tmp_path)).diff(rows + _rows(5)[4:], FIELDS)
+    assert not delta.full
+    assert delta.todo == [1, 2, 4]   # ändrad, misslyckad förra gången, ny
+    assert DeltaManifest("t", namespace="m/v2", directory=str(tmp_path)).diff(rows, FIELDS).full
+
+    # Layoutbrus i källan räknas inte som ändring
+    rows[3]["answer_se"] = "  Svar 3\r\n"
+    assert 3 not in DeltaManifest("t", namespace="m/v1", directory=str(tmp_path)).diff(rows, FIELDS).todo
+
+
+def test_deleted_rows_are_cleared(tmp_path):
+    manifest = DeltaManifest("t", namespace="m/v1", directory=str(tmp_path))
+    manifest.commit(_rows(5), FIELDS)
+    delta = manifest.diff(_rows(3), FIELDS)
+    assert delta.todo == [] and delta.deleted == [3, 4]
+
+    ws = MemorySpreadsheet("s").add_worksheet("FAQ_EN")
+    write_delta(ws, delta, [], HEADER)
+    assert ws.calls == [("batch_clear", ["A5:C6"])]
+
+
+def test_write_delta_skips_failed_rows(tmp_path):
+    manifest = DeltaManifest("t", namespace="m/v1", directory=str(tmp_path))
+    manifest.commit(_rows(3), FIELDS)
+    rows = _rows(3)
+    rows[0]["answer_se"] = rows[2]["answer_se"] = "ändrad"
+    delta = manifest.diff(rows, FIELDS)
+
+    ws = MemorySpreadsheet("s").add_worksheet("FAQ_EN")
+    write_delta(ws, delta, [None, ["q2", "a2", "AI/Cache"]], HEADER)
+    (kind, data), = ws.calls
+    assert kind == "batch_update"
+    assert data == [{"range": "A4:C4", "values": [["q2", "a2", "AI/Cache"]]}]
+
+
+def test_write_delta_full_keeps_current_cells_for_failed_rows():
+    current = [HEADER, ["q0", "a0", "AI"], ["q1", "a1", "AI"]]
+    sh = MemorySpreadsheet("s", {"FAQ_EN": current})
+    delta = DeltaManifest("t", namespace="m/v1", directory="/nonexistent").diff(_rows(3), FIELDS)
+    assert delta.full
+
+    write_delta(sh.worksheet("FAQ_EN"), delta, [["Q0", "A0", "AI"], None, None], HEADER)
+    written = {vr["range"]: vr["values"] for _, body in sh.calls for vr in body.get("data", [])}
+    # Rad 0 skrivs om; misslyckad rad 1 behåller sitt innehåll, rad 2 fanns inte och förblir tom
+    assert written == {"FAQ_EN!A2:B2": [["Q0", "A0"]]}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_fuzzy_tm.py
+----------------
+Fuzzy-träffar och patch() av tal/format, namn och färgord; vanliga ord går till delta_messages.
+"""
+
+import pytest
+
+from fuzzy_tm import FuzzyIndex, delta_messages
+
+SOURCE = "Plattan Hexagon finns i formatet 60x60 cm och i färgen Grå."
+TARGET = "The Hexagon tile comes in 60x60 cm and in the colour Grey."
+
+
+@pytest.fixture
+def index():
+    idx = FuzzyIndex()
+    idx.add(SOURCE, TARGET)
+    return idx
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Plattan Hexagon finns i formatet 40x40 cm och i färgen Grå.", "The Hexagon tile comes in 40x40 cm and in the colour Grey."),
+    ("Plattan Octagon finns i formatet 60x60 cm och i färgen Grå.", "The Octagon tile comes in 60x60 cm and in the colour Grey."),
+    ("Plattan Hexagon finns i formatet 60x60 cm och i färgen Svart.", "The Hexagon tile comes in 60x60 cm and in the colour Black."),
+    ("Plattan Hexagon finns i formatet 60x60 cm och i färgen Grå", TARGET.rstrip(".")),
+])
+def test_patch_rewrites_old_translation(index, text, expected):
+    match = index.lookup(text)
+    assert match is not None and match.score >= index.threshold
+    assert match.patch("SE", "EN") == expected
+
+
+def test_common_word_change_needs_delta_call(index):
+    text = "Plattan Hexagon finns i formatet 60x60 cm på beställning i färgen Grå."
+    match = index.lookup(text)
+    assert match.patch("SE", "EN") is None
+    user = delta_messages(match, "Swedish", "English")[-1]["content"]
+    assert TARGET in user and text in user and "'och' → 'på beställning'" in user
+
+
+def test_exact_hits_and_unrelated_text(index):
+    assert SOURCE in index and index.get(SOURCE) == TARGET
+    assert index.lookup("Hur rengör jag fogarna?") is None
+
+
+def test_index_from_memory_filters_namespace(tmp_path):
+    from translation_memory import TranslationMemory
+
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    tm.put(SOURCE, TARGET, "SE", "EN", "gpt-4o", "v1")
+    tm.put("Fog ingår.", "Grout included.", "SE", "EN", "gpt-4o", "v2")
+    tm.put(SOURCE, "Die Platte …", "SE", "DE", "gpt-4o", "v1")
+    index = FuzzyIndex.from_memory(tm, "SE", "EN", "gpt-4o", "v1")
+    assert len(index) == 1 and index[SOURCE] == TARGET
+    tm.close()
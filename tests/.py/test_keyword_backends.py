@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_keyword_backends.py
+------------------------
+Ordboksindexet från FULL_LOOKUP-CSV:er och kedjan ordbok → normaliserad → minne → live-steg.
+"""
+
+import json
+
+import pytest
+
+from keyword_backends import (DictionaryBackend, FunctionBackend, KeywordChain, KeywordDictionary,
+                              MemoryBackend, NormalizedBackend)
+from translation_memory import TranslationMemory
+
+# Samma rad = samma ord; SE-kolumnens sortering bryts på sista raden ("marksten" < "pool"),
+# så den raden kan inte litas på för SE (EN/DA ligger i linje hela vägen)
+COLUMNS = {
+    "SE": ["SE", "alger", "fog", "kakel", "pool", "marksten"],
+    "EN": ["EN", "algae", "grout", "tiles", "pool", "kerbstone"],
+    "DA": ["DA", "alger", "fuge", "fliser", "pool", "kantsten"],
+}
+
+
+@pytest.fixture
+def dictionary(tmp_path):
+    for lang, column in COLUMNS.items():
+        (tmp_path / f"{lang}.csv").write_text("\n".join(column), encoding="utf-8")
+    lexicon = tmp_path / "lexicon"
+    lexicon.mkdir()
+    (lexicon / "SE_FULL_LOOKUP.json").write_text(json.dumps({"aliases": {"fogar": "fog"}}), encoding="utf-8")
+    return KeywordDictionary(str(tmp_path / "{lang}.csv"), str(lexicon), langs=list(COLUMNS), protected=["Hexagon"])
+
+
+def test_dictionary_lookups(dictionary):
+    assert dictionary.lookup("fog", "SE", "EN") == "grout"
+    assert dictionary.lookup("Fog", "SE", "EN") is None
+    assert dictionary.lookup_normalized(" \"Fog\" ", "SE", "EN") == "grout"
+    assert dictionary.lookup_normalized("fogar", "SE", "DA") == "fuge"
+    assert dictionary.lookup("Hexagon", "SE", "DA") == "Hexagon"
+    assert dictionary.lookup("pool", "SE", "EN") == "pool" and dictionary.lookup("marksten", "SE", "EN") is None
+    assert dictionary.lookup("kerbstone", "EN", "DA") == "kantsten"
+
+
+def test_chain_falls_through_to_live_step(dictionary, tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    tm.put("klinker", "clinker", "SE", "EN", "gpt-4o", "kw-v1")
+    asked = []
+
+    def live(word, src, tgt):
+        asked.append(word)
+        return None if word == "okänt" else word.upper()
+
+    chain = KeywordChain([DictionaryBackend(dictionary), NormalizedBackend(dictionary),
+                          MemoryBackend(tm, "gpt-4o", "kw-v1"), FunctionBackend(live, tm, "gpt-4o", "kw-v1")])
+    words = ["fog", "Kakel", "klinker", "sten", "okänt", "fog", ""]
+    results, backends = chain.translate_sync(words, "SE", "EN")
+
+    assert results == ["grout", "tiles", "clinker", "STEN", None, "grout", None]
+    assert backends == ["dict", "norm", "tm", "llm", None, "dict", None]
+    assert asked == ["sten", "okänt"]   # bara det som inget tidigare steg svarade på
+    assert chain.stats == {"dict": 1, "norm": 1, "tm": 1, "llm": 1, "miss": 1}
+    # Live-svaret sparas: nästa gång svarar minnet
+    assert tm.get("sten", "SE", "EN", "gpt-4o", "kw-v1") == "STEN"
+    tm.close()
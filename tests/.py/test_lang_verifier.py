@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_lang_verifier.py
+---------------------
+Språkkontrollen mot ett litet lexikon: hela ord, delade ord, ankare och tröskeln för omförsök.
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from lang_verifier import LanguageVerifier, recheck, tokenize
+
+LEXICON = {
+    "SE": {"articles": ["en", "ett"], "negations": ["inte"], "common": ["och", "är", "kan", "som", "finns"],
+           "anchors": {"exclusive": [r"\bvarför\b"]}},
+    "EN": {"articles": ["the", "a"], "negations": ["not"], "common": ["and", "is", "can", "available"]},
+    "DA": {"articles": ["en", "et"], "negations": ["ikke"], "common": ["og", "er", "kan", "som", "findes"]},
+    "DE": {"articles": ["der", "die", "das"], "negations": ["nicht"], "common": ["und", "ist", "kann"],
+           "weights": {"articles": 1.0}},
+}
+
+
+@pytest.fixture
+def verifier(tmp_path):
+    for lang, lex in LEXICON.items():
+        (tmp_path / f"{lang}_FULL_LOOKUP.json").write_text(json.dumps(lex), encoding="utf-8")
+    return LanguageVerifier(directory=str(tmp_path), margin=2.0, min_evidence=1.0)
+
+
+def test_words_not_substrings(verifier):
+    assert tokenize("Kante, Verfärbung!") == ["kante", "verfärbung"]
+    assert verifier.scores("Die Kante ist nicht verfärbt")["SE"] == 0
+
+
+def test_shared_words_split_between_languages(verifier):
+    s = verifier.scores("kan som")
+    assert s["SE"] == s["DA"] == pytest.approx(0.5)       # två språk delar på båda orden
+    assert verifier.detect("kan som") is None              # för lite signal
+    assert verifier.detect("Varför är det inte klart?") == "SE"
+
+
+def test_needs_retry_thresholds(verifier):
+    swedish = "Plattan är inte hal och finns i grått"
+    assert verifier.needs_retry(swedish, "EN")
+    assert not verifier.needs_retry("The tile is not slippery and is available in grey", "EN")
+    # Källspråket vinner inte med marginal → inget omförsök
+    assert not verifier.needs_retry("Och the tile is not and available", "EN")
+    # För svag signal totalt
+    assert not verifier.needs_retry("Hexagon 20x20", "DE")
+    assert not verifier.needs_retry(swedish, "SE")
+    assert verifier.flag_many([swedish, "Die Fliese ist nicht rutschig"], "DE") == [True, False]
+
+
+def test_recheck_redoes_only_flagged_ai_results(verifier):
+    jobs = [("a", "EN"), ("b", "EN"), ("a", "EN"), ("c", "EN")]
+    results = [("Det är inte klart och finns", "AI"), ("It is available", "AI"),
+               ("Det är inte klart och finns", "AI"), ("Det är inte klart och finns", "CACHE")]
+    redone = []
+
+    async def redo(job):
+        redone.append(job)
+        return ("It is not ready", "AI")
+
+    out = asyncio.run(recheck(jobs, results, redo, target=lambda j: j[1], source=lambda j: "SE",
+                              key=lambda j: j, verifier=verifier))
+    assert redone == [("a", "EN")]
+    assert out[0] == out[2] == ("It is not ready", "AI")
+    assert out[1] == results[1] and out[3] == results[3]      # minnet kontrolleras inte om
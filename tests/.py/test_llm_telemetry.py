@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_llm_telemetry.py
+---------------------
+Telemetri för LLM-anrop: omslaget runt klienten, retries, taggar per task och sammanställningen.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_telemetry import Telemetry, cost_usd, instrument, load_events, percentile, summarize, tagged
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class Completions:
+    def __init__(self, fail_first=0):
+        self.calls = 0
+        self.fail_first = fail_first
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise RateLimitError("429")
+        return SimpleNamespace(
+            model=model,
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500),
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+        )
+
+
+def test_cost_uses_longest_price_prefix():
+    assert cost_usd("gpt-4o-mini-2024-07-18", 1_000_000, 0) == 0.15
+    assert cost_usd("gpt-4o", 1000, 500) == pytest.approx(0.0075)
+    assert cost_usd("okänd", 1, 1) is None
+
+
+def test_instrumented_async_client_records_calls(tmp_path):
+    telemetry = Telemetry(path=str(tmp_path / "calls.jsonl"), run_id="r1")
+    client = instrument(SimpleNamespace(chat=SimpleNamespace(completions=Completions(fail_first=2))), telemetry)
+    messages = [{"role": "user", "content": "Hej"}]
+
+    async def call():
+        with tagged(stage="SE→EN", lang="EN"):
+            for _ in range(3):
+                try:
+                    return await client.chat.completions.create(model="gpt-4o", messages=messages)
+                except RateLimitError:
+                    continue
+
+    assert asyncio.run(call()).choices[0].message.content == "ok"
+    telemetry.record_cache(True, "SE", "EN", n=3)
+    telemetry.record_cache(False, "SE", "EN")
+    telemetry.close()
+
+    events = list(load_events(telemetry.path))
+    assert [e.get("status") for e in events if e["event"] == "llm"] == ["429", "429", "ok"]
+    ok = events[2]
+    assert ok["retries"] == 2 and ok["stage"] == "SE→EN" and ok["lang"] == "EN" and ok["run"] == "r1"
+    s = summarize(events)
+    assert (s["calls"], s["failed"], s["retries"]) == (1, 2, 2)
+    assert s["cost"] == pytest.approx(0.0075)
+    assert (s["hits"], s["lookups"]) == (3, 4)
+
+
+def test_disabled_telemetry_returns_plain_client(tmp_path):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    assert instrument(client, Telemetry(path=str(tmp_path / "x.jsonl"), enabled=False)) is client
+    assert not (tmp_path / "x.jsonl").exists()
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([10.0], 95) == 10.0
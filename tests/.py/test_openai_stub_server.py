@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_openai_stub_server.py
+--------------------------
+Stubbens svar (form, determinism, platshållare, JSON-items, flera mål), felinjicering och RPM-fönster.
+"""
+
+import json
+import urllib.request
+
+import openai_stub_server
+from batch_translate import multi_instructions
+from openai_stub_server import StubServer
+
+
+def _post(base_url, body):
+    req = urllib.request.Request(base_url + "/chat/completions", data=json.dumps(body).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+def test_selftest():
+    assert openai_stub_server._selftest()
+
+
+def test_stats_count_requests_and_tokens():
+    with StubServer() as stub:
+        reply = _post(stub.base_url, {"messages": [{"role": "user", "content": "Translate into German:\n\nFog ingår."}]})
+        assert reply["usage"]["total_tokens"] > 0
+        with urllib.request.urlopen(stub.base_url + "/stats") as resp:
+            stats = json.loads(resp.read())
+    assert stats["requests"] == 1 and stats["429"] == 0
+
+
+def test_multi_target_request_answers_every_language():
+    instructions = multi_instructions("Swedish", {"EN": "English", "DA": "Danish"})
+    items = {"question": "Vilka färger finns?", "answer": "Grå"}
+    with StubServer() as stub:
+        reply = _post(stub.base_url, {"response_format": {"type": "json_object"}, "messages": [
+            {"role": "user", "content": f"{instructions}\n\nItems:\n{json.dumps(items)}"}]})
+    translations = json.loads(reply["choices"][0]["message"]["content"])["translations"]
+    assert set(translations) == {"EN", "DA"} and all(set(t) == set(items) for t in translations.values())
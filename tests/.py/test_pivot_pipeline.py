@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_pivot_pipeline.py
+----------------------
+SE→EN→DA/DE-pipelinen med fejkad översättning: pivot, delade jobb, fel per rad/språk och självtestet.
+"""
+
+import asyncio
+
+import pivot_pipeline
+from pivot_pipeline import PivotPipeline, run_pipeline
+
+
+def test_targets_are_translated_from_pivot_output():
+    calls = []
+
+    async def fake(text, src, tgt, field):
+        calls.append((src, tgt, text))
+        return f"[{tgt}] {text}"
+
+    done = []
+    pipeline = run_pipeline(
+        [(0, {"question": "Fråga", "answer": "Svar"}), (1, {"question": "Fråga", "answer": ""})],
+        fake,
+        workers=2,
+        on_row_done=done.append,
+    )
+    assert pipeline.results[0]["DA"] == {"question": "[DA] [EN] Fråga", "answer": "[DA] [EN] Svar"}
+    assert pipeline.results[1]["DE"] == {"question": "[DE] [EN] Fråga", "answer": ""}
+    assert sorted(done) == [0, 1] and not pipeline.failed
+    # Samma text och språkpar översätts en gång
+    assert calls.count(("SE", "EN", "Fråga")) == 1
+    assert calls.count(("EN", "DA", "[EN] Fråga")) == 1
+
+
+def test_failed_language_is_reported_and_other_targets_continue():
+    async def fake(text, src, tgt, field):
+        if tgt == "DE" and field == "answer":
+            raise RuntimeError("500")
+        return f"[{tgt}] {text}"
+
+    results = {}
+    pipeline = run_pipeline([(0, {"question": "Fråga", "answer": "Svar"})], fake,
+                            on_result=lambda row, lang, fields: results.setdefault((row, lang), fields))
+    assert [(row, lang) for row, lang, _ in pipeline.failed] == [(0, "DE")]
+    assert set(results) == {(0, "EN"), (0, "DA")}
+    assert "DE" not in pipeline.results[0]
+
+
+def test_failed_text_is_retried_by_the_next_row():
+    attempts = []
+
+    async def flaky(text, src, tgt, field):
+        attempts.append((tgt, text))
+        if len(attempts) == 1:
+            raise RuntimeError("timeout")
+        return f"[{tgt}] {text}"
+
+    rows = [(0, {"question": "Fråga"}), (1, {"question": "Fråga"})]
+    pipeline = run_pipeline(rows, flaky, workers=1)
+    assert [(row, lang) for row, lang, _ in pipeline.failed] == [(0, "EN")]
+    # Rad 1 ärver inte rad 0:s fel – samma text skickas igen och lyckas
+    assert pipeline.results[1]["DA"] == {"question": "[DA] [EN] Fråga"}
+    assert attempts.count(("EN", "Fråga")) == 2
+
+
+def test_selftest():
+    assert pivot_pipeline._selftest(n_rows=12, delay=0.01)
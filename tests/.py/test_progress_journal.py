@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_progress_journal.py
+------------------------
+ProgressJournal: senaste värdet vinner, en avhuggen sista rad (krasch mitt i skrivning) tål omstart och
+journalen töms efter kompaktering; misslyckade översättningar hamnar aldrig i journalen.
+"""
+
+from progress_journal import ProgressJournal
+
+
+def test_replay_keeps_latest_value(tmp_path):
+    with ProgressJournal(str(tmp_path / "j.jsonl")) as journal:
+        journal.record(1, "DA", "answer", "første")
+        journal.record(1, "DA", "answer", "anden", model="gpt-4o")
+        journal.record(2, "DE", "question", "Frage")
+    assert journal.written == 3
+    assert ProgressJournal(journal.path).replay() == {(1, "DA", "answer"): "anden", (2, "DE", "question"): "Frage"}
+
+
+def test_torn_last_line_is_skipped_and_next_record_starts_on_new_line(tmp_path, capsys):
+    path = tmp_path / "j.jsonl"
+    with ProgressJournal(str(path)) as journal:
+        journal.record(1, "EN", "answer", "Grey")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"row": 2, "lang": "EN", "field": "ans')          # krasch mitt i raden
+
+    resumed = ProgressJournal(str(path))
+    assert resumed.replay() == {(1, "EN", "answer"): "Grey"}
+    assert "trasig journalrad 2" in capsys.readouterr().out
+
+    resumed.record(2, "EN", "answer", "White")
+    resumed.close()
+    assert ProgressJournal(str(path)).replay() == {(1, "EN", "answer"): "Grey", (2, "EN", "answer"): "White"}
+    assert len(ProgressJournal(str(path))) == 2
+
+
+def test_missing_journal_is_empty(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "sub" / "j.jsonl"))
+    assert journal.replay() == {} and len(journal) == 0
+
+
+def test_truncate_after_compaction_starts_empty(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "j.jsonl"))
+    journal.record(1, "DA", "answer", "grå")
+    journal.truncate()
+    assert journal.replay() == {}
+    journal.record(2, "DE", "answer", "grau")   # journalen går att fortsätta efteråt
+    journal.close()
+    assert ProgressJournal(journal.path).replay() == {(2, "DE", "answer"): "grau"}
+
+
+def test_pivot_failure_is_not_recorded(monkeypatch, tmp_path):
+    import pytest
+    pytest.importorskip("pandas")
+    pytest.importorskip("openai")
+    import translate_missing_pivot_gpt4o as pivot
+    from fuzzy_tm import FuzzyIndex
+
+    monkeypatch.setattr(pivot, "chat", lambda *a, **k: None)   # alla försök misslyckades
+    index = FuzzyIndex()
+    assert pivot.translate_text("Grå plattor", "Swedish", "English") is None
+    assert pivot.translate_cached("Grå plattor", index, "Swedish", "English") is None
+    assert "Grå plattor" not in index   # ett misslyckande cachas inte
+
+    journal = ProgressJournal(str(tmp_path / "j.jsonl"))
+    put = lambda lang, i, field, value: journal.record(i, lang, field, value)
+    assert pivot.fill_row(put, "DA", 3, None, None, need_question=True) == 2
+    assert pivot.fill_row(put, "DE", 3, "Graue Platten", None) == 0
+    journal.close()
+    assert journal.replay() == {(3, "DE", "answer"): "Graue Platten", (3, "DE", "source"): "translated",
+                                (3, "DE", "verified"): "FALSE"}
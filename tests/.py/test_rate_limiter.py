@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_rate_limiter.py
+--------------------
+Tidsangivelser, hinkar, x-ratelimit-headers och 429-paus; självtestet mot lokal stubserver.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, backoff_delay, parse_duration
+from translate_engine import TranslateEngine
+
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("12") == 12
+    assert parse_duration("snart") is None and parse_duration(None) is None
+
+
+def test_backoff_respects_retry_after_and_cap(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE", 1.0)
+    assert backoff_delay(0, retry_after=5) >= 5
+    assert all(0 <= backoff_delay(20) <= rate_limiter.BACKOFF_MAX for _ in range(50))
+
+
+def test_buckets_follow_server_headers():
+    limiter = RateLimiter(rpm=600, tpm=1000)
+    assert limiter._reserve(100) == 0
+    assert limiter._reserve(5000) > 0          # större än hela hinken → väntar på full hink
+    limiter.update_from_headers({"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0",
+                                 "x-ratelimit-reset-requests": "2s"})
+    assert limiter.requests.capacity == 60
+    assert limiter._reserve(1) > 0
+    assert limiter.requests.rate == pytest.approx(30)   # tom hink som är full igen om 2 s
+
+
+def test_on_429_pauses_everyone(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE", 0.0)
+    limiter = RateLimiter(rpm=600, tpm=100000)
+    delay = limiter.on_429({"retry-after-ms": "300"})
+    assert delay == pytest.approx(0.3)
+    assert limiter.throttled == 1
+    assert 0 < limiter._reserve(1) <= 0.3
+
+
+def test_engine_waits_and_retries_on_429(monkeypatch):
+    class RateLimitError(Exception):
+        status_code = 429
+        response = SimpleNamespace(headers={"retry-after-ms": "10"})
+
+    class Completions:
+        calls = 0
+
+        async def create(self, **kwargs):
+            Completions.calls += 1
+            if Completions.calls == 1:
+                raise RateLimitError("429")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    limiter = RateLimiter(rpm=600, tpm=100000)
+    engine = TranslateEngine(client=SimpleNamespace(chat=SimpleNamespace(completions=Completions())), limiter=limiter)
+    assert asyncio.run(engine.complete([{"role": "user", "content": "Hej"}])) == "ok"
+    assert Completions.calls == 2 and limiter.throttled == 1
+
+
+def test_selftest():
+    assert rate_limiter._selftest()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_segment_translate.py
+-------------------------
+Segmentering/ihopsättning och delade segment mellan samtidiga anrop.
+"""
+
+import asyncio
+
+from segment_translate import InflightSegments, SegmentPlan, split_segments, translate_segmented
+
+ANSWER = "Följande färger finns i Hexagon: Grå, Svart, Vit\n- Fog ingår. Läggs på sand.\n- 430"
+
+
+def test_split_keeps_layout():
+    parts = split_segments(ANSWER)
+    assert "".join(p for p, _ in parts) == ANSWER
+    assert ("430", False) in parts   # inga bokstäver → översätts inte
+    assert ("- ", False) in parts
+
+
+def test_abbreviation_does_not_end_sentence():
+    segs = [p for p, t in split_segments("Fog t.ex. Sand ingår. Läggs på grus.") if t]
+    assert segs == ["Fog t.ex. Sand ingår.", "Läggs på grus."]
+
+
+def test_plan_dedups_and_assembles():
+    plan = SegmentPlan([ANSWER, "- Fog ingår."])
+    assert plan.unique.count("Fog ingår.") == 1
+    joined = plan.assemble([f"<{s}>" for s in plan.unique])
+    assert joined[1] == "- <Fog ingår.>"
+    assert joined[0].startswith("<Följande färger finns i Hexagon:> <Grå>, <Svart>, <Vit>\n- ")
+
+
+def test_missing_translation_keeps_source_segment():
+    plan = SegmentPlan(["Grå. Vit."])
+    assert plan.assemble(["Grey.", None]) == ["Grey. Vit."]
+
+
+def test_translate_segmented_sends_each_unique_segment_once():
+    sent = []
+
+    async def translate_many(segments):
+        sent.append(list(segments))
+        return [s.upper() for s in segments]
+
+    out = asyncio.run(translate_segmented(["Grå. Vit.", "Vit. Svart."], translate_many))
+    assert out == ["GRÅ. VIT.", "VIT. SVART."]
+    assert sent == [["Grå.", "Vit.", "Svart."]]
+
+
+def test_inflight_segments_shared_between_concurrent_rows():
+    sent = []
+
+    async def translate_many(segments):
+        sent.append(list(segments))
+        await asyncio.sleep(0.01)
+        return [s.upper() for s in segments]
+
+    async def row(inflight, text):
+        plan = SegmentPlan([text])
+        return plan.assemble(await inflight.translate(plan.unique, "SE", "EN", translate_many))[0]
+
+    async def run():
+        inflight = InflightSegments()
+        texts = [f"Följande färger finns: Grå, Vit\n- Rad {i}" for i in range(4)]
+        return inflight, await asyncio.gather(*(row(inflight, t) for t in texts))
+
+    inflight, out = asyncio.run(run())
+    assert out[3] == "FÖLJANDE FÄRGER FINNS: GRÅ, VIT\n- RAD 3"
+    flat = [s for batch in sent for s in batch]
+    assert flat.count("Grå") == 1 and len(flat) == len(set(flat)) == 7
+    assert inflight.shared == 9
+
+
+def test_inflight_failed_batch_is_sent_again():
+    calls = []
+
+    async def translate_many(segments):
+        calls.append(list(segments))
+        await asyncio.sleep(0)
+        if len(calls) == 1:
+            raise RuntimeError("timeout")
+        return [s.upper() for s in segments]
+
+    async def run():
+        inflight = InflightSegments()
+        first = await asyncio.gather(
+            inflight.translate(["Grå", "Vit"], "SE", "EN", translate_many),
+            inflight.translate(["Vit"], "SE", "EN", translate_many),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in first)
+        return await inflight.translate(["Vit", "Grå"], "SE", "EN", translate_many)
+
+    assert asyncio.run(run()) == ["VIT", "GRÅ"]
+    assert calls == [["Grå", "Vit"], ["Vit", "Grå"]]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_sheet_mirror.py
+--------------------
+Spegeln mot ett ark i minnet: revision, läs-API:t, batchhämtning och egna skrivningar.
+"""
+
+import pytest
+
+from conftest import MemorySpreadsheet, MemoryWorksheet
+from sheet_mirror import FAQ_TABS, SheetMirror
+from sheet_writer import SheetWriter
+
+
+class CountingWorksheet(MemoryWorksheet):
+    def get_all_values(self):
+        self.spreadsheet.reads += 1
+        return super().get_all_values()
+
+
+class CountingSheet(MemorySpreadsheet):
+    """Revision som get_lastUpdateTime (gspread 5) och antal hela flikar som hämtats."""
+
+    def __init__(self, *args, **kwargs):
+        self.revision = "r1"
+        self.reads = 0
+        self.batch_gets = 0
+        super().__init__(*args, **kwargs)
+
+    def get_lastUpdateTime(self):
+        return self.revision
+
+    def values_batch_get(self, ranges, params=None):
+        self.batch_gets += 1
+        return super().values_batch_get(ranges, params)
+
+    def add_worksheet(self, title, values=None, *args, **kwargs):
+        ws = CountingWorksheet(title, values, sheet_id=len(self.tabs))
+        ws.spreadsheet = self
+        self.tabs[title] = ws
+        return ws
+
+
+def _sheet():
+    return CountingSheet("s", {tab: [["question", "answer", "n"], [f"{tab} q", "", "12"]] for tab in FAQ_TABS})
+
+
+def test_read_once_then_local(script_env, tmp_path):
+    sh = _sheet()
+    mirror = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    ws = mirror.worksheet("FAQ_DA")
+    assert ws.get_all_records() == [{"question": "FAQ_DA q", "answer": "", "n": 12}]
+    assert ws.col_values(2) == ["answer"] and ws.row_values(2) == ["FAQ_DA q", "", "12"]
+    assert sh.reads == 1
+
+    # Ny process, samma revision → inget hämtas
+    again = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    assert again.worksheet("FAQ_DA").col_values(1) == ["question", "FAQ_DA q"]
+    assert sh.reads == 1 and again.stats["revision_checks"] == 1
+
+    # Arket ändrat → bara flikarna som läses hämtas om
+    sh.revision = "r2"
+    third = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    third.worksheet("FAQ_DA").get_all_values()
+    assert sh.reads == 2 and third.cached_revision("FAQ_DA") == "r2"
+
+
+def test_prefetch_once_then_local(script_env, tmp_path):
+    sh = _sheet()
+    sh.tabs["FAQ_SE"].values[1] = ["kort"]   # API:t klipper tomma celler i radslut
+    mirror = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    assert mirror.prefetch(FAQ_TABS) == 4 and sh.batch_gets == 1
+    assert mirror.worksheet("FAQ_SE").get_all_values() == [["question", "answer", "n"], ["kort", "", ""]]
+    assert mirror.columns("FAQ_DA") == {"question": ["FAQ_DA q"], "answer": [""], "n": ["12"]}
+    assert mirror.stats["fetched"] == 4
+
+    # Ny process, samma revision → inget hämtas
+    again = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    assert again.prefetch(FAQ_TABS) == 0
+    assert again.worksheet("FAQ_EN").col_values(1) == ["question", "FAQ_EN q"]
+    assert again.stats["fetched"] == 0 and sh.batch_gets == 1
+
+    # Arket ändrat → allt hämtas om i ett anrop
+    sh.revision = "r2"
+    assert SheetMirror(sh, path=str(tmp_path / "m.sqlite")).prefetch(FAQ_TABS) == 4 and sh.batch_gets == 2
+
+
+def test_offline_never_checks_revision(script_env, tmp_path):
+    sh = _sheet()
+    SheetMirror(sh, path=str(tmp_path / "m.sqlite")).worksheet("FAQ_EN").get_all_values()
+    sh.revision = "r2"
+    offline = SheetMirror(sh, path=str(tmp_path / "m.sqlite"), offline=True)
+    assert offline.worksheet("FAQ_EN").col_values(1) == ["question", "FAQ_EN q"]
+    assert offline.stats["revision_checks"] == 0 and sh.reads == 1
+    with pytest.raises(RuntimeError, match="FAQ_DE"):
+        offline.worksheet("FAQ_DE").get_all_values()
+
+
+def test_own_write_invalidates_only_that_tab(script_env, tmp_path):
+    sh = _sheet()
+    mirror = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    mirror.prefetch(FAQ_TABS)
+    with SheetWriter(sh, flush_cells=0) as writer:
+        writer.set("FAQ_EN", 2, "B", "nytt")
+    assert mirror.cached_revision("FAQ_EN") is None
+    assert mirror.cached_revision("FAQ_DE") == "r1"
+    # Övriga flikar gäller resten av körningen
+    mirror.worksheet("FAQ_DE").get_all_values()
+    assert sh.reads == 4
+
+
+def test_only_write_methods_invalidate_the_tab(script_env, tmp_path):
+    sh = _sheet()
+    mirror = SheetMirror(sh, path=str(tmp_path / "m.sqlite"))
+    mirror.prefetch(FAQ_TABS)
+    ws = mirror.worksheet("FAQ_EN")
+    assert ws.id == sh.tabs["FAQ_EN"].id and ws.row_count == 1000
+    assert not hasattr(ws, "finns_inte")
+    assert mirror.cached_revision("FAQ_EN") == "r1"   # läsning av attribut rör inte spegeln
+
+    ws.append_row(["ny", "rad"])
+    assert mirror.cached_revision("FAQ_EN") is None
+    assert mirror.cached_revision("FAQ_SE") == "r1"
+    assert sh.tabs["FAQ_EN"].calls[-1] == ("append_rows", [["ny", "rad"]])   # skrivningen nådde riktiga fliken
+    ws.get_all_values()
+    assert sh.reads == 5   # bara FAQ_EN hämtas om
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_sheet_sync.py
+------------------
+Diffsynk: rad-operationer för borttagna/infogade rader, cellvisa ändringar, tömd svans, torrkörning.
+"""
+
+import sheet_sync
+from conftest import MemorySpreadsheet
+from sheet_sync import _apply, plan_sync, sync_table
+
+HEADER = ["question_en", "answer_en", "Source"]
+CURRENT = [HEADER] + [[f"q{i}", f"a{i}", "AI"] for i in range(1, 11)]
+
+
+def test_unchanged_table_plans_nothing():
+    plan = plan_sync(CURRENT, [list(r) for r in CURRENT])
+    assert not plan.changed
+    # Strängjämförelse: 12 och "12", None och "" räknas som lika
+    assert not plan_sync([["12", ""]], [[12, None]]).changed
+
+
+def test_changed_cell_only():
+    desired = [list(r) for r in CURRENT]
+    desired[3][1] = "ny"
+    plan = plan_sync(CURRENT, desired)
+    assert plan.cells == {(4, 2): "ny"} and not plan.deletes and not plan.inserts
+
+
+def test_rows_removed_and_inserted_in_the_middle_are_structural():
+    desired = CURRENT[:3] + CURRENT[5:]
+    desired.insert(7, ["ny", "rad", "AI"])
+    plan = plan_sync(CURRENT, desired)
+    assert plan.deletes == [(3, 5)] and plan.inserts == [(9, 1)]   # före nuvarande rad 9
+    assert plan.cells == {(8, 1): "ny", (8, 2): "rad", (8, 3): "AI"}   # bara den nya raden skrivs
+    assert plan.describe() == "3 celler i 1 rader ändrade, 2 rader borttagna, 1 rader infogade"
+
+
+def test_rows_past_the_end_are_cleared_not_deleted():
+    plan = plan_sync(CURRENT, CURRENT[:9])
+    assert not plan.deletes
+    assert plan.cells == {(10, 1): "", (10, 2): "", (10, 3): "", (11, 1): "", (11, 2): "", (11, 3): ""}
+
+
+def test_sync_table_against_sheet():
+    sh = MemorySpreadsheet("s", {"FAQ_EN": CURRENT})
+    desired = CURRENT[:2] + CURRENT[4:] + [["q11", "a11", "AI"]]
+    desired[5][2] = "CACHE"
+    sync_table(sh, "FAQ_EN", desired)
+
+    requests = [r for kind, body in sh.calls if kind == "batch_update" for r in body["requests"]]
+    data = [vr for kind, body in sh.calls if kind == "values_batch_update" for vr in body["data"]]
+    assert [next(iter(r)) for r in requests] == ["deleteDimension"]
+    assert _apply(CURRENT, requests, data) == desired
+    assert sh.worksheet("FAQ_EN").calls == []   # aldrig clear/append
+
+
+def test_dry_run_writes_nothing():
+    sh = MemorySpreadsheet("s", {"FAQ_EN": CURRENT})
+    plan = sync_table(sh, "FAQ_EN", CURRENT[:5], dry_run=True)
+    assert plan.changed and sh.calls == []
+
+
+def test_selftest():
+    assert sheet_sync._selftest()
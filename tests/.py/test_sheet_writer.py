@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_sheet_writer.py
+--------------------
+Sammanslagning av celler till block, uppdelning efter gränserna och omförsök på 429.
+"""
+
+import pytest
+
+import sheet_writer
+from sheet_writer import SheetWriter, a1_range, coalesce
+
+
+class RecordingSheet:
+    def __init__(self, fail=0):
+        self.bodies = []
+        self.fail = fail
+
+    def values_batch_update(self, body):
+        if self.fail:
+            self.fail -= 1
+            err = Exception("rate limited")
+            err.code = 429
+            raise err
+        self.bodies.append(body)
+
+
+def _ranges(sheet):
+    return [(vr["range"], vr["values"]) for body in sheet.bodies for vr in body["data"]]
+
+
+def test_coalesce_merges_runs_and_rows_without_covering_holes():
+    cells = {(2, 1): "a2", (2, 2): "b2", (3, 1): "a3", (3, 2): "b3", (4, 1): "a4", (2, 4): "d2", (6, 1): "a6"}
+    assert coalesce(cells) == [
+        (2, 1, 3, 2, [["a2", "b2"], ["a3", "b3"]]),
+        (2, 4, 2, 4, [["d2"]]),
+        (4, 1, 4, 1, [["a4"]]),
+        (6, 1, 6, 1, [["a6"]]),
+    ]
+
+
+def test_a1_range_quotes_tab_names():
+    assert a1_range("FAQ_EN", 2, 1, 5, 3) == "FAQ_EN!A2:C5"
+    assert a1_range("FAQ EN", 2, 27, 2, 27) == "'FAQ EN'!AA2"
+    assert a1_range("Kund's", 1, 1, 1, 2) == "'Kund''s'!A1:B1"
+
+
+def test_column_pattern_becomes_one_call_last_value_wins():
+    sheet = RecordingSheet()
+    with SheetWriter(sheet, flush_cells=0) as writer:
+        for i in range(2, 6):
+            writer.set_row("DA_FULL_LOOKUP", i, {"A": f"w{i}", "C": "dictionary"})
+        writer.set("DA_FULL_LOOKUP", 3, "A", "sista")
+    assert len(sheet.bodies) == 1 and sheet.bodies[0]["valueInputOption"] == "USER_ENTERED"
+    assert _ranges(sheet) == [
+        ("DA_FULL_LOOKUP!A2:A5", [["w2"], ["sista"], ["w4"], ["w5"]]),
+        ("DA_FULL_LOOKUP!C2:C5", [["dictionary"]] * 4),
+    ]
+    assert writer.summary() == "8 celler, 2 block, 1 anrop"
+
+
+def test_large_blocks_split_by_rows_and_calls_by_cell_limit():
+    sheet = RecordingSheet()
+    writer = SheetWriter(sheet, max_cells=4, flush_cells=0)
+    writer.set_column("EN", "A", [f"v{i}" for i in range(10)], start_row=1)
+    assert writer.flush() == 3
+    assert [r for r, _ in _ranges(sheet)] == ["EN!A1:A4", "EN!A5:A8", "EN!A9:A10"]
+    assert writer.flush() == 0
+
+
+def test_auto_flush_and_retry_on_429():
+    sheet = RecordingSheet(fail=2)
+    delays = []
+    writer = SheetWriter(sheet, flush_cells=3, backoff=lambda attempt: delays.append(attempt) or 0)
+    writer.set_row("EN", 1, ["a", "b", "c"])
+    assert len(writer) == 0 and writer.stats["retries"] == 2
+    assert _ranges(sheet) == [("EN!A1:C1", [["a", "b", "c"]])]
+    assert delays == [0, 1]
+
+
+def test_other_errors_are_not_retried():
+    class Broken:
+        def values_batch_update(self, body):
+            raise ValueError("400 bad range")
+
+    writer = SheetWriter(Broken(), flush_cells=0)
+    writer.set("EN", 1, "A", "x")
+    with pytest.raises(ValueError):
+        writer.flush()
+
+
+def test_selftest_leaves_global_backoff_alone():
+    import rate_limiter
+    base = rate_limiter.BACKOFF_BASE
+    assert sheet_writer._selftest()
+    assert rate_limiter.BACKOFF_BASE == base
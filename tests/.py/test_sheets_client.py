@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_sheets_client.py
+---------------------
+Lat öppning, flikhandtag ur ett metadataanrop, tokenfilen (bara när SHEETS_TOKEN_CACHE är satt) och A1-kolumner.
+"""
+
+import os
+import stat
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import MemorySpreadsheet
+from sheets_client import SheetsClient, _load_token, _save_token, col_letter, col_number
+
+
+class CountingSpreadsheet(MemorySpreadsheet):
+    metadata = 0
+
+    def worksheets(self):
+        self.metadata += 1
+        return super().worksheets()
+
+
+class FakeGspread:
+    def __init__(self):
+        self.opened = {}
+
+    def open_by_key(self, key):
+        return self.opened.setdefault(key, CountingSpreadsheet(key, {"FAQ_SE": [], "FAQ_EN": []}))
+
+
+@pytest.fixture
+def client():
+    c = SheetsClient(token_cache="")
+    c._gc = FakeGspread()
+    return c
+
+
+def test_nothing_opens_until_first_use(client):
+    sh = client.spreadsheet("abc")
+    assert client.spreadsheet("abc") is sh and sh.id == "abc"
+    assert client._gc.opened == {}
+    sh.worksheet("FAQ_SE")
+    assert list(client._gc.opened) == ["abc"]
+
+
+def test_worksheets_come_from_one_metadata_fetch(client):
+    sh = client.spreadsheet("abc")
+    assert sh.worksheet("FAQ_SE").title == "FAQ_SE"
+    assert sh.worksheet("FAQ_EN").title == "FAQ_EN"
+    assert sh.spreadsheet.metadata == 1
+    # Flik skapad utifrån → en ny hämtning
+    sh.spreadsheet.add_worksheet("FAQ_DA")
+    assert sh.worksheet("FAQ_DA").title == "FAQ_DA" and sh.spreadsheet.metadata == 2
+
+
+def test_missing_sheet_id_fails_on_first_use(client, monkeypatch):
+    monkeypatch.delenv("SHEET_ID_MAIN", raising=False)
+    sh = client.spreadsheet()
+    with pytest.raises(RuntimeError, match="SHEET_ID_MAIN"):
+        sh.worksheets()
+
+
+def test_token_file_is_private_and_reused(tmp_path):
+    path = str(tmp_path / "token.json")
+    expiry = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+    _save_token(SimpleNamespace(token="tok", expiry=expiry), path, "a@b")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    creds = SimpleNamespace(token=None, expiry=None)
+    assert _load_token(creds, path, "a@b") and creds.token == "tok" and creds.expiry == expiry
+    assert not _load_token(SimpleNamespace(token=None, expiry=None), path, "annan@b")
+
+
+def test_no_token_file_without_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _save_token(SimpleNamespace(token="tok", expiry=datetime.utcnow()), "", "a@b")
+    assert os.listdir(tmp_path) == []
+
+
+def test_a1_columns():
+    assert [col_letter(n) for n in (1, 3, 26, 27, 52)] == ["A", "C", "Z", "AA", "AZ"]
+    assert [col_number(c) for c in ("A", "c", "Z", "AA", "AZ", 7)] == [1, 3, 26, 27, 52, 7]
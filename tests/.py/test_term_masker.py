@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_term_masker.py
+-------------------
+TermMasker: helordsträffar, längsta träff först och mask/unmask-rundtur med kontroll av platshållarna;
+keyword-skriptet maskar före LLM-anropet.
+"""
+
+import json
+
+from term_masker import TermMasker, load_protected_terms
+
+TERMS = {"Sarawa", "Sarawa Chevry", "Etna", "Lava", "Grå"}
+
+
+def test_mask_unmask_round_trip():
+    masker = TermMasker(TERMS)
+    text = "Lava finns i Sarawa Chevry, Etna och Grå."
+    masked, terms = masker.mask(text)
+    assert masked == "[[T1]] finns i [[T2]], [[T3]] och Grå."     # generiska färgord maskas inte
+    assert terms == ["Lava", "Sarawa Chevry", "Etna"]
+    translated = "[[T1]] is available in [[T2]], [[T3]] and grey."
+    assert masker.unmask(translated, terms) == "Lava is available in Sarawa Chevry, Etna and grey."
+    assert masker.unmask(masked, terms) == text
+
+
+def test_unmask_rejects_lost_or_duplicated_placeholders():
+    masker = TermMasker(TERMS)
+    _, terms = masker.mask("Etna och Lava")
+    assert masker.unmask("[[T1]] and lava", terms) is None
+    assert masker.unmask("[[T1]] [[T1]] [[T2]]", terms) is None
+    assert masker.unmask("[[T1]] [[T2]] [[T3]]", terms) is None
+    assert masker.unmask("no terms", []) == "no terms"
+
+
+def test_whole_words_only():
+    masker = TermMasker(TERMS)
+    assert masker.find("Etnas färger") == []
+    assert masker.find("Sarawa-serien") == [(0, 6)]
+    assert masker.is_term(" Sarawa Chevry ") and not masker.is_term("Sarawa Chevry grå")
+    assert TermMasker(TERMS, ignore_case=True).find("etna") == [(0, 4)]
+    assert TermMasker(TERMS).find("etna") == []
+
+
+def test_only_terms_and_existing_placeholders():
+    masker = TermMasker(TERMS)
+    masked, terms = masker.mask("Etna, Lava")
+    assert masker.only_terms(masked)
+    # Text som redan innehåller en platshållare maskas inte (kan inte återställas entydigt)
+    assert masker.mask("[[T1]] Etna") == ("[[T1]] Etna", [])
+
+
+def test_load_protected_terms(tmp_path):
+    path = tmp_path / "colors.json"
+    path.write_text(json.dumps([
+        {"question_se": "Vilka färger finns i serien Hexagon?", "answer_se": "- Bocote (Brun) – format: 20x20\\n- Etna"},
+    ]), encoding="utf-8")
+    assert load_protected_terms(str(path), extra={"Konjak"}) == {"Hexagon", "Bocote", "Etna", "Konjak"}
+    assert load_protected_terms(str(tmp_path / "saknas.json"), extra=set()) == set()
+
+
+def test_keyword_script_masks_before_llm_and_unmasks_after(script_env, monkeypatch):
+    import importlib.util
+    import os
+    from types import SimpleNamespace
+
+    import pytest
+    from conftest import SCRIPT_DIR
+    for package in ("pandas", "openai", "dotenv"):
+        pytest.importorskip(package)
+    spec = importlib.util.spec_from_file_location("keywords_ver5", os.path.join(SCRIPT_DIR, "translate_keywords_sheets-ver5.py"))
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+
+    prompts, replies = [], ["[[T1]] grey tiles", "Etna grey tiles"]
+
+    def create(model, messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=replies.pop(0)))])
+
+    monkeypatch.setattr(script, "masker", TermMasker(TERMS))
+    monkeypatch.setattr(script, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    assert script.safe_translate("Etna gråa plattor", "Svenska", "EN", 1, "EN") == "Etna grey tiles"
+    assert prompts[0].endswith("[[T1]] gråa plattor") and "Etna" not in prompts[0]
+
+    # Platshållaren tappad → ett nytt anrop utan maskning
+    replies[:] = ["grey tiles", "Etna grey tiles"]
+    assert script.safe_translate("Etna gråa plattor", "Svenska", "EN", 2, "EN") == "Etna grey tiles"
+    assert prompts[-1].endswith("Etna gråa plattor")
+
+    # Bara skyddade termer → inget anrop alls
+    calls = len(prompts)
+    assert script.safe_translate("Sarawa Chevry", "Svenska", "EN", 3, "EN") == "Sarawa Chevry"
+    assert len(prompts) == calls and script.protected_counts["EN"] == 1
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_translate_engine.py
+------------------------
+TranslateEngine: ordning, delade jobb, felhantering och begränsad parallellism (klient i minnet).
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from translate_engine import TranslateEngine
+
+
+class FakeCompletions:
+    """chat.completions.create som ekar sista meddelandet; de första fail_first anropen kastar."""
+
+    def __init__(self, fail_first: int = 0):
+        self.calls = 0
+        self.fail_first = fail_first
+
+    async def create(self, model, messages, temperature, **kwargs):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise RuntimeError("tillfälligt fel")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f" {messages[-1]['content']} "))])
+
+
+def _client(fail_first: int = 0):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(fail_first)))
+
+
+def test_map_keeps_order_and_dedups_by_key():
+    calls = []
+
+    async def worker(text):
+        calls.append(text)
+        await asyncio.sleep(0.01 if text == "a" else 0)   # första jobbet blir klart sist
+        return text.upper()
+
+    engine = TranslateEngine(client=_client())
+    out = engine.run_sync(["a", "b", "a", "c", "b"], worker, key=lambda t: t)
+    assert out == ["A", "B", "A", "C", "B"]
+    assert sorted(calls) == ["a", "b", "c"]
+
+
+def test_map_on_error_gives_fallback_per_item():
+    async def worker(text):
+        if text == "bad":
+            raise ValueError(text)
+        return text.upper()
+
+    engine = TranslateEngine(client=_client())
+    out = engine.run_sync(["ok", "bad", "ok2"], worker, on_error=lambda item, e: f"fallback:{item}")
+    assert out == ["OK", "fallback:bad", "OK2"]
+
+    with pytest.raises(ValueError):
+        engine.run_sync(["ok", "bad"], worker)
+
+
+def test_complete_limits_concurrency():
+    running = peak = 0
+
+    class SlowCompletions(FakeCompletions):
+        async def create(self, model, messages, temperature, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.005)
+            running -= 1
+            return await super().create(model, messages, temperature, **kwargs)
+
+    engine = TranslateEngine(client=SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions())), concurrency=2)
+
+    async def worker(i):
+        return await engine.complete([{"role": "user", "content": str(i)}])
+
+    assert engine.run_sync(list(range(8)), worker) == [str(i) for i in range(8)]
+    assert peak == 2
+
+
+def test_complete_retries_then_strips(monkeypatch):
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    client = _client(fail_first=2)
+    engine = TranslateEngine(client=client, retries=3)
+    assert asyncio.run(engine.complete([{"role": "user", "content": "Hej"}])) == "Hej"
+    assert client.chat.completions.calls == 3
+
+    failing = TranslateEngine(client=_client(fail_first=5), retries=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(failing.complete([{"role": "user", "content": "Hej"}]))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_translation_bench.py
+-------------------------
+Mätningen kör skriptens egna översättningsfunktioner mot stubben (kräver openai, gspread, pandas, dotenv).
+"""
+
+import pytest
+
+for _package in ("openai", "gspread", "pandas", "dotenv"):
+    pytest.importorskip(_package)
+
+import translation_bench
+from openai_stub_server import StubServer
+
+ROWS = [
+    {"question_se": "Vilka färger finns i Hexagon?", "answer_se": "Följande färger finns: Grå, Vit\n- Fog ingår."},
+    {"question_se": "Hur lägger jag plattorna?", "answer_se": "Läggs på sand.\n- Fog ingår."},
+]
+
+
+def test_scaled_copies_are_distinct():
+    rows = translation_bench.scale_rows(ROWS, 3)
+    assert len(rows) == 6 and len({r["question_se"] for r in rows}) == 6
+    assert translation_bench.scale_words(["fog"], 2) == ["fog", "fog (1)"]
+
+
+@pytest.mark.parametrize("runner, items", [
+    (translation_bench.run_faq, ROWS),
+    (translation_bench.run_keywords, ["fog", "kakel", "marksten"]),
+])
+def test_measure_runs_script_against_stub(runner, items, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with StubServer() as stub:
+        monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        result = translation_bench.measure(stub, "test", runner, items)
+    assert result["done"] == len(items)
+    assert result["requests"] > 0 and result["429"] == result["5xx"] == 0
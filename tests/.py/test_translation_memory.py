@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_translation_memory.py
+--------------------------
+TranslationMemory: nyckling på (språk, modell, promptversion, text), get_many, transaktioner och JSON-import.
+"""
+
+import json
+
+import pytest
+
+from translation_memory import TranslationMemory
+
+
+@pytest.fixture
+def tm(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    yield memory
+    memory.close()
+
+
+def test_get_put_keyed_on_model_and_prompt_version(tm):
+    tm.put("Vilka färger finns?", "What colors are available?", "SE", "EN", "gpt-4o", "faq-v1")
+    assert tm.get("Vilka färger finns?", "SE", "EN", "gpt-4o", "faq-v1") == "What colors are available?"
+    # Normaliserad text: kanter och radslut spelar ingen roll
+    assert tm.get("  Vilka färger finns?\r\n", "SE", "EN", "gpt-4o", "faq-v1") == "What colors are available?"
+    assert tm.get("Vilka färger finns?", "SE", "EN", "gpt-4o", "faq-v2") is None
+    assert tm.get("Vilka färger finns?", "SE", "EN", "gpt-4o-mini", "faq-v1") is None
+    assert tm.get("Vilka färger finns?", "SE", "DA", "gpt-4o", "faq-v1") is None
+
+    tm.put("Vilka färger finns?", "Which colours exist?", "SE", "EN", "gpt-4o", "faq-v1")
+    assert tm.get("Vilka färger finns?", "SE", "EN", "gpt-4o", "faq-v1") == "Which colours exist?"
+    assert len(tm) == 1
+
+
+def test_get_many_returns_hits_only(tm):
+    tm.put("Grå", "Grey", "SE", "EN", "m", "v1")
+    tm.put("Vit", "White", "SE", "EN", "m", "v1")
+    assert tm.get_many(["Grå", "Svart", "Vit", " Grå "], "SE", "EN", "m", "v1") == {
+        "Grå": "Grey", "Vit": "White", " Grå ": "Grey",
+    }
+
+
+def test_transaction_rolls_back_on_error(tm, tmp_path):
+    with pytest.raises(RuntimeError):
+        with tm.transaction():
+            tm.put("Grå", "Grey", "SE", "EN", "m", "v1")
+            raise RuntimeError("avbrutet")
+    assert len(tm) == 0
+
+    with tm.transaction():
+        tm.put("Grå", "Grey", "SE", "EN", "m", "v1")
+    assert TranslationMemory(str(tmp_path / "tm.sqlite")).get("Grå", "SE", "EN", "m", "v1") == "Grey"
+
+
+def test_import_json_only_once(tm, tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps({"SE|EN|Grå": "Grey", "trasig nyckel": "x", "SE|DA|Vit": 3}), encoding="utf-8")
+
+    def parse(key):
+        parts = key.split("|")
+        return tuple(parts) if len(parts) == 3 else None
+
+    assert tm.import_json(str(path), parse, "m", "v1") == 1
+    assert tm.get("Grå", "SE", "EN", "m", "v1") == "Grey"
+    assert tm.import_json(str(path), parse, "m", "v1") == 0      # redan importerad
+    assert tm.import_json(str(tmp_path / "saknas.json"), parse, "m", "v1") == 0
@@ -1,13 +1,17 @@
 import os
-import time
 import json
 import sys
 from pathlib import Path
 
-import gspread
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from translation_memory import TranslationMemory
+from keyword_backends import FunctionBackend, MemoryBackend, dictionary_chain
+from sheets_client import open_spreadsheet
+from sheet_writer import SheetWriter
+from sheet_mirror import open_mirror
+
 def find_project_root(start: Path, markers=(".env.local", "faq-extended")) -> Path:
     cur = start.resolve()
     for _ in range(8):
@@ -45,17 +49,8 @@ if missing:
 
 client = OpenAI(api_key=OPENAI_API_KEY)
 
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID_MAIN)
+sh = open_spreadsheet(SHEET_ID_MAIN)
+mirror = open_mirror(SHEET_ID_MAIN)
 
 SE_SHEET = "SE_FULL_LOOKUP"
 EN_SHEET = "EN_FULL_LOOKUP"
@@ -86,8 +81,6 @@ if colors_file.exists():
 else:
     print(f"⚠️ {colors_file} not found – continuing without protected list.")
 
-BATCH_SIZE = 20
-SLEEP_SECONDS = 2
 
 def translate_with_prompt(prompt: str, text: str) -> str:
     try:
@@ -99,7 +92,7 @@ def translate_with_prompt(prompt: str, text: str) -> str:
         return resp.choices[0].message.content.strip()
     except Exception as e:
         print(f"❌ Error translating '{text}': {e}")
-        return text
+        return None
 
 PROMPT_DA = """
 Du er en oversættelseseekspert inden for byggematerialer, udeklinker, kakel og klinkerdæk.
@@ -119,17 +112,37 @@ Antworte nur mit einem EINZELNEN Wort oder einer kurzen Phrase, nichts weiter.
 Keyword: "{text}"
 """
 
+PROMPTS = {"DA": PROMPT_DA, "DE": PROMPT_DE}
+
+# Ordbok (FULL_LOOKUP-CSV:erna) → normaliserad ordbok → översättningsminnet → ett prompt-anrop per ord
+PROMPT_VERSION = "keywords-en-da-de-v1"
+tm = TranslationMemory()
+chain = dictionary_chain(
+    MemoryBackend(tm, "gpt-4o", PROMPT_VERSION),
+    FunctionBackend(lambda word, src, tgt: translate_with_prompt(PROMPTS[tgt], word), tm, "gpt-4o", PROMPT_VERSION),
+)
+REASONS = {"dict": "dictionary", "norm": "dictionary", "tm": "ai-translate", "llm": "ai-translate"}
+
 def main():
-    ws_se = sh.worksheet(SE_SHEET)
-    ws_en = sh.worksheet(EN_SHEET)
-    ws_da = sh.worksheet(DA_SHEET)
-    ws_de = sh.worksheet(DE_SHEET)
+    mirror.prefetch([SE_SHEET, EN_SHEET])  # båda flikarna i ett anrop (inget alls om arket är oförändrat)
+    ws_se = mirror.worksheet(SE_SHEET)
+    ws_en = mirror.worksheet(EN_SHEET)
 
     se_col = ws_se.col_values(1)
     en_col = ws_en.col_values(1)
 
     total = len(en_col)
-    batch_updates = []
+    writer = SheetWriter(sh)
+
+    # Allt som inte är skyddat slås upp i kedjan först; bara ord utan ordboks-/minnesträff kostar ett anrop
+    todo = [str(en).strip() for se, en in zip(se_col, en_col)
+            if str(se).strip().lower() not in DO_NOT_TRANSLATE and str(en).strip().lower() not in DO_NOT_TRANSLATE]
+    translated = {}
+    for lang in ("DA", "DE"):
+        results, backends = chain.translate_sync(todo, "EN", lang)
+        translated[lang] = {w: (r, REASONS.get(b)) for w, r, b in zip(todo, results, backends)}
+        print(f"📚 EN→{lang}: {chain.summary()}")
+        chain.stats.clear()
 
     for i, (se, en) in enumerate(zip(se_col, en_col), start=1):
         se_str, en_str = str(se).strip(), str(en).strip()
@@ -139,35 +152,23 @@ def main():
             de_new = se_str
             reason = "protected"
         else:
-            da_new = translate_with_prompt(PROMPT_DA, en_str)
-            de_new = translate_with_prompt(PROMPT_DE, en_str)
-            reason = "ai-translate"
+            da_new, da_reason = translated["DA"].get(en_str, (None, None))
+            de_new, de_reason = translated["DE"].get(en_str, (None, None))
+            da_new, de_new = da_new or en_str, de_new or en_str
+            da_reason, de_reason = da_reason or "failed", de_reason or "failed"
+            reason = da_reason if da_reason == de_reason else f"{da_reason}/{de_reason}"
 
-        # Write translations in A and log in C
-        batch_updates.append({"range": f"{DA_SHEET}!A{i}", "values": [[da_new]]})
-        batch_updates.append({"range": f"{DA_SHEET}!C{i}", "values": [[reason]]})
-
-        batch_updates.append({"range": f"{DE_SHEET}!A{i}", "values": [[de_new]]})
-        batch_updates.append({"range": f"{DE_SHEET}!C{i}", "values": [[reason]]})
+        # Write translations in A and log in C (writer slår ihop raderna till block)
+        writer.set_row(DA_SHEET, i, {"A": da_new, "C": reason})
+        writer.set_row(DE_SHEET, i, {"A": de_new, "C": reason})
 
         print(f"✅ Row {i}: EN={en_str} → DA={da_new}, DE={de_new} ({reason})")
 
-        if len(batch_updates) >= BATCH_SIZE * 4:
-            body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-            sh.values_batch_update(body)
-            print(f"💾 Saved batch up to row {i}")
-            batch_updates.clear()
-            time.sleep(SLEEP_SECONDS)
-
         if i % 50 == 0 or i == total:
             print(f"✅ Progress: {i}/{total}")
 
-    if batch_updates:
-        body = {"valueInputOption": "USER_ENTERED", "data": list(batch_updates)}
-        sh.values_batch_update(body)
-        print("💾 Saved last batch")
-
-    print("🚀 Done!")
+    writer.flush()
+    print(f"🚀 Done! ({writer.summary()})")
 
 if __name__ == "__main__":
     main()
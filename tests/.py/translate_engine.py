@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+translate_engine.py
+-------------------
+Asynkron översättningsmotor som delas av translate_*-skripten.
+- Begränsar antal samtidiga OpenAI-anrop (TRANSLATE_CONCURRENCY, default 8)
+- Timeout per anrop (TRANSLATE_TIMEOUT, default 60 s) med retry + backoff
+- Resultat returneras i samma ordning som jobben skickades in
+- Identiska jobb (samma key) översätts bara en gång per körning
+- Anropstakten styrs av rate_limiter.py (RPM/TPM, x-ratelimit-headers, 429 + jitter)
+- Klienten mäts av llm_telemetry.py (latens, tokens, kostnad, retries → JSONL)
+
+Exempel:
+    engine = TranslateEngine(model="gpt-4o", concurrency=8)
+
+    async def worker(text):
+        return await engine.complete([{"role": "user", "content": text}])
+
+    results = engine.run_sync(texts, worker)
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+
+from rate_limiter import (
+    backoff_delay, error_headers, estimate_request_tokens, get_limiter, is_rate_limit_error,
+)
+from llm_telemetry import instrument
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "60"))
+DEFAULT_RETRIES = int(os.getenv("TRANSLATE_RETRIES", "3"))
+PROGRESS_EVERY = 20
+
+log = logging.getLogger("translate_engine")
+
+
+# --------- OpenAI ---------
+def get_async_client(api_key: Optional[str] = None):
+    try:
+        from openai import AsyncOpenAI
+    except Exception:
+        print("❌ Paketet 'openai' saknas. Installera med: pip install openai")
+        raise
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Saknar OPENAI_API_KEY i .env.local")
+    # SDK:ns egna 429-retries stängs av – rate_limiter sköter backoff gemensamt
+    return instrument(AsyncOpenAI(api_key=api_key, max_retries=0))
+
+
+# --------- Motor ---------
+class TranslateEngine:
+    """Begränsad parallellism + timeout runt chat.completions."""
+
+    def __init__(
+        self,
+        client=None,
+        model: str = DEFAULT_MODEL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        limiter=None,
+    ):
+        self.client = client
+        self.limiter = limiter
+        self._owns_client = client is None
+        self.model = model
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.retries = max(1, int(retries))
+        self._sem = None
+        self._sem_loop = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # En semafor per event loop (asyncio.run skapar en ny loop varje gång);
+        # en egen klient skapas också om, dess anslutningar hör till den gamla loopen
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._sem_loop is not loop:
+            self._sem = asyncio.Semaphore(self.concurrency)
+            self._sem_loop = loop
+            if self._owns_client:
+                self.client = None
+        return self._sem
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs,
+    ) -> str:
+        """Ett chat-anrop med timeout och retry. Kastar sista felet om alla försök misslyckas."""
+        sem = self._semaphore()
+        if self.client is None:
+            self.client = get_async_client()
+        model = model or self.model
+        limiter = self.limiter or get_limiter(model)
+        tokens = estimate_request_tokens(messages, kwargs.get("max_tokens"))
+        last_err: Optional[BaseException] = None
+        for attempt in range(self.retries):
+            delay = backoff_delay(attempt)
+            try:
+                await limiter.acquire_async(tokens)
+                async with sem:
+                    resp = await asyncio.wait_for(
+                        self._create(model=model, messages=messages, temperature=temperature, **kwargs),
+                        timeout=self.timeout,
+                    )
+                headers = getattr(resp, "headers", None)
+                if headers is not None:
+                    limiter.update_from_headers(headers)
+                    resp = resp.parse()
+                return (resp.choices[0].message.content or "").strip()
+            except asyncio.TimeoutError as e:
+                last_err = e
+                log.warning(f"⏱️ Timeout efter {self.timeout}s (försök {attempt+1}/{self.retries})")
+            except Exception as e:
+                last_err = e
+                if is_rate_limit_error(e):
+                    delay = limiter.on_429(error_headers(e), attempt)
+                    log.warning(f"🚦 429 – väntar {delay:.1f}s (försök {attempt+1}/{self.retries})")
+                else:
+                    log.warning(f"⚠️ Retry {attempt+1}/{self.retries}: {e}")
+            if attempt + 1 < self.retries:
+                await asyncio.sleep(delay)
+        raise last_err
+
+    def _create(self, **kwargs):
+        # with_raw_response ger rate limit-headers; parse() ger vanliga svaret
+        completions = self.client.chat.completions
+        raw = getattr(completions, "with_raw_response", None)
+        return (raw or completions).create(**kwargs)
+
+    async def map(
+        self,
+        items: Sequence[Any],
+        worker: Callable[[Any], Awaitable[Any]],
+        key: Optional[Callable[[Any], Hashable]] = None,
+        on_error: Optional[Callable[[Any, BaseException], Any]] = None,
+        label: str = "",
+    ) -> List[Any]:
+        """Kör worker(item) för alla items och returnerar resultaten i samma ordning.
+
+        key:      jobb med samma nyckel delar på ett och samma anrop
+        on_error: fallback(item, fel) -> värde; utan den kastas felet vidare
+        """
+        tasks: Dict[Hashable, "asyncio.Task"] = {}
+        order: List[Hashable] = []
+        done = 0
+        total = 0
+
+        async def run(item):
+            nonlocal done
+            try:
+                return await worker(item)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                log.warning(f"❌ {label or 'jobb'} misslyckades: {e}")
+                return on_error(item, e)
+            finally:
+                done += 1
+                if done % PROGRESS_EVERY == 0 or done == total:
+                    log.info(f"--- {label or 'översättning'}: {done}/{total} klara ---")
+
+        for i, item in enumerate(items):
+            k = key(item) if key else i
+            if k not in tasks:
+                tasks[k] = asyncio.ensure_future(run(item))
+            order.append(k)
+        total = len(tasks)
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for t in tasks.values():
+                t.cancel()
+            raise
+        return [tasks[k].result() for k in order]
+
+    def run_sync(self, items, worker, **kwargs) -> List[Any]:
+        """Synkron ingång för skript som bara har en fas."""
+        return asyncio.run(self.map(items, worker, **kwargs))
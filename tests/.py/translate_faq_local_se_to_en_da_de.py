@@ -1,10 +1,17 @@
-import gspread
 import pandas as pd
-import time
 import os
-import json
+import asyncio
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from translate_engine import TranslateEngine, get_async_client
+from batch_translate import translate_fields, translate_multi
+from translation_memory import TranslationMemory
+from cache_keys import legacy_key_parser
+from catalog_templates import render_text
+from delta_manifest import DeltaManifest, write_delta
+from term_masker import TermMasker, PLACEHOLDER_PROMPT, load_protected_terms
+from llm_telemetry import tag
+from sheets_client import open_spreadsheet
 
 # 🔑 Läs env
 load_dotenv(".env.local")
@@ -17,67 +24,157 @@ GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
 if not all([SHEET_ID, GCP_PROJECT_ID, GCP_CLIENT_EMAIL, GCP_PRIVATE_KEY]):
     raise RuntimeError("❌ En eller flera miljövariabler saknas i .env.local")
 
-# 🔐 Google auth via service account från env
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
+sh = open_spreadsheet(SHEET_ID)
 
 # -----------------------------
 # Resten av din befintliga kod
 # -----------------------------
 
-# OpenAI-klient
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = "gpt-4o-mini"
+PROMPT_VERSION = "faq-local-v1"
+LANG_CODES = {"English": "EN", "Danish": "DA", "German": "DE"}
+SE_FIELDS = ["question_se", "answer_se", "answer_full_se"]
 
-# Cachefil för översättningar
+# OpenAI-klient (asynkron, begränsad parallellism)
+engine = TranslateEngine(client=get_async_client(os.getenv("OPENAI_API_KEY")), model=MODEL)
+
+# Översättningsminne (SQLite); gamla cachefilen importeras en gång
 CACHE_FILE = ".cache_faq_translate.json"
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, "r", encoding="utf-8") as f:
-        cache = json.load(f)
-else:
-    cache = {}
 
-def save_cache():
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+tm = TranslationMemory()
+imported = tm.import_json(CACHE_FILE, legacy_key_parser(), MODEL, PROMPT_VERSION)
+if imported:
+    print(f"📥 Importerade {imported} poster från {CACHE_FILE} till {tm.path}")
+
+# Färger/serier som ska skyddas – maskas med platshållare i stället för att spärra hela texten
+masker = TermMasker(load_protected_terms())
+print(f"🚫 Skyddar {len(masker)} domänord (serier & färger) med platshållare")
 
-# Hämta färger/serier som ska skyddas
-with open("faq_colors_from_pronto_se_v2.json", "r", encoding="utf-8") as f:
-    protected_words = set(json.load(f))
+def lookup_cached(text, lang_code):
+    """Svar utan API-anrop (mall, minne, bara skyddade namn) eller None."""
+    # Katalogsvar (färger/format) renderas från mallar
+    rendered = render_text(text, lang_code)
+    if rendered is not None:
+        return rendered, "TEMPLATE"
+    hit = tm.get(text, "SE", lang_code, MODEL, PROMPT_VERSION)
+    if hit is not None:
+        return hit, "CACHE"
+    masked, terms = masker.mask(text)
+    if terms and masker.only_terms(masked):
+        tm.put(text, text, "SE", lang_code, MODEL, PROMPT_VERSION)
+        return text, "PROTECTED"
+    return None
 
-def translate_text(text, target_lang, row_id):
+async def translate_text(text, target_lang, row_id):
     """Försök hämta från cache, annars OpenAI."""
-    key = f"{text}::{target_lang}"
-    if key in cache:
-        return cache[key], "CACHE"
+    lang_code = LANG_CODES[target_lang]
+    tag(stage=f"SE→{lang_code}", lang=lang_code)
+    cached = lookup_cached(text, lang_code)
+    if cached is not None:
+        return cached
 
-    # Skydda produktnamn/färger
-    for word in protected_words:
-        if word in text:
-            cache[key] = text
-            return text, "PROTECTED"
+    # Skydda produktnamn/färger: maska, översätt, sätt tillbaka
+    masked, terms = masker.mask(text)
+    translated = None
+    if terms:
+        prompt = f"Translate this FAQ text into {target_lang}. {PLACEHOLDER_PROMPT}\n\n{masked}"
+        reply = await engine.complete([{"role": "user", "content": prompt}], temperature=0.1)
+        translated = masker.unmask(reply, terms)
+        if translated is None:
+            print(f"⚠️ Rad {row_id}: platshållarna kom inte tillbaka intakta – översätter utan maskning")
 
     # Översätt via OpenAI
-    prompt = f"Translate this FAQ text into {target_lang}. Keep brand names, product series, and colors unchanged:\n\n{text}"
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.1,
-    )
-    translated = response.choices[0].message.content.strip()
-    cache[key] = translated
+    if translated is None:
+        prompt = f"Translate this FAQ text into {target_lang}. Keep brand names, product series, and colors unchanged:\n\n{text}"
+        translated = await engine.complete(
+            [{"role": "user", "content": prompt}],
+            temperature=0.1,
+        )
+    tm.put(text, translated, "SE", lang_code, MODEL, PROMPT_VERSION)
     return translated, "OPENAI"
 
-def process_sheet(limit=None):
+async def translate_row(row, target_lang, row_id):
+    """Alla SE-fält i raden i ett strukturerat anrop; mall/minne först och enskilda anrop för fält som inte kom tillbaka."""
+    lang_code = LANG_CODES[target_lang]
+    tag(stage=f"SE→{lang_code}", lang=lang_code)
+    out, pending, masks, same = {}, {}, {}, {}
+    for field in SE_FIELDS:
+        text = row[field]
+        if not str(text).strip():
+            out[field] = (text, "EMPTY")
+            continue
+        cached = lookup_cached(text, lang_code)
+        if cached is not None:
+            out[field] = cached
+            continue
+        first = next((f for f in SE_FIELDS if f in same.values() and row[f] == text), None)
+        if first is not None:
+            same[field] = first  # t.ex. answer_full_se == answer_se → skickas en gång
+            continue
+        same[field] = field
+        masked, terms = masker.mask(text)
+        pending[field[:-3]] = masked  # "question_se" → id "question"
+        masks[field[:-3]] = terms
+
+    if pending:
+        extra = PLACEHOLDER_PROMPT if any(masks.values()) else ""
+        replies = await translate_fields(engine, pending, "Swedish", target_lang, extra=extra)
+        for key, reply in replies.items():
+            field = f"{key}_se"
+            translated = masker.unmask(reply, masks[key]) if reply is not None else None
+            if translated is None:
+                print(f"⚠️ Rad {row_id}: {key} saknas i radsvaret – översätter fältet separat")
+                out[field] = await translate_text(row[field], target_lang, row_id)
+                continue
+            tm.put(row[field], translated, "SE", lang_code, MODEL, PROMPT_VERSION)
+            out[field] = (translated, "OPENAI")
+    for field, first in same.items():
+        out[field] = out[first]
+    return [out[f] for f in SE_FIELDS]
+
+async def translate_row_multi(row, langs, row_id):
+    """Alla SE-fält till alla språk i ett anrop; språk som underkänns tas om med translate_row."""
+    out = {lang: {} for lang in langs}
+    need, pending, masks, same = {}, {}, {}, {}
+    for field in SE_FIELDS:
+        text = row[field]
+        for lang in langs:
+            cached = lookup_cached(text, LANG_CODES[lang]) if str(text).strip() else (text, "EMPTY")
+            if cached is not None:
+                out[lang][field] = cached
+            else:
+                need.setdefault(field, []).append(lang)
+        if field not in need:
+            continue
+        first = next((f for f in need if f != field and f in same.values() and row[f] == text), None)
+        same[field] = first or field
+        if first is None:
+            pending[field[:-3]], masks[field[:-3]] = masker.mask(text)
+
+    retry = set()
+    if pending:
+        targets = {LANG_CODES[lang]: lang for lang in langs if any(lang in ls for ls in need.values())}
+        extra = PLACEHOLDER_PROMPT if any(masks.values()) else ""
+        replies = await translate_multi(engine, pending, "Swedish", targets, extra=extra)
+        for field, field_langs in need.items():
+            key = same[field][:-3]
+            for lang in field_langs:
+                reply = replies[LANG_CODES[lang]].get(key)
+                translated = masker.unmask(reply, masks[key]) if reply is not None else None
+                if translated is None:
+                    retry.add(lang)
+                    continue
+                tm.put(row[field], translated, "SE", LANG_CODES[lang], MODEL, PROMPT_VERSION)
+                out[lang][field] = (translated, "OPENAI")
+
+    # Godkända fält ligger redan i minnet → omtaget skickar bara det som fattas
+    for lang in [lang for lang in langs if lang in retry]:
+        print(f"⚠️ Rad {row_id}: {LANG_CODES[lang]} underkänt i flerspråkssvaret – tas om för sig")
+        for field, res in zip(SE_FIELDS, await translate_row(row, lang, row_id)):
+            out[lang].setdefault(field, res)
+    return [[out[lang][f] for f in SE_FIELDS] for lang in langs]
+
+def process_sheet(limit=None, full=False, per_field=False, per_language=False):
     ws_se = sh.worksheet("FAQ_SE")
     data = ws_se.get_all_records()
 
@@ -86,47 +183,74 @@ def process_sheet(limit=None):
     ws_da = sh.worksheet("FAQ_DA")
     ws_de = sh.worksheet("FAQ_DE")
 
-    updates_en, updates_da, updates_de = [], [], []
-
-    for idx, row in enumerate(data):
-        if limit and idx >= limit:
-            break
-        q_se, a_se, a_full_se = row["question_se"], row["answer_se"], row["answer_full_se"]
-
-        for lang, updates, ws in [
-            ("English", updates_en, ws_en),
-            ("Danish", updates_da, ws_da),
-            ("German", updates_de, ws_de),
-        ]:
-            tq, src1 = translate_text(q_se, lang, idx)
-            ta, src2 = translate_text(a_se, lang, idx)
-            taf, src3 = translate_text(a_full_se, lang, idx)
-
-            updates.append([tq, ta, taf, f"{src1}/{src2}/{src3}"])
-
-    # Batch update tillbaka till Google Sheets
-    def write_updates(ws, updates, lang):
-        ws.clear()
-        ws.append_row([f"question_{lang[:2].lower()}", f"answer_{lang[:2].lower()}", f"answer_full_{lang[:2].lower()}", "Source"])
-        for batch_start in range(0, len(updates), 200):
-            batch = updates[batch_start:batch_start+200]
-            ws.append_rows(batch)
-            time.sleep(5)
-
-    write_updates(ws_en, updates_en, "English")
-    write_updates(ws_da, updates_da, "Danish")
-    write_updates(ws_de, updates_de, "German")
-
-    save_cache()
+    langs = ["English", "Danish", "German"]
+    rows = data[:limit] if limit else data
+
+    # Bara nya/ändrade SE-rader översätts och skrivs; --limit är testläge och skriver alltid om
+    manifest = DeltaManifest("faq-local", namespace=f"{MODEL}/{PROMPT_VERSION}", sheet_id=SHEET_ID)
+    delta = manifest.diff(rows, SE_FIELDS, full=full or bool(limit))
+    print(f"🔎 FAQ_SE: {delta.describe()}")
+    if not delta.todo and not delta.deleted:
+        print("✅ Inget att översätta")
+        return
+    todo_rows = [rows[i] for i in delta.todo]
+
+    if per_field:
+        # Ett jobb per fält och språk; motorn kör dem parallellt och i ordning
+        jobs = [(row[field], lang, idx) for idx, row in zip(delta.todo, todo_rows) for lang in langs for field in SE_FIELDS]
+        flat = asyncio.run(engine.map(
+            jobs,
+            lambda job: translate_text(*job),
+            key=lambda job: (job[0], job[1]),
+            label="FAQ-översättning",
+        ))
+        results = [flat[k:k + len(SE_FIELDS)] for k in range(0, len(flat), len(SE_FIELDS))]
+    elif per_language:
+        # Ett jobb per rad och språk: frågan, svaret och hela svaret i samma anrop
+        jobs = [(row, lang, idx) for idx, row in zip(delta.todo, todo_rows) for lang in langs]
+        results = asyncio.run(engine.map(
+            jobs,
+            lambda job: translate_row(*job),
+            key=lambda job: (tuple(str(job[0][f]) for f in SE_FIELDS), job[1]),
+            label="FAQ-översättning (rader)",
+        ))
+    else:
+        # Ett jobb per rad: alla fält till EN, DA och DE i samma anrop
+        jobs = [(row, idx) for idx, row in zip(delta.todo, todo_rows)]
+        per_row = asyncio.run(engine.map(
+            jobs,
+            lambda job: translate_row_multi(job[0], langs, job[1]),
+            key=lambda job: tuple(str(job[0][f]) for f in SE_FIELDS),
+            label="FAQ-översättning (rader, alla språk)",
+        ))
+        results = [fields for row_res in per_row for fields in row_res]
+
+    updates = {lang: [] for lang in langs}
+    it = iter(results)
+    for _ in todo_rows:
+        for lang in langs:
+            (tq, src1), (ta, src2), (taf, src3) = next(it)
+            updates[lang].append([tq, ta, taf, f"{src1}/{src2}/{src3}"])
+
+    # Skriv tillbaka: full körning = rensa + skriv, annars bara ändrade rader
+    for ws, lang in [(ws_en, "English"), (ws_da, "Danish"), (ws_de, "German")]:
+        code = lang[:2].lower()
+        write_delta(ws, delta, updates[lang], [f"question_{code}", f"answer_{code}", f"answer_full_{code}", "Source"])
+    if not limit:
+        manifest.commit(rows, SE_FIELDS)
+
     print("✅ Translation finished and written to sheets.")
 
 def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, help="Limit antal rader för test")
+    parser.add_argument("--full", action="store_true", help="översätt och skriv om alla rader (ignorera manifestet)")
+    parser.add_argument("--per-field", action="store_true", help="ett anrop per fält och språk (gamla läget)")
+    parser.add_argument("--per-language", action="store_true", help="ett anrop per rad och språk i stället för ett per rad")
     args = parser.parse_args()
 
-    process_sheet(limit=args.limit)
+    process_sheet(limit=args.limit, full=args.full, per_field=args.per_field, per_language=args.per_language)
 
 if __name__ == "__main__":
     main()
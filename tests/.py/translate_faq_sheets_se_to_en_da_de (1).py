@@ -19,7 +19,7 @@ import argparse
 import re
 from pathlib import Path
 from typing import Dict, List
-import gspread
+from sheets_client import open_spreadsheet
 
 try:
     from dotenv import load_dotenv
@@ -139,21 +139,8 @@ def main():
         load_dotenv(ROOT / ".env.local")
 
     SHEET_ID = os.getenv("SHEET_ID_MAIN")
-    GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-    GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-    GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-    creds = {
-        "type": "service_account",
-        "project_id": GCP_PROJECT_ID,
-        "private_key_id": "dummy",
-        "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-        "client_email": GCP_CLIENT_EMAIL,
-        "client_id": "dummy",
-        "token_uri": "https://oauth2.googleapis.com/token",
-    }
-    gc = gspread.service_account_from_dict(creds)
-    sh = gc.open_by_key(SHEET_ID)
+
+    sh = open_spreadsheet(SHEET_ID)
 
     ws_se = sh.worksheet("FAQ_SE")
     ws_en = sh.worksheet("FAQ_EN")
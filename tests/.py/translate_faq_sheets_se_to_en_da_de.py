@@ -1,43 +1,39 @@
 import os
 import json
 import re
-import gspread
+import asyncio
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from translate_engine import TranslateEngine, get_async_client
+from translation_memory import TranslationMemory
+from cache_keys import legacy_key_parser
+from catalog_templates import render_text
+from lang_verifier import recheck
+from llm_telemetry import tag
+from sheets_client import open_spreadsheet
 
 # 🔑 Ladda miljövariabler
 load_dotenv(".env.local")
 
 SHEET_ID = os.getenv("SHEET_ID_MAIN")
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
 
-# 📂 Cache
+sh = open_spreadsheet(SHEET_ID)
+
+# 📂 Översättningsminne (SQLite); gamla JSON-cachen importeras en gång
 CACHE_FILE = ".cache_faq_translate_merged.json"
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, "r", encoding="utf-8") as f:
-        cache = json.load(f)
-else:
-    cache = {}
+MODEL = "gpt-4o-mini"
+PROMPT_VERSION = "faq-sheets-v1"
+
+tm = TranslationMemory()
+imported = tm.import_json(CACHE_FILE, legacy_key_parser(), MODEL, PROMPT_VERSION)
+if imported:
+    print(f"📥 Importerade {imported} poster från {CACHE_FILE} till {tm.path}")
 
 # 📂 Facit med giltiga format
 with open("faq-extended/valid_formats_by_series.cleaned.json", "r", encoding="utf-8") as f:
     valid_formats = json.load(f)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+engine = TranslateEngine(client=get_async_client(os.getenv("OPENAI_API_KEY")), model=MODEL)
 
 FAQ_SHEETS = {
     "SE": "FAQ_SE",
@@ -78,60 +74,55 @@ def normalize_formats(text: str, serie: str):
 
     return text
 
-def is_swedish(text: str):
-    """Enkel heuristik för att avgöra om texten fortfarande är svenska"""
-    swedish_markers = ["är", "och", "inte", "eller", "plattor", "ytan", "mycket", "finns", "vilka"]
-    count = sum(1 for m in swedish_markers if m in text.lower())
-    return count >= 2  # om minst 2 vanliga svenska ord finns, troligen svensk text
+async def translate_text(text, target_lang, serie):
+    tag(stage=f"SE→{target_lang}", lang=target_lang)
+    # Katalogsvar (färger/format) renderas från mallar utan API-anrop
+    rendered = render_text(text, target_lang)
+    if rendered is not None:
+        return rendered, "TEMPLATE"
 
-def translate_text(text, target_lang, serie):
-    key = f"{target_lang}::{text.strip()}"
-    if key in cache:
+    hit = tm.get(text, "SE", target_lang, MODEL, PROMPT_VERSION)
+    if hit is not None:
         print(f"   ↪ [CACHE] {target_lang} :: {text[:60]}...")
-        return cache[key], "CACHE"
+        return hit, "CACHE"
 
     # Första försök
     prompt = f"Translate the following from Swedish to {target_lang}. Always output in {target_lang}. Keep series names, colors, and formats unchanged:\n\n{text}"
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    translated = await engine.complete(
+        [
             {"role": "system", "content": LANG_PROMPTS[target_lang]},
             {"role": "user", "content": prompt}
         ],
         temperature=0.2
     )
-    translated = resp.choices[0].message.content.strip()
-
-    # Efterkontroll: om fortfarande svenska → kör om striktare
-    if is_swedish(translated):
-        print(f"      ⚠️ Detekterade svenska i {target_lang}-output, kör om striktare...")
-        strict_prompt = f"The following text is in Swedish. You must output only in {target_lang}. Do not output Swedish. Keep product series names, colors, and formats unchanged:\n\n{text}"
-        resp2 = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": LANG_PROMPTS[target_lang]},
-                {"role": "user", "content": strict_prompt}
-            ],
-            temperature=0.0
-        )
-        translated = resp2.choices[0].message.content.strip()
 
     # Normalisera formaten efter översättning
     translated = normalize_formats(translated, serie)
 
-    cache[key] = translated
+    tm.put(text, translated, "SE", target_lang, MODEL, PROMPT_VERSION)
     print(f"   ↪ [AI] {target_lang} :: {text[:60]}...")
     return translated, "AI"
 
-def process_sheet():
-    ws_se = sh.worksheet(FAQ_SHEETS["SE"])
-    rows = ws_se.get_all_records()
-
-    out_data = {lang: [] for lang in ["EN", "DA", "DE"]}
-    ai_count = 0
-    cache_count = 0
+async def translate_strict(text, target_lang, serie):
+    """Omförsök när språkkontrollen ser att svenskan finns kvar i utdata."""
+    tag(stage="strict", lang=target_lang)
+    print(f"      ⚠️ Detekterade svenska i {target_lang}-output, kör om striktare...")
+    strict_prompt = f"The following text is in Swedish. You must output only in {target_lang}. Do not output Swedish. Keep product series names, colors, and formats unchanged:\n\n{text}"
+    translated = await engine.complete(
+        [
+            {"role": "system", "content": LANG_PROMPTS[target_lang]},
+            {"role": "user", "content": strict_prompt}
+        ],
+        temperature=0.0
+    )
+    translated = normalize_formats(translated, serie)
+    tm.put(text, translated, "SE", target_lang, MODEL, PROMPT_VERSION)
+    return translated, "AI"
 
-    for idx, row in enumerate(rows, 1):
+async def translate_rows(rows):
+    # Alla (rad, språk, fält) som ett jobb; unika texter per språk översätts en gång
+    jobs = []
+    for row in rows:
         q_se = row.get("question_se", "")
         a_se = row.get("answer_se", "")
         serie_hit = None
@@ -139,24 +130,48 @@ def process_sheet():
             if serie.lower() in (q_se + " " + a_se).lower():
                 serie_hit = serie
                 break
-
         for lang in ["EN", "DA", "DE"]:
-            q_trans, src1 = translate_text(q_se, lang, serie_hit or "")
-            a_trans, src2 = translate_text(a_se, lang, serie_hit or "")
+            jobs.append((q_se, lang, serie_hit or ""))
+            jobs.append((a_se, lang, serie_hit or ""))
+
+    results = await engine.map(
+        jobs,
+        lambda job: translate_text(*job),
+        key=lambda job: (job[1], job[0].strip()),
+        label="SE→EN/DA/DE",
+    )
+    # Efterkontroll av alla nya översättningar på en gång; bara tydlig svenska körs om striktare
+    results = await recheck(
+        jobs, results,
+        redo=lambda job: translate_strict(*job),
+        target=lambda job: job[1],
+        source=lambda job: "SE",
+        key=lambda job: (job[1], job[0].strip()),
+    )
 
+    out_data = {lang: [] for lang in ["EN", "DA", "DE"]}
+    ai_count = 0
+    cache_count = 0
+    it = iter(results)
+    for _ in rows:
+        for lang in ["EN", "DA", "DE"]:
+            q_trans, src1 = next(it)
+            a_trans, src2 = next(it)
             out_data[lang].append([q_trans, a_trans, "AI/Cache"])
 
             if src1 == "AI" or src2 == "AI":
                 ai_count += 1
             else:
                 cache_count += 1
+    return out_data, ai_count, cache_count
 
-        print(f"✅ Rad {idx} klar")
+def process_sheet():
+    ws_se = sh.worksheet(FAQ_SHEETS["SE"])
+    rows = ws_se.get_all_records()
+
+    out_data, ai_count, cache_count = asyncio.run(translate_rows(rows))
 
-        if idx % 20 == 0:
-            print(f"--- Status {idx}/{len(rows)} rader: AI={ai_count}, CACHE={cache_count} ---")
-            with open(CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
+    print(f"--- Status {len(rows)}/{len(rows)} rader: AI={ai_count}, CACHE={cache_count} ---")
 
     # ✍️ Skriv tillbaka
     for lang in ["EN", "DA", "DE"]:
@@ -165,9 +180,6 @@ def process_sheet():
         ws.append_row(["question_" + lang.lower(), "answer_" + lang.lower(), "Källa FAQ / AI"])
         ws.append_rows(out_data[lang])
 
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
-
     print("🎉 Översättning klar och sparad till Google Sheets")
 
 def main():
@@ -1,53 +1,65 @@
 import os
 import json
 import re
-import gspread
+import asyncio
+import logging
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from translate_engine import TranslateEngine, get_async_client
+from translation_memory import TranslationMemory
+from cache_keys import legacy_key_parser
+from catalog_templates import FORMAT_LABEL, render_text
+from segment_translate import InflightSegments, SegmentPlan
+from pivot_pipeline import PivotPipeline
+from delta_manifest import DeltaManifest, write_delta
+from lang_verifier import recheck
+from llm_telemetry import tag
+from sheets_client import open_spreadsheet
 
 # 🔑 Ladda miljövariabler
 load_dotenv(".env.local")
 
 SHEET_ID = os.getenv("SHEET_ID_MAIN")
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
 
-# 📂 Cache
+sh = open_spreadsheet(SHEET_ID)
+
+# 📂 Översättningsminne (SQLite); gamla JSON-cachen importeras en gång
 CACHE_FILE = "faq-extended/cache/faq_translate.json"
 LOG_FILE = "faq-extended/logg/translate_run.log"
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, "r", encoding="utf-8") as f:
-        try:
-            cache = json.load(f)
-        except Exception:
-            cache = {}
-else:
-    cache = {}
-
-# 📂 Facit med giltiga format
-with open("faq-extended/valid_formats_by_series.cleaned.json", "r", encoding="utf-8") as f:
-    valid_formats = json.load(f)
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-import logging
-os.makedirs("faq-extended/cache", exist_ok=True)
-os.makedirs("faq-extended/logg", exist_ok=True)
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format="%(asctime)s %(message)s")
-
+MODEL = "gpt-4o"
+PROMPT_VERSION = "faq-sheets-v1"
+
+# 📂 Facit med giltiga format (läses första gången det behövs)
+VALID_FORMATS_FILE = "faq-extended/valid_formats_by_series.cleaned.json"
+valid_formats = None
+
+def load_valid_formats():
+    global valid_formats
+    if valid_formats is None:
+        with open(VALID_FORMATS_FILE, "r", encoding="utf-8") as f:
+            valid_formats = json.load(f)
+    return valid_formats
+
+# Sätts av setup(): CLI-körning skapar dem från .env.local, translation_bench.py skickar in egna
+tm = None
+engine = None
+
+def setup(sheet=None, memory=None, translate_engine=None):
+    """Ark, översättningsminne och motor för funktionerna nedan; det som inte skickas in skapas som vanligt."""
+    global sh, tm, engine
+    if sheet is not None:
+        sh = sheet
+    if memory is None:
+        memory = TranslationMemory()
+        imported = memory.import_json(CACHE_FILE, legacy_key_parser(pivot=True), MODEL, PROMPT_VERSION)
+        if imported:
+            logging.info(f"📥 Importerade {imported} poster från {CACHE_FILE} till {memory.path}")
+    tm = memory
+    if translate_engine is None:
+        translate_engine = TranslateEngine(client=get_async_client(os.getenv("OPENAI_API_KEY")), model=MODEL)
+    engine = translate_engine
+
+SE_FIELDS = ["question_se", "answer_se"]
 
 FAQ_SHEETS = {"SE":"FAQ_SE","EN":"FAQ_EN","DA":"FAQ_DA","DE":"FAQ_DE"}
 
@@ -57,21 +69,20 @@ LANG_PROMPTS = {
     "DE": "Übersetzen Sie die folgende FAQ (Frage und Antwort) vom Schwedischen ins Deutsche. Seriennamen, Farben und Formate unverändert lassen, falls vorhanden."
 }
 
-FORMAT_LABEL = {"EN":"Available formats","DA":"Tilgængelige formater","DE":"Verfügbare Formate","SE":"Tillgängliga format"}
-
 # 🧹 Regex för alla mått
 DIM_RX = re.compile(r"(\d{1,3}(?:,\d{1,2})?\s*x\s*\d{1,3}(?:,\d{1,2})?\s*(?:cm)?)", re.IGNORECASE)
 
 def series_valid_set(serie: str):
     s = set()
-    if serie and serie in valid_formats:
-        for _, flist in valid_formats[serie].items():
+    formats = load_valid_formats()
+    if serie and serie in formats:
+        for _, flist in formats[serie].items():
             s.update(flist)
     return s
 
 def normalize_formats(text: str, serie: str, target_lang: str) -> str:
     """Ta bort ALLA mått som inte finns i facit och lägg alltid in korrekt facit-rad."""
-    if not isinstance(text, str) or not serie or serie not in valid_formats:
+    if not isinstance(text, str) or not serie or serie not in load_valid_formats():
         return text
 
     valid_set = series_valid_set(serie)
@@ -97,96 +108,167 @@ def normalize_formats(text: str, serie: str, target_lang: str) -> str:
     logging.info(f"      ↪ Normaliserade format för serie '{serie}' → {facit_line}")
     return text
 
-def is_swedish(text: str) -> bool:
-    sw = ["är","och","inte","eller","plattor","ytan","mycket","finns","vilka","hur","påverkas","kan","säker","halk"]
-    return sum(1 for w in sw if w in text.lower()) >= 2
+SOURCE_NAMES = {"SE": "Swedish", "EN": "English"}
 
-def translate_text(text: str, target_lang: str, serie: str):
-    key = f"{target_lang}::{text.strip()}"
-    if key in cache:
+async def translate_text(text: str, target_lang: str, serie: str, source_lang: str = "SE"):
+    rendered = render_text(text, target_lang, source_lang)
+    if rendered is not None:
+        return rendered, "TEMPLATE"
+    hit = tm.get(text, source_lang, target_lang, MODEL, PROMPT_VERSION)
+    if hit is not None:
         logging.info(f"   ↪ [CACHE] {target_lang} :: {text[:60]}...")
-        return cache[key], "CACHE"
+        return hit, "CACHE"
 
     prompt = f"Translate the following from Swedish to {target_lang}. Always output in {target_lang}. Keep series names, colors, and formats unchanged:\n\n{text}"
-    resp = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    translated = await engine.complete(
+        [
             {"role": "system", "content": LANG_PROMPTS[target_lang]},
             {"role": "user", "content": prompt}
         ],
         temperature=0.2
     )
-    translated = resp.choices[0].message.content.strip()
-
-    # Efterkontroll
-    if is_swedish(translated):
-        logging.info(f"      ⚠️ Detekterade svenska i {target_lang}-output, kör om striktare...")
-        strict_prompt = f"The following text is in Swedish. You must output only in {target_lang}. Do not output Swedish. Keep product series names, colors, and formats unchanged:\n\n{text}"
-        resp2 = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": LANG_PROMPTS[target_lang]},
-                {"role": "user", "content": strict_prompt}
-            ],
-            temperature=0.0
-        )
-        translated = resp2.choices[0].message.content.strip()
-
-    cache[key] = translated
+
+    tm.put(text, translated, source_lang, target_lang, MODEL, PROMPT_VERSION)
     logging.info(f"   ↪ [AI] {target_lang} :: {text[:60]}...")
     return translated, "AI"
 
-def process_sheet():
-    ws_se = sh.worksheet(FAQ_SHEETS["SE"])
-    rows = ws_se.get_all_records()
+async def translate_strict(text: str, target_lang: str, source_lang: str = "SE"):
+    """Omförsök när språkkontrollen ser att källspråket finns kvar i utdata."""
+    tag(stage="strict", lang=target_lang)
+    source_name = SOURCE_NAMES.get(source_lang, source_lang)
+    strict_prompt = f"The following text is in {source_name}. You must output only in {target_lang}. Do not output {source_name}. Keep product series names, colors, and formats unchanged:\n\n{text}"
+    translated = await engine.complete(
+        [
+            {"role": "system", "content": LANG_PROMPTS[target_lang]},
+            {"role": "user", "content": strict_prompt}
+        ],
+        temperature=0.0
+    )
+    tm.put(text, translated, source_lang, target_lang, MODEL, PROMPT_VERSION)
+    return translated, "AI"
+
+async def translate_all(jobs):
+    """jobs = [(text, lang, serie, källspråk)] → [(översättning, källa)] i samma ordning, unika texter en gång."""
+    results = await engine.map(
+        jobs,
+        lambda job: translate_text(*job),
+        key=lambda job: (job[1], job[0].strip()),
+        label=f"{jobs[0][1] if jobs else ''}-översättning",
+    )
+    # Språkkontroll av hela batchen; bara tydliga fall körs om
+    return await recheck(
+        jobs, results,
+        redo=lambda job: translate_strict(job[0], job[1], job[-1]),
+        target=lambda job: job[1],
+        source=lambda job: job[-1],
+        key=lambda job: (job[1], job[0].strip()),
+    )
+
+async def translate_answers(texts, lang, source_lang, inflight=None):
+    """Svar: hela svaret från minnet om det finns, annars segmentvis (unika rader/meningar en gång).
+
+    inflight (InflightSegments): segment delas med andra samtidiga anrop (en rad i taget i pipelinen).
+    """
+    out = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        rendered = render_text(text, lang, source_lang)
+        hit = rendered if rendered is not None else tm.get(text, source_lang, lang, MODEL, PROMPT_VERSION)
+        if hit is not None:
+            out[i] = (hit, "TEMPLATE" if rendered is not None else "CACHE")
+        else:
+            missing.append(i)
+    plan = SegmentPlan([texts[i] for i in missing])
+    def translate_many(segments):
+        return translate_all([(seg, lang, "", source_lang) for seg in segments])
+
+    if inflight is not None:
+        res = await inflight.translate(plan.unique, source_lang, lang, translate_many)
+    else:
+        res = await translate_many(plan.unique)
+    joined = plan.assemble([t for t, _ in res])
+    for k, i in enumerate(missing):
+        src = "AI" if any(res[j][1] == "AI" for j in plan.indices[k]) else "CACHE"
+        if texts[i].strip():
+            tm.put(texts[i], joined[k], source_lang, lang, MODEL, PROMPT_VERSION)
+        out[i] = (joined[k], src)
+    logging.info(f"✂️ {lang}: {len(missing)} svar → {plan.segment_count} segment, {len(plan.unique)} unika")
+    return out
+
+async def translate_rows(rows):
+    """SE→EN→DA/DE som pipeline: varje rads EN-svar går direkt vidare till DA och DE."""
+    sources = {}
+    # Rubriker/listpunkter som flera svar delar översätts en gång även när raderna körs samtidigt
+    inflight = InflightSegments()
+
+    async def translate_field(text, src, tgt, field):
+        if field == "answer":
+            (res,) = await translate_answers([text], tgt, src, inflight)
+        else:
+            (res,) = await translate_all([(text, tgt, "", src)])
+        sources[(tgt, text.strip())] = res[1]
+        return res[0]
+
+    pipeline = PivotPipeline(translate_field)
+    results = await pipeline.run(
+        (i, {"question": row.get("question_se", ""), "answer": row.get("answer_se", "")})
+        for i, row in enumerate(rows)
+    )
 
     out_data = {lang: [] for lang in ["EN", "DA", "DE"]}
     ai_count = 0
     cache_count = 0
-
-    for idx, row in enumerate(rows, 1):
-        q_se = row.get("question_se", "")
-        a_se = row.get("answer_se", "")
-        serie_hit = None
-        hay = (q_se + " " + a_se).lower()
-        for serie in valid_formats.keys():
-            if serie.lower() in hay:
-                serie_hit = serie
-                break
-
-        # Först SE->EN
-        q_en, src1 = translate_text(q_se, 'EN', serie_hit or '')
-        a_en, src2 = translate_text(a_se, 'EN', serie_hit or '')
-        out_data['EN'].append([q_en, a_en, 'AI/Cache'])
-        
-        # Sedan EN->DA och EN->DE baserat på EN-output
-        for lang in ['DA','DE']:
-            q_trans, _ = translate_text(q_en, lang, serie_hit or '')
-            a_trans, _ = translate_text(a_en, lang, serie_hit or '')
-            out_data[lang].append([q_trans, a_trans, 'AI/Cache'])
-        
-        if src1 == 'AI' or src2 == 'AI':
+    for i, row in enumerate(rows):
+        res = results.get(i, {})
+        for lang in ["EN", "DA", "DE"]:
+            # Misslyckat språk (eller EN-steget) → None: cellerna i fliken lämnas orörda
+            fields = res.get(lang)
+            out_data[lang].append(None if fields is None else [fields["question"], fields["answer"], "AI/Cache"])
+        se = (row.get("question_se", ""), row.get("answer_se", ""))
+        if any(sources.get(("EN", t.strip())) == "AI" for t in map(str, se)):
             ai_count += 1
         else:
             cache_count += 1
+    logging.info(f"🔗 {inflight.shared} segment delade mellan samtidiga rader")
+    if pipeline.failed:
+        logging.info(f"❌ {len(pipeline.failed)} rad/språk misslyckades: {[(i, l) for i, l, _ in pipeline.failed][:10]}")
+    return out_data, ai_count, cache_count, {i for i, _, _ in pipeline.failed}
+
+def process_sheet(full=False):
+    ws_se = sh.worksheet(FAQ_SHEETS["SE"])
+    rows = ws_se.get_all_records()
 
-        print(f"✅ Rad {idx} klar")
-            logging.info(f"Rad {idx} klar")
-        if idx % 20 == 0:
-        logging.info(f"--- Status {idx}/{len(rows)} rader: AI={ai_count}, CACHE={cache_count} ---")
-            with open(CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
+    # Bara nya/ändrade SE-rader översätts och skrivs (hash per rad i manifestet)
+    manifest = DeltaManifest("faq-sheets-updated", namespace=f"{MODEL}/{PROMPT_VERSION}", sheet_id=SHEET_ID)
+    delta = manifest.diff(rows, SE_FIELDS, full=full)
+    print(f"🔎 FAQ_SE: {delta.describe()}")
+    if not delta.todo and not delta.deleted:
+        print("✅ Inget att översätta")
+        return
 
+    todo_rows = [rows[i] for i in delta.todo]
+    out_data, ai_count, cache_count, failed = asyncio.run(translate_rows(todo_rows))
+
+    print(f"✅ {len(todo_rows)} rader klara")
+    logging.info(f"--- Status {len(todo_rows)}/{len(rows)} rader: AI={ai_count}, CACHE={cache_count} ---")
+
+    # Skriv till Google Sheets när alla rader är klara (SE lämnas orörd)
     for lang in ["EN", "DA", "DE"]:
         ws = sh.worksheet(FAQ_SHEETS[lang])
-        ws.clear()  # SE lämnas orörd
-        ws.append_row([f"question_{lang.lower()}", f"answer_{lang.lower()}", "Källa FAQ / AI"])
-        ws.append_rows(out_data[lang])
-
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+        header = [f"question_{lang.lower()}", f"answer_{lang.lower()}", "Källa FAQ / AI"]
+        write_delta(ws, delta, out_data[lang], header)
+    # Misslyckade rader markeras så att nästa körning tar dem igen
+    manifest.commit(rows, SE_FIELDS, pending=[delta.todo[k] for k in failed])
 
     logging.info("🎉 Översättning klar och sparad till Google Sheets")
 
 if __name__ == "__main__":
-    process_sheet()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="översätt och skriv om alla rader (ignorera manifestet)")
+    args = parser.parse_args()
+    os.makedirs("faq-extended/cache", exist_ok=True)
+    os.makedirs("faq-extended/logg", exist_ok=True)
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format="%(asctime)s %(message)s")
+    setup()
+    process_sheet(full=args.full)
@@ -1,10 +1,27 @@
 import pandas as pd
-from openai import OpenAI
-import time
 import os
+import argparse
 from datetime import datetime
 
-client = OpenAI()  # API-nyckel via $env:OPENAI_API_KEY
+from translate_engine import TranslateEngine
+from pivot_pipeline import run_pipeline
+from translation_memory import TranslationMemory
+from cache_keys import text_hash
+from batch_jobs import BatchRunner, get_backend, DEFAULT_BACKEND
+
+# --batch: alla översättningar som batchjobb (billigare, blockerar inte terminalen).
+# Utan --wait avslutas skriptet efter att jobbet skickats – kör samma kommando igen för att hämta resultatet.
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch", action="store_true", help="skicka som batchjobb i stället för direkta anrop")
+parser.add_argument("--backend", choices=["openai", "local"], default=DEFAULT_BACKEND, help="local = offline-test utan API")
+parser.add_argument("--wait", action="store_true", help="vänta (polla) tills batchjobben är klara")
+args = parser.parse_args()
+
+MODEL = "gpt-4o"
+PROMPT_VERSION = "faq-full-pivot-v1"
+BATCH_ROUNDS = int(os.getenv("BATCH_ROUNDS", "3"))  # nya jobb för fel/saknade svar per körning
+
+engine = TranslateEngine(model=MODEL)  # API-nyckel via $env:OPENAI_API_KEY
 
 # Mappar och filnamn
 output_dir = "översättning"
@@ -13,6 +30,7 @@ os.makedirs(output_dir, exist_ok=True)
 input_file = "Faq med 553 frågor och svar SE DA EN DE.xlsx"
 output_file = os.path.join(output_dir, "faq_pivot_full_gpt4o.xlsx")
 checkpoint_file = os.path.join(output_dir, "progress_checkpoint.txt")
+batch_state_file = os.path.join(output_dir, "full_pivot.batch.json")
 log_file = os.path.join(output_dir, "translation_log.txt")
 
 # Initiera logg
@@ -32,125 +50,156 @@ faq_de = df_dict["FAQ_DE"].copy()
 
 total_rows = len(faq_se_orig)
 
-# Resume: Läs checkpoint
+# Resume: Läs checkpoint (batchläget återupptar via översättningsminnet i stället)
 start_row = 0
-if os.path.exists(checkpoint_file):
+if args.batch:
+    log(f"📦 Batchläge ({args.backend}) för {total_rows} rader (SE → EN → DA/DE) med {MODEL}")
+elif os.path.exists(checkpoint_file):
     with open(checkpoint_file, "r") as f:
         start_row = int(f.read().strip())
     log(f"⏩ Fortsätter från rad {start_row+1}/{total_rows}")
 else:
     log(f"🚀 Startar ny översättning av {total_rows} rader (SE → EN → DA/DE) med gpt-4o")
 
-# --- Steg 1: SE → EN ---
-translation_map_en = {}
-
-for idx, row in faq_se_orig.iloc[start_row:].iterrows():
-    q_se, a_se = row["question_se"], row["answer_se"]
-
-    log(f"[SE→EN] Rad {idx+1}/{total_rows}")
-    try:
-        resp_q = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": f"Translate this Swedish question into English:\n\n{q_se}"}],
-        )
-        q_en = resp_q.choices[0].message.content.strip()
-
-        if a_se not in translation_map_en:
-            resp_a = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": f"Translate this Swedish answer into English:\n\n{a_se}"}],
-            )
-            translation_map_en[a_se] = resp_a.choices[0].message.content.strip()
-
-        a_en = translation_map_en[a_se]
-
-        faq_en.loc[idx, "question_en"] = q_en
-        faq_en.loc[idx, "answer_en"] = a_en
-        faq_en.loc[idx, "AutoTranslated"] = True
-        log(f"✅ SE→EN klar rad {idx+1}")
-    except Exception as e:
-        log(f"⚠️ Fel vid rad {idx+1}: {e}")
-        time.sleep(2)
-
-    # Checkpoint
-    with open(checkpoint_file, "w") as f:
-        f.write(str(idx))
-
-    # Backup var 50:e rad
-    if (idx + 1) % 50 == 0:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(output_dir, f"backup_step1_row{idx+1}_{timestamp}.xlsx")
-        with pd.ExcelWriter(backup_file, engine="openpyxl") as writer:
-            faq_se_orig.to_excel(writer, "FAQ_SE", index=False)
-            faq_en.to_excel(writer, "FAQ_EN", index=False)
-            faq_da.to_excel(writer, "FAQ_DA", index=False)
-            faq_de.to_excel(writer, "FAQ_DE", index=False)
-        log(f"💾 Backup sparad: {backup_file}")
-
-    time.sleep(1.2)
-
-# --- Steg 2: EN → DA och DE ---
-translation_map_da, translation_map_de = {}, {}
-
-for idx, row in faq_en.iloc[start_row:].iterrows():
-    q_en, a_en = row["question_en"], row["answer_en"]
-
-    log(f"[EN→DA/DE] Rad {idx+1}/{total_rows}")
-    try:
-        resp_da_q = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": f"Translate this English question into Danish:\n\n{q_en}"}],
-        )
-        q_da = resp_da_q.choices[0].message.content.strip()
-
-        resp_de_q = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": f"Translate this English question into German:\n\n{q_en}"}],
-        )
-        q_de = resp_de_q.choices[0].message.content.strip()
-
-        if a_en not in translation_map_da:
-            resp_da_a = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": f"Translate this English answer into Danish:\n\n{a_en}"}],
-            )
-            translation_map_da[a_en] = resp_da_a.choices[0].message.content.strip()
-
-        if a_en not in translation_map_de:
-            resp_de_a = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": f"Translate this English answer into German:\n\n{a_en}"}],
-            )
-            translation_map_de[a_en] = resp_de_a.choices[0].message.content.strip()
-
-        faq_da.loc[idx, "question_da"] = q_da
-        faq_da.loc[idx, "answer_da"] = translation_map_da[a_en]
-        faq_da.loc[idx, "AutoTranslated"] = True
-
-        faq_de.loc[idx, "question_de"] = q_de
-        faq_de.loc[idx, "answer_de"] = translation_map_de[a_en]
-        faq_de.loc[idx, "AutoTranslated"] = True
-        log(f"✅ EN→DA/DE klar rad {idx+1}")
-    except Exception as e:
-        log(f"⚠️ Fel vid rad {idx+1}: {e}")
-        time.sleep(5)
-
-    # Checkpoint
+# --- SE → EN → DA/DE som pipeline: varje rads EN-text går direkt vidare till DA och DE ---
+PROMPTS = {
+    ("SE", "EN"): "Translate this Swedish {field} into English:\n\n{text}",
+    ("EN", "DA"): "Translate this English {field} into Danish:\n\n{text}",
+    ("EN", "DE"): "Translate this English {field} into German:\n\n{text}",
+}
+TARGET_DF = {"EN": faq_en, "DA": faq_da, "DE": faq_de}
+
+async def translate(text, src, tgt, field):
+    prompt = PROMPTS[(src, tgt)].format(field=field, text=text)
+    return await engine.complete([{"role": "user", "content": prompt}])
+
+def on_result(idx, lang, fields):
+    df = TARGET_DF[lang]
+    df.loc[idx, f"question_{lang.lower()}"] = fields["question"]
+    df.loc[idx, f"answer_{lang.lower()}"] = fields["answer"]
+    df.loc[idx, "AutoTranslated"] = True
+    log(f"✅ {'SE' if lang == 'EN' else 'EN'}→{lang} klar rad {idx+1}")
+
+done_rows = set()
+next_row = start_row
+
+def save_backup(n):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_file = os.path.join(output_dir, f"backup_pivot_row{n}_{timestamp}.xlsx")
+    with pd.ExcelWriter(backup_file, engine="openpyxl") as writer:
+        faq_se_orig.to_excel(writer, "FAQ_SE", index=False)
+        faq_en.to_excel(writer, "FAQ_EN", index=False)
+        faq_da.to_excel(writer, "FAQ_DA", index=False)
+        faq_de.to_excel(writer, "FAQ_DE", index=False)
+    log(f"💾 Backup sparad: {backup_file}")
+
+def on_row_done(idx):
+    global next_row
+    done_rows.add(idx)
+    # Checkpoint = första raden som inte är helt klar (rader blir klara i olika ordning)
+    while next_row in done_rows:
+        next_row += 1
     with open(checkpoint_file, "w") as f:
-        f.write(str(idx))
-
-    # Backup var 50:e rad
-    if (idx + 1) % 50 == 0:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(output_dir, f"backup_step2_row{idx+1}_{timestamp}.xlsx")
-        with pd.ExcelWriter(backup_file, engine="openpyxl") as writer:
-            faq_se_orig.to_excel(writer, "FAQ_SE", index=False)
-            faq_en.to_excel(writer, "FAQ_EN", index=False)
-            faq_da.to_excel(writer, "FAQ_DA", index=False)
-            faq_de.to_excel(writer, "FAQ_DE", index=False)
-        log(f"💾 Backup sparad: {backup_file}")
-
-    time.sleep(1.5)
+        f.write(str(next_row))
+    # Backup var 50:e klar rad
+    if len(done_rows) % 50 == 0:
+        save_backup(len(done_rows))
+
+# --------- Batchläge ---------
+# Fas EN (SE→EN) måste vara helt inläst i minnet innan fas DA/DE byggs av EN-texterna.
+# Resultaten hamnar i översättningsminnet → en avbruten körning fortsätter där den var.
+FIELDS = ("question", "answer")
+
+def field_text(value):
+    return value.strip() if isinstance(value, str) else ""
+
+def batch_source(idx, src, field):
+    if src == "SE":
+        return field_text(faq_se_orig.loc[idx, f"{field}_se"])
+    return tm.get(batch_source(idx, "SE", field), "SE", src, MODEL, f"{PROMPT_VERSION}:{field}") or ""
+
+def pending_requests(pairs):
+    """custom_id -> förfrågan för alla (text, src, tgt, fält) som saknas i minnet; samma text skickas en gång."""
+    requests = {}
+    for src, tgt in pairs:
+        for field in FIELDS:
+            texts = {batch_source(idx, src, field) for idx in faq_se_orig.index} - {""}
+            hits = tm.get_many(texts, src, tgt, MODEL, f"{PROMPT_VERSION}:{field}")
+            for text in texts - set(hits):
+                prompt = PROMPTS[(src, tgt)].format(field=field, text=text)
+                requests[f"{src}-{tgt}-{field}-{text_hash(text)[:16]}"] = {
+                    "meta": [src, tgt, field, text],
+                    "messages": [{"role": "user", "content": prompt}],
+                }
+    return requests
+
+def run_batch_phase(runner, name, pairs):
+    """True när fasen är helt översatt; False om ett jobb fortfarande kör."""
+    for _ in range(BATCH_ROUNDS):
+        requests = pending_requests(pairs)
+        if not requests:
+            return True
+        results = runner.step(name, requests, MODEL, wait=args.wait, temperature=0.2)
+        if results is None:
+            return False
+        meta = runner.meta(name)
+        failed = 0
+        with tm.transaction():
+            for cid, content in results.items():
+                if cid not in meta or content is None:
+                    failed += 1
+                    continue
+                src, tgt, field, text = meta[cid]
+                tm.put(text, content, src, tgt, MODEL, f"{PROMPT_VERSION}:{field}")
+        # Först när svaren ligger i minnet – kraschar vi innan hämtas samma (betalda) jobb igen
+        runner.mark_collected(name)
+        log(f"📥 Fas {name}: {len(results) - failed} översättningar inlästa, {failed} fel")
+    left = len(pending_requests(pairs))
+    if left:
+        log(f"⚠️ Fas {name}: {left} förfrågningar saknar fortfarande svar – kör igen för att skicka om dem")
+    return not left
+
+def fill_from_memory():
+    missing = 0
+    for idx in faq_se_orig.index:
+        for lang in TARGET_DF:
+            src = "SE" if lang == "EN" else "EN"
+            fields = {}
+            for field in FIELDS:
+                text = batch_source(idx, src, field)
+                fields[field] = tm.get(text, src, lang, MODEL, f"{PROMPT_VERSION}:{field}") if text else ""
+            if any(v is None for v in fields.values()):
+                missing += 1
+                continue
+            if not any(fields.values()):
+                continue
+            df = TARGET_DF[lang]
+            df.loc[idx, f"question_{lang.lower()}"] = fields["question"]
+            df.loc[idx, f"answer_{lang.lower()}"] = fields["answer"]
+            df.loc[idx, "AutoTranslated"] = True
+    return missing
+
+failed = []
+if args.batch:
+    tm = TranslationMemory()
+    runner = BatchRunner(batch_state_file, get_backend(args.backend))
+    if not (run_batch_phase(runner, "SE-EN", [("SE", "EN")])
+            and run_batch_phase(runner, "EN-DA-DE", [("EN", "DA"), ("EN", "DE")])):
+        log("⏳ Batchjobb pågår – kör samma kommando igen senare (eller med --wait)")
+        raise SystemExit(0)
+    missing = fill_from_memory()
+    if missing:
+        failed = [missing]
+        log(f"⚠️ {missing} rad/språk saknar översättning i minnet")
+else:
+    rows = [
+        (idx, {"question": row["question_se"], "answer": row["answer_se"]})
+        for idx, row in faq_se_orig.iloc[start_row:].iterrows()
+    ]
+    pipeline = run_pipeline(rows, translate, on_result=on_result, on_row_done=on_row_done)
+    failed = pipeline.failed
+    for idx, lang, e in failed:
+        log(f"⚠️ Fel vid rad {idx+1} ({lang}): {e}")
 
 # --- Spara slutfil ---
 with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
@@ -160,5 +209,6 @@ with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
     faq_de.to_excel(writer, "FAQ_DE", index=False)
 
 log(f"✅ Klar! Fil sparad som {output_file}")
-log("📝 Checkpoint-fil raderad (fullt klart).")
-os.remove(checkpoint_file)
+if not failed and os.path.exists(checkpoint_file):
+    log("📝 Checkpoint-fil raderad (fullt klart).")
+    os.remove(checkpoint_file)
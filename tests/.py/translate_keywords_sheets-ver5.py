@@ -1,10 +1,11 @@
 import os
-import gspread
 import pandas as pd
-import json
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from term_masker import TermMasker, PLACEHOLDER_PROMPT, load_protected_terms
+from sheets_client import open_spreadsheet
+
 # Ladda miljövariabler
 load_dotenv(".env.local")
 
@@ -12,47 +13,17 @@ load_dotenv(".env.local")
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Google Sheets-auth
-gcp_email = os.getenv("GCP_CLIENT_EMAIL")
-gcp_key = os.getenv("GCP_PRIVATE_KEY").replace("\\n", "\n")
-gcp_project = os.getenv("GCP_PROJECT_ID")
 spreadsheet_id = os.getenv("SHEET_ID_MAIN")
 
-creds = {
-    "type": "service_account",
-    "project_id": gcp_project,
-    "private_key_id": "dummy",
-    "private_key": gcp_key,
-    "client_email": gcp_email,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token"
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(spreadsheet_id)
+sh = open_spreadsheet(spreadsheet_id)
 
 SE_SHEET = "SE_FULL_LOOKUP"
 LANGS = ["EN", "DA", "DE"]
 
-# --- Läs in serier/färger från JSON ---
+# --- Läs in serier/färger från JSON (gemensam tolkning i term_masker) ---
 colors_file = os.path.join("faq-extended", "faq_colors_from_pronto_se_v2.json")
-DO_NOT_TRANSLATE = set()
-try:
-    with open(colors_file, encoding="utf-8") as f:
-        colors_data = json.load(f)
-    for item in colors_data:
-        q = item.get("question_se", "")
-        if "serien" in q:
-            serie = q.split("serien")[-1].strip(" ?")
-            if serie:
-                DO_NOT_TRANSLATE.add(serie)
-        a = item.get("answer_se", "")
-        for line in a.split("\\n"):
-            if line.strip().startswith("-"):
-                color = line.split("(")[0].strip("- ").strip()
-                if color:
-                    DO_NOT_TRANSLATE.add(color)
-    print(f"🚫 Skyddar {len(DO_NOT_TRANSLATE)} domänord (serier & färger) från översättning")
-except FileNotFoundError:
-    print("⚠️ Kunde inte läsa färg/serie-listan – fortsätter utan skydd.")
+masker = TermMasker(load_protected_terms(colors_file))
+print(f"🚫 Skyddar {len(masker)} domänord (serier & färger) från översättning")
 
 # Globala räknare för skyddade ord
 protected_counts = {lang: 0 for lang in LANGS}
@@ -60,15 +31,18 @@ protected_counts = {lang: 0 for lang in LANGS}
 def safe_translate(text, src_lang, tgt_lang, row_idx, lang_code):
     if not isinstance(text, str) or text.strip() == "":
         return text
-    if text.strip() in DO_NOT_TRANSLATE:
+    # Skydda serier/färger: maska, översätt, sätt tillbaka (som translate_faq_local_se_to_en_da_de.py)
+    masked, terms = masker.mask(text)
+    if terms and masker.only_terms(masked):
         print(f"⏭️  Rad {row_idx}: hoppade över '{text}' (skyddat domänord)")
         protected_counts[lang_code] += 1
         return text
-    try:
+
+    def ask(keyword, extra):
         prompt = (
             f"Översätt följande keyword från {src_lang} till {tgt_lang}. "
             f"Svara endast med ett enda ord eller en kort fras, inget annat. "
-            f"Viktigt: översätt aldrig domänorden för serier och färger.\n\n{text}"
+            f"{extra}\n\n{keyword}"
         )
         resp = client.chat.completions.create(
             model="gpt-4o",
@@ -76,6 +50,14 @@ def safe_translate(text, src_lang, tgt_lang, row_idx, lang_code):
             temperature=0
         )
         return resp.choices[0].message.content.strip()
+
+    try:
+        if terms:
+            translated = masker.unmask(ask(masked, PLACEHOLDER_PROMPT), terms)
+            if translated is not None:
+                return translated
+            print(f"⚠️ Rad {row_idx}: platshållarna kom inte tillbaka intakta – översätter utan maskning")
+        return ask(text, "Viktigt: översätt aldrig domänorden för serier och färger.")
     except Exception as e:
         print(f"❌ Rad {row_idx}: {e}")
         return text
@@ -1,8 +1,8 @@
 import os
-import gspread
 import pandas as pd
 from dotenv import load_dotenv
 from openai import OpenAI
+from sheets_client import open_spreadsheet
 
 # Ladda miljövariabler
 load_dotenv(".env.local")
@@ -11,22 +11,9 @@ load_dotenv(".env.local")
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Google Sheets-auth
-gcp_email = os.getenv("GCP_CLIENT_EMAIL")
-gcp_key = os.getenv("GCP_PRIVATE_KEY").replace("\\n", "\n")
-gcp_project = os.getenv("GCP_PROJECT_ID")
 spreadsheet_id = os.getenv("SHEET_ID_MAIN")
 
-creds = {
-    "type": "service_account",
-    "project_id": gcp_project,
-    "private_key_id": "dummy",
-    "private_key": gcp_key,
-    "client_email": gcp_email,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token"
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(spreadsheet_id)
+sh = open_spreadsheet(spreadsheet_id)
 
 # Flikar
 SE_SHEET = "SE_FULL_LOOKUP"
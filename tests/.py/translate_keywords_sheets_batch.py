@@ -1,55 +1,57 @@
 import os
-import gspread
+import asyncio
 import pandas as pd
 from dotenv import load_dotenv
-from openai import OpenAI
 from itertools import islice
 
+from translate_engine import TranslateEngine
+from translation_memory import TranslationMemory
+from keyword_backends import BatchLLMBackend, MemoryBackend, SOURCE_LABEL, dictionary_chain
+from sheets_client import open_spreadsheet
+from sheet_writer import SheetWriter
+from sheet_mirror import SheetMirror
+
 # Ladda miljövariabler
 load_dotenv(".env.local")
 
-# OpenAI-klienten
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 # Google Sheets-auth
-gcp_email = os.getenv("GCP_CLIENT_EMAIL")
-gcp_key = os.getenv("GCP_PRIVATE_KEY").replace("\\n", "\n")
-gcp_project = os.getenv("GCP_PROJECT_ID")
 spreadsheet_id = os.getenv("SHEET_ID_MAIN")
 
-creds = {
-    "type": "service_account",
-    "project_id": gcp_project,
-    "private_key_id": "dummy",
-    "private_key": gcp_key,
-    "client_email": gcp_email,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token"
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(spreadsheet_id)
+sh = open_spreadsheet(spreadsheet_id)
 
 # Flikar
 SE_SHEET = "SE_FULL_LOOKUP"
 LANGS = ["EN", "DA", "DE"]
 
-def safe_translate(text, src_lang, tgt_lang, row_idx):
-    if not isinstance(text, str) or text.strip() == "":
-        return text
-    try:
-        prompt = (
-            f"Översätt följande keyword från {src_lang} till {tgt_lang}, "
-            f"korta ord eller fraser, korrekt och domänspecifikt:\n\n{text}"
-        )
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"❌ Rad {row_idx}: {e}")
-        return text
+MODEL = "gpt-4o"
+PROMPT_VERSION = "keywords-batch-v1"
+
+# Sätts av setup(): CLI-körning skapar dem själv, translation_bench.py skickar in egna
+engine = None
+tm = None
+chain = None
+
+def setup(sheet=None, memory=None, translate_engine=None):
+    """Ark, översättningsminne och motor; det som inte skickas in skapas som vanligt."""
+    global sh, engine, tm, chain
+    if sheet is not None:
+        sh = sheet
+    # OpenAI-motorn (asynkron, begränsad parallellism); klienten skapas per asyncio.run
+    engine = translate_engine if translate_engine is not None else TranslateEngine(model=MODEL)
+    tm = memory if memory is not None else TranslationMemory()
+    # Ordbok (FULL_LOOKUP-CSV:erna) → normaliserad ordbok → översättningsminnet → tokenpackade LLM-batcher
+    chain = dictionary_chain(
+        MemoryBackend(tm, MODEL, PROMPT_VERSION),
+        BatchLLMBackend(engine, tm, MODEL, PROMPT_VERSION,
+                        extra="Items are short keywords or phrases; translate correctly and domain-specifically, keyword only."),
+    )
+
+def translate_missing(keywords, tgt_lang):
+    """Översätter saknade keywords; (översättning, källa) per keyword, (None, None) där inget steg svarade."""
+    if not keywords:
+        return []
+    results, backends = asyncio.run(chain.translate(keywords, "SE", tgt_lang))
+    return [(r, SOURCE_LABEL.get(b)) for r, b in zip(results, backends)]
 
 # --- NYTT (CHANGED): Hjälpfunktion för chunking, så vi inte skickar för stora batcher ---
 def chunks(iterable, size):
@@ -61,6 +63,9 @@ def chunks(iterable, size):
         yield batch
 
 def main():
+    # Läsningar via lokal spegel – flikarna hämtas bara om arket ändrats sedan förra körningen
+    mirror = SheetMirror(sh)
+
     # --- Steg 1: Läs slutlig SE-lista ---
     se_final_file = os.path.join("faq-extended", "faq_keywords_se_final.csv")
     df_se = pd.read_csv(se_final_file)
@@ -68,7 +73,7 @@ def main():
     print(f"📊 Totalt {len(se_keywords)} SE-keywords att synka")
 
     # --- Steg 2: Synka SE_FULL_LOOKUP ---
-    ws_se = sh.worksheet(SE_SHEET)
+    ws_se = mirror.worksheet(SE_SHEET)
     existing_se = ws_se.col_values(1)
     existing_se_set = {w.strip().lower() for w in existing_se if w.strip()}
 
@@ -85,7 +90,7 @@ def main():
     # --- Steg 3: Översätt till EN/DA/DE ---
     for lang in LANGS:
         sheet_name = f"{lang}_FULL_LOOKUP"
-        ws_lang = sh.worksheet(sheet_name)
+        ws_lang = mirror.worksheet(sheet_name)
 
         # Hämta keywords + source
         col_keywords = ws_lang.col_values(1)
@@ -101,60 +106,41 @@ def main():
         updates_kw = []
         updates_src = []
 
-        for i, se_kw in enumerate(se_keywords):
-            if not (col_keywords[i] or "").strip():
-                translated = safe_translate(se_kw, "Svenska", lang, i+1)
-                col_keywords[i] = translated
-                col_source[i] = "AI"
-                updates_kw.append((i+1, translated))
-                updates_src.append((i+1, "AI"))
-
-            if (i+1) % 50 == 0:
-                print(f"✅ {lang}: {i+1}/{len(se_keywords)} klara")
-
-        # --- NYTT (CHANGED): ERSÄTT cell-för-cell-skrivning med valuesBatchUpdate i chunkar ---
-        # Vi bygger en lista med ValueRange-objekt för både A (keywords) och B (source)
-        # Google API klarar stora batcher, men vi chunkar till 500 rader per anrop för säkerhets skull.
-        def build_valueranges(rows, col_letter):
-            for start in range(0, len(rows), 500):
-                part = rows[start:start+500]
-                if not part:
-                    continue
-                # range_address av typen "SHEET!A{row}:A{row}" för enskilda celler eller ett block
-                # Här väljer vi block-range för prestanda: A{r1}:A{rN}
-                first_row = part[0][0]
-                last_row = part[-1][0]
-                values = [[val] for _, val in part]
-                yield {
-                    "range": f"{sheet_name}!{col_letter}{first_row}:{col_letter}{last_row}",
-                    "majorDimension": "ROWS",
-                    "values": values,
-                }
-
-        data_payload = []
-        if updates_kw:
-            data_payload.extend(build_valueranges(updates_kw, "A"))
-        if updates_src:
-            data_payload.extend(build_valueranges(updates_src, "B"))
-
-        if data_payload:
-            body = {
-                "valueInputOption": "USER_ENTERED",
-                "data": list(data_payload),
-            }
-            # Viktigt: anropa via Spreadsheet-objektet (inte Worksheet)
-            sh.values_batch_update(body)
-            print(f"🎉 {lang}: Batch-uppdaterade {len(updates_kw)} keywords")
+        todo = [i for i, se_kw in enumerate(se_keywords)
+                if not (col_keywords[i] or "").strip() and se_kw.strip()]
+        translated_all = translate_missing([se_keywords[i] for i in todo], lang)
+
+        for i, (translated, source) in zip(todo, translated_all):
+            if translated is None:
+                print(f"❌ Rad {i+1}: ingen översättning för '{se_keywords[i]}'")
+                continue
+            col_keywords[i] = translated
+            col_source[i] = source
+            updates_kw.append((i+1, translated))
+            updates_src.append((i+1, source))
+        print(f"✅ {lang}: {len(updates_kw)}/{len(todo)} saknade keywords översatta ({chain.summary()})")
+        chain.stats.clear()
+
+        # Keywords (A) och source (B) buffras per rad; bara rader i följd blir ett block,
+        # så hål i todo-listan förskjuter aldrig värdena
+        writer = SheetWriter(sh, flush_cells=0)
+        for row, translated in updates_kw:
+            writer.set(sheet_name, row, "A", translated)
+        for row, source in updates_src:
+            writer.set(sheet_name, row, "B", source)
+        if writer.flush():
+            print(f"🎉 {lang}: Batch-uppdaterade {len(updates_kw)} keywords ({writer.summary()})")
 
         # --- EXTRA: Summering per språk ---
-        # Läs tillbaka kolumn B för att summera AI vs MERGED/COPIED
-        # (För stora ark kan detta kapas, men funkar väl för normal storlek)
-        src_vals = ws_lang.col_values(2)
+        # col_source är kolumn B som den ser ut efter skrivningen – ingen ny läsning behövs
+        src_vals = col_source
         ai_count = sum(1 for v in src_vals if (v or "").strip().upper() == "AI")
+        dict_count = sum(1 for v in src_vals if (v or "").strip().upper() == "DICT")
         copied_count = sum(1 for v in src_vals if (v or "").strip().upper() in {"MERGED", "COPIED"})
-        print(f"🔎 {lang} summering – AI: {ai_count}, COPIED/MERGED: {copied_count}")
+        print(f"🔎 {lang} summering – AI: {ai_count}, DICT: {dict_count}, COPIED/MERGED: {copied_count}")
 
     print("🚀 Klar! Alla språk är synkade och översatta.")
 
 if __name__ == "__main__":
+    setup()
     main()
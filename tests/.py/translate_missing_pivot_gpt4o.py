@@ -1,24 +1,31 @@
 import os
 import time
+import argparse
 import pandas as pd
 from openai import OpenAI
 
+from rate_limiter import backoff_delay, error_headers, estimate_request_tokens, get_limiter, is_rate_limit_error
+from progress_journal import ProgressJournal
+from llm_telemetry import instrument, tag
+from fuzzy_tm import DELTA_MODEL, FuzzyIndex, delta_messages
+from cache_keys import lang_code
+
 # ================== KONFIG ==================
 INPUT_FILE = "backup_step2_row400_20250917_155826.xlsx"  # din “mest kompletta” backup
 OUTPUT_DIR = "översättning"
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "faq_golden_translated.xlsx")
-CHECKPOINT_FILE = "progress_missing_checkpoint.txt"
+JOURNAL_FILE = os.path.join(OUTPUT_DIR, "missing_pivot.journal.jsonl")  # varje klart fält, append-only
 
 MODEL = "gpt-4o"   # hög kvalitet; byt till "gpt-4o-mini" om du vill spara kostnad
-SLEEP_SE_EN = 0.8  # pauser för rate limit
-SLEEP_EN_X  = 1.0
+MAX_ATTEMPTS = 5   # takten styrs av rate_limiter (RPM/TPM + 429-backoff), inga fasta pauser
 
 # Kolumnnamn (måste matcha filen)
 COLS = ["question", "answer", "source", "verified"]
 SHEETS = ["FAQ_SE", "FAQ_EN", "FAQ_DA", "FAQ_DE"]
 # ============================================
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = instrument(OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0))
+limiter = get_limiter(MODEL)
 
 def ensure_dir(d):
     if not os.path.exists(d):
@@ -33,32 +40,84 @@ def safe_get(df, i, col):
     except Exception:
         return ""
 
-def translate_text(text, source_lang, target_lang, sleep_s=0.8):
-    text = (text or "").strip()
-    if not text:
-        return text
-    for attempt in range(3):
+def chat(messages, source_lang, target_lang, model=MODEL):
+    """Ett anrop med RPM/TPM-gräns och retry; None om alla försök misslyckas."""
+    tag(stage=f"{source_lang}→{target_lang}", lang=target_lang)
+    tokens = estimate_request_tokens(messages)
+    lim = limiter if model == MODEL else get_limiter(model)
+    for attempt in range(MAX_ATTEMPTS):
+        lim.acquire(tokens)
         try:
-            resp = client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": f"You are a professional translator. Translate from {source_lang} to {target_lang}. Keep formatting, keep units, be concise and correct domain-specific terminology."},
-                    {"role": "user", "content": text},
-                ],
+            raw = client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
                 temperature=0.2
             )
-            out = resp.choices[0].message.content.strip()
-            time.sleep(sleep_s)
-            return out
+            lim.update_from_headers(raw.headers)
+            return raw.parse().choices[0].message.content.strip()
         except Exception as e:
-            print(f"⚠️ Retry {attempt+1}/3 {source_lang}->{target_lang}: {e}")
-            time.sleep(2 + attempt)
-    return text  # fallback, lämna original om det skiter sig
+            if is_rate_limit_error(e):
+                delay = lim.on_429(error_headers(e), attempt)
+                print(f"🚦 429 {source_lang}->{target_lang}, väntar {delay:.1f}s ({attempt+1}/{MAX_ATTEMPTS})")
+            else:
+                delay = backoff_delay(attempt)
+                print(f"⚠️ Retry {attempt+1}/{MAX_ATTEMPTS} {source_lang}->{target_lang}: {e}")
+            time.sleep(delay)
+    return None
 
-def main():
+def translate_text(text, source_lang, target_lang):
+    text = (text or "").strip()
+    if not text:
+        return text
+    messages = [
+        {"role": "system", "content": f"You are a professional translator. Translate from {source_lang} to {target_lang}. Keep formatting, keep units, be concise and correct domain-specific terminology."},
+        {"role": "user", "content": text},
+    ]
+    # None om alla försök misslyckas – källtexten får aldrig hamna i målspråkets kolumn
+    return chat(messages, source_lang, target_lang)
+
+def translate_cached(text, index, source_lang, target_lang):
+    """Exakt träff → nästan-träff (patch utan anrop, annars litet delta-anrop) → vanlig översättning."""
+    if text in index:
+        return index[text]
+    match = index.lookup(text)
+    result = None
+    if match is not None:
+        result = match.patch(lang_code(source_lang), lang_code(target_lang))
+        if result is not None:
+            print(f"🧩 Patchad från nästan identisk text ({match.score:.2f}): {match.describe()}")
+        else:
+            result = chat(delta_messages(match, source_lang, target_lang), source_lang, target_lang, model=DELTA_MODEL)
+            if result:
+                print(f"✏️ Delta-översatt ({match.score:.2f}): {match.describe()}")
+    if not result:
+        result = translate_text(text, source_lang, target_lang)
+    if result:
+        index[text] = result
+    return result
+
+def fill_row(put, lang, i, answer, question=None, need_question=False):
+    """Skriver bara det som faktiskt översattes; returnerar antal misslyckade fält."""
+    failed = 0
+    if need_question:
+        if question:
+            put(lang, i, "question", question)
+        else:
+            failed += 1
+    if answer:
+        put(lang, i, "answer", answer)
+        put(lang, i, "source", "translated")
+        put(lang, i, "verified", "FALSE")
+    else:
+        failed += 1
+    return failed
+
+def main(compact_only=False):
     ensure_dir(OUTPUT_DIR)
-    print(f"📂 Läser in {INPUT_FILE} ...")
-    df_dict = pd.read_excel(INPUT_FILE, sheet_name=None)
+    # Efter en kompaktering ligger allt som journalen hade i OUTPUT_FILE → fortsätt därifrån
+    source = OUTPUT_FILE if os.path.exists(OUTPUT_FILE) else INPUT_FILE
+    print(f"📂 Läser in {source} ...")
+    df_dict = pd.read_excel(source, sheet_name=None)
 
     # Säkerställ att alla flikar finns
     for sh in SHEETS:
@@ -95,23 +154,37 @@ def main():
     df_dict["FAQ_DA"] = df_da
     df_dict["FAQ_DE"] = df_de
 
-    # Resume från checkpoint
-    start_i = 0
-    if os.path.exists(CHECKPOINT_FILE):
-        try:
-            start_i = int(open(CHECKPOINT_FILE, "r", encoding="utf-8").read().strip() or 0)
-            print(f"⏩ Fortsätter från rad {start_i+1}")
-        except:
-            pass
+    # Resume: spela upp journalen ovanpå indatat
+    frames = {"EN": df_en, "DA": df_da, "DE": df_de}
+    journal = ProgressJournal(JOURNAL_FILE)
+    replayed = journal.replay()
+    for (i, lang, field), value in replayed.items():
+        frames[lang].at[i, field] = value
+    if replayed:
+        print(f"⏩ Spelade upp {len(replayed)} resultat från {JOURNAL_FILE}")
+
+    def put(lang, i, field, value):
+        frames[lang].at[i, field] = value
+        journal.record(i, lang, field, value)
 
-    # Cacher för att undvika identisk svar-översättning flera gånger
-    map_en = {}  # se_answer -> en_answer
-    map_da = {}  # en_answer -> da_answer
-    map_de = {}  # en_answer -> de_answer
+    # Cacher för att undvika identisk (eller nästan identisk) svar-översättning flera gånger,
+    # förifyllda med svaren som redan är översatta i arbetsboken
+    map_en = FuzzyIndex()  # se_answer -> en_answer
+    map_da = FuzzyIndex()  # en_answer -> da_answer
+    map_de = FuzzyIndex()  # en_answer -> de_answer
+    def filled(df, i):
+        v = safe_get(df, i, "answer").strip()
+        return v if v.upper() != "[MISSING]" else ""
+    for i in range(n):
+        a_se, a_en = safe_get(df_se, i, "answer"), filled(df_en, i)
+        if a_en:
+            map_en.add(a_se, a_en)
+            map_da.add(a_en, filled(df_da, i))
+            map_de.add(a_en, filled(df_de, i))
 
     # Räkna hur många som faktiskt saknas
     missing_rows = []
-    for i in range(start_i, n):
+    for i in range(n):
         a_da = safe_get(df_da, i, "answer")
         a_de = safe_get(df_de, i, "answer")
         if not a_da.strip() or a_da.strip().upper() == "[MISSING]":
@@ -119,8 +192,11 @@ def main():
         elif not a_de.strip() or a_de.strip().upper() == "[MISSING]":
             missing_rows.append(i)
     missing_rows = sorted(set(missing_rows))
+    if compact_only:
+        missing_rows = []
 
     print(f"🔎 Totalt saknade rader att fylla: {len(missing_rows)}")
+    failed = 0  # fält som inte gick att översätta – lämnas tomma och försöks igen nästa körning
 
     for idx, i in enumerate(missing_rows, start=1):
         q_se = safe_get(df_se, i, "question")
@@ -132,68 +208,56 @@ def main():
 
         # Steg 1: SE -> EN om EN saknas
         if not q_en.strip():
-            q_en = translate_text(q_se, "Swedish", "English", sleep_s=SLEEP_SE_EN)
-            df_en.at[i, "question"] = q_en or q_se
+            q_en = translate_text(q_se, "Swedish", "English") or ""
+            if q_en:
+                put("EN", i, "question", q_en)
+            else:
+                failed += 1
         if not a_en.strip():
-            if a_se in map_en:
-                a_en = map_en[a_se]
+            a_en = translate_cached(a_se, map_en, "Swedish", "English") or ""
+            if a_en:
+                put("EN", i, "answer", a_en)
+                put("EN", i, "source", "translated")
+                put("EN", i, "verified", "FALSE")
             else:
-                a_en = translate_text(a_se, "Swedish", "English", sleep_s=SLEEP_SE_EN)
-                map_en[a_se] = a_en
-            df_en.at[i, "answer"] = a_en
-            df_en.at[i, "source"] = "translated"
-            df_en.at[i, "verified"] = "FALSE"
+                # Ingen engelsk pivot → DA/DE väntar till nästa körning
+                failed += 1
+                print(f"❌ Rad {i+1}: SE→EN misslyckades, hoppar över DA/DE")
+                continue
 
         # Steg 2: EN -> DA / DE om saknas
         # DA
         a_da = safe_get(df_da, i, "answer")
         if not a_da.strip() or a_da.strip().upper() == "[MISSING]":
-            if a_en in map_da:
-                da_answer = map_da[a_en]
-            else:
-                da_answer = translate_text(a_en, "English", "Danish", sleep_s=SLEEP_EN_X)
-                map_da[a_en] = da_answer
-            # fråga också
-            da_question = translate_text(q_en, "English", "Danish", sleep_s=SLEEP_EN_X) if not safe_get(df_da, i, "question").strip() else safe_get(df_da, i, "question")
-            df_da.at[i, "question"] = da_question
-            df_da.at[i, "answer"]   = da_answer
-            df_da.at[i, "source"]   = "translated"
-            df_da.at[i, "verified"] = "FALSE"
+            need_q = not safe_get(df_da, i, "question").strip()
+            failed += fill_row(put, "DA", i, translate_cached(a_en, map_da, "English", "Danish"),
+                               translate_text(q_en, "English", "Danish") if need_q else None, need_q)
 
         # DE
         a_de = safe_get(df_de, i, "answer")
         if not a_de.strip() or a_de.strip().upper() == "[MISSING]":
-            if a_en in map_de:
-                de_answer = map_de[a_en]
-            else:
-                de_answer = translate_text(a_en, "English", "German", sleep_s=SLEEP_EN_X)
-                map_de[a_en] = de_answer
-            de_question = translate_text(q_en, "English", "German", sleep_s=SLEEP_EN_X) if not safe_get(df_de, i, "question").strip() else safe_get(df_de, i, "question")
-            df_de.at[i, "question"] = de_question
-            df_de.at[i, "answer"]   = de_answer
-            df_de.at[i, "source"]   = "translated"
-            df_de.at[i, "verified"] = "FALSE"
-
-        # Checkpoint & backup var 25:e rad (snabbare återhämtning)
-        if (idx % 25) == 0 or idx == len(missing_rows):
-            with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-                f.write(str(i+1))
-            backup = os.path.join(OUTPUT_DIR, f"backup_missing_row{i+1}.xlsx")
-            with pd.ExcelWriter(backup, engine="openpyxl") as w:
-                df_se.to_excel(w, sheet_name="FAQ_SE", index=False)
-                df_en.to_excel(w, sheet_name="FAQ_EN", index=False)
-                df_da.to_excel(w, sheet_name="FAQ_DA", index=False)
-                df_de.to_excel(w, sheet_name="FAQ_DE", index=False)
-            print(f"💾 Backup: {backup}")
-
-    # Spara slutfil
-    with pd.ExcelWriter(OUTPUT_FILE, engine="openpyxl") as w:
+            need_q = not safe_get(df_de, i, "question").strip()
+            failed += fill_row(put, "DE", i, translate_cached(a_en, map_de, "English", "German"),
+                               translate_text(q_en, "English", "German") if need_q else None, need_q)
+
+    # Kompaktering: journal + indata → en arbetsbok, en gång
+    journal.close()
+    tmp = OUTPUT_FILE + ".tmp.xlsx"
+    with pd.ExcelWriter(tmp, engine="openpyxl") as w:
         df_se.to_excel(w, sheet_name="FAQ_SE", index=False)
         df_en.to_excel(w, sheet_name="FAQ_EN", index=False)
         df_da.to_excel(w, sheet_name="FAQ_DA", index=False)
         df_de.to_excel(w, sheet_name="FAQ_DE", index=False)
+    os.replace(tmp, OUTPUT_FILE)
+    # Allt i journalen finns nu i arbetsboken → börja om (annars växer den och spelas upp i onödan varje körning)
+    journal.truncate()
 
-    print(f"\n🎉 Klart! Sparade {OUTPUT_FILE}")
+    print(f"\n🎉 Klart! Sparade {OUTPUT_FILE} ({journal.written} nya resultat, journalen tömd)")
+    if failed:
+        print(f"⚠️ {failed} fält kunde inte översättas och är tomma – kör igen för att fylla dem")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compact", action="store_true", help="bara spela upp journalen och skriv arbetsboken")
+    args = parser.parse_args()
+    main(compact_only=args.compact)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+translation_bench.py
+--------------------
+Genomströmningsmätning av översättningsvägarna mot openai_stub_server.py (inga API-anrop, inga kalkylark).
+- FAQ: translate_rows i translate_faq_sheets_se_to_en_da_de_UPDATED.py – mallar, SE→EN→DA/DE-pipeline,
+  svar segmentvis med delade segment, språkkontroll
+- Keywords: translate_missing i translate_keywords_sheets_batch.py – ordbok, minne, tokenpackade JSON-batcher
+- Skriptens egna funktioner körs (setup() med stubbens motor och ett tomt översättningsminne per körning),
+  så en regression i skripten syns i siffrorna
+- Korpusen körs i 1×, 10× och 100× storlek (kopiorna märks så att de inte är identiska texter)
+- Rapport per körning: rader, anrop, 429/5xx, total tid och rader/s
+
+Stubben startas i samma process; motorn pekas dit med OPENAI_BASE_URL. Parallellism och gränser
+styrs som vanligt (TRANSLATE_CONCURRENCY, PIPELINE_WORKERS, OPENAI_RPM/OPENAI_TPM).
+
+Exempel:
+    python tests/.py/translation_bench.py
+    python tests/.py/translation_bench.py --only faq --scales 1,10 --latency lognormal:0.3,0.5 --error-429 0.02
+"""
+
+import os
+import csv
+import time
+import asyncio
+import argparse
+import tempfile
+
+# Stubben har inga riktiga gränser och mätningen ska inte skriva telemetri om inget annat sägs
+os.environ.setdefault("OPENAI_RPM", "100000")
+os.environ.setdefault("OPENAI_TPM", "100000000")
+os.environ.setdefault("TELEMETRY", "0")
+
+from openai_stub_server import StubServer
+from translate_engine import TranslateEngine
+from translation_memory import TranslationMemory
+from migrate_translation_caches import DEFAULT_CORPUS, load_rows
+import translate_faq_sheets_se_to_en_da_de_UPDATED as faq_script
+import translate_keywords_sheets_batch as keywords_script
+
+KEYWORDS_FILE = os.path.join("faq-extended", "faq_keywords_se_final.csv")
+MODEL = "gpt-4o"
+
+
+# --------- Korpus ---------
+def load_faq(path: str = DEFAULT_CORPUS, limit: int = None):
+    rows = [r for r in load_rows(path) if str(r.get("question_se") or "").strip()]
+    return rows[:limit] if limit else rows
+
+def load_keywords(path: str = KEYWORDS_FILE, limit: int = None):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        words = [r["SE"].strip() for r in csv.DictReader(f) if (r.get("SE") or "").strip()]
+    return words[:limit] if limit else words
+
+def scale_rows(rows, factor: int):
+    """factor kopior; kopia k > 0 får " (k)" efter varje fält så att ingenting dedupliceras bort."""
+    out = []
+    for k in range(factor):
+        tag = f" ({k})" if k else ""
+        out.extend({f: (str(r.get(f) or "") + tag if str(r.get(f) or "").strip() else "") for f in ("question_se", "answer_se")} for r in rows)
+    return out
+
+def scale_words(words, factor: int):
+    return [w + (f" ({k})" if k else "") for k in range(factor) for w in words]
+
+
+# --------- Översättningsvägar (skriptens egna funktioner) ---------
+def run_faq(engine, tm, rows):
+    faq_script.setup(memory=tm, translate_engine=engine)
+    _, _, _, failed = asyncio.run(faq_script.translate_rows(rows))
+    return len(rows) - len(failed)
+
+def run_keywords(engine, tm, words):
+    keywords_script.setup(memory=tm, translate_engine=engine)
+    done = len(words)
+    for lang in keywords_script.LANGS:
+        res = keywords_script.translate_missing(words, lang)
+        done = min(done, sum(1 for translated, _ in res if translated))
+    return done
+
+
+# --------- Mätning ---------
+def measure(stub: StubServer, name: str, runner, items) -> dict:
+    engine = TranslateEngine(model=MODEL)
+    before = dict(stub.stats)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Tomt minne per körning – annars besvaras större körningar ur den förras svar
+        tm = TranslationMemory(os.path.join(tmp, "bench.sqlite"))
+        t0 = time.perf_counter()
+        done = runner(engine, tm, items)
+        wall = time.perf_counter() - t0
+        tm.close()
+    delta = {k: stub.stats[k] - before.get(k, 0) for k in stub.stats}
+    return {"name": name, "rows": len(items), "done": done, "wall": wall, **delta}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", choices=["faq", "keywords"], help="kör bara en av översättarna")
+    parser.add_argument("--scales", default="1,10,100", help="korpusstorlekar som multipler")
+    parser.add_argument("--faq", default=DEFAULT_CORPUS)
+    parser.add_argument("--keywords", default=KEYWORDS_FILE)
+    parser.add_argument("--rows", type=int, help="basstorlek (rader/keywords) före skalning")
+    parser.add_argument("--latency", default="lognormal:0.05,0.5", help="latens i stubben (se openai_stub_server.py)")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int)
+    parser.add_argument("--tpm", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = StubServer(args.latency, args.error_429, args.error_5xx, args.rpm, args.tpm, args.seed)
+    os.environ["OPENAI_BASE_URL"] = stub.start()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    print(f"🧪 Stubb på {stub.base_url} (latens {args.latency}, 429={args.error_429}, 5xx={args.error_5xx})")
+
+    suites = []
+    if args.only in (None, "faq"):
+        suites.append(("FAQ", run_faq, load_faq(args.faq, args.rows), scale_rows))
+    if args.only in (None, "keywords"):
+        suites.append(("keywords", run_keywords, load_keywords(args.keywords, args.rows), scale_words))
+
+    results = []
+    try:
+        for name, runner, base, scale in suites:
+            for factor in [int(x) for x in args.scales.split(",") if x.strip()]:
+                items = scale(base, factor)
+                print(f"▶️ {name} {factor}× ({len(items)} rader) …")
+                results.append(measure(stub, f"{name} {factor}×", runner, items))
+    finally:
+        stub.stop()
+
+    print(f"\n{'körning':16s} {'rader':>7s} {'klara':>7s} {'anrop':>7s} {'429':>5s} {'5xx':>5s} {'tid (s)':>9s} {'rader/s':>9s}")
+    for r in results:
+        print(f"{r['name']:16s} {r['rows']:7d} {r['done']:7d} {r['requests']:7d} {r['429']:5d} {r['5xx']:5d} "
+              f"{r['wall']:9.1f} {r['rows'] / r['wall'] if r['wall'] else 0:9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+translation_memory.py
+---------------------
+Persistent översättningsminne (SQLite) som ersätter JSON-cachen.
+- Nyckel: (källspråk, målspråk, modell, promptversion, hash av kanonisk text, se cache_keys.py)
+- Indexerad uppslagning, inga helfilsladdningar
+- Varje put() committas direkt (WAL) → en krasch tappar ingenting
+- transaction() för att lägga in många rader i ett svep
+
+Exempel:
+    tm = TranslationMemory()
+    hit = tm.get("Vilka färger finns?", "SE", "EN", "gpt-4o", "faq-sheets-v1")
+    if hit is None:
+        tm.put("Vilka färger finns?", "What colors are available?", "SE", "EN", "gpt-4o", "faq-sheets-v1")
+"""
+
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cache_keys import canonical_text, strip_keep_markers, text_hash
+from llm_telemetry import record_cache
+
+DEFAULT_DB = os.path.join("faq-extended", "cache", "translation_memory.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    src_lang       TEXT NOT NULL,
+    tgt_lang       TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    text_hash      TEXT NOT NULL,
+    source_text    TEXT NOT NULL,
+    translation    TEXT NOT NULL,
+    created_at     REAL NOT NULL,
+    PRIMARY KEY (src_lang, tgt_lang, model, prompt_version, text_hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imports (
+    path           TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    entries        INTEGER NOT NULL,
+    imported_at    REAL NOT NULL,
+    PRIMARY KEY (path, model, prompt_version)
+);
+"""
+
+
+# --------- Minne ---------
+class TranslationMemory:
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._in_tx = False
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, text: str, src_lang: str, tgt_lang: str, model: str, prompt_version: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT translation FROM translations "
+            "WHERE src_lang=? AND tgt_lang=? AND model=? AND prompt_version=? AND text_hash=?",
+            (src_lang, tgt_lang, model, prompt_version, text_hash(text)),
+        ).fetchone()
+        record_cache(row is not None, src_lang, tgt_lang)
+        return row[0] if row else None
+
+    def get_any(self, text: str, src_lang: str, tgt_lang: str) -> Optional[str]:
+        """Senaste översättningen oavsett modell/promptversion (rapporter, fallback)."""
+        row = self.conn.execute(
+            "SELECT translation FROM translations WHERE src_lang=? AND tgt_lang=? AND text_hash=? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (src_lang, tgt_lang, text_hash(text)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, texts: Iterable[str], src_lang: str, tgt_lang: str, model: str, prompt_version: str) -> Dict[str, str]:
+        """Slår upp flera texter på en gång → {text: översättning} för träffarna."""
+        by_hash: Dict[str, List[str]] = {}
+        for t in texts:
+            by_hash.setdefault(text_hash(t), []).append(t)
+        hashes = list(by_hash)
+        out: Dict[str, str] = {}
+        for start in range(0, len(hashes), 500):  # SQLite-gräns för antal parametrar
+            part = hashes[start:start+500]
+            rows = self.conn.execute(
+                "SELECT text_hash, translation FROM translations "
+                "WHERE src_lang=? AND tgt_lang=? AND model=? AND prompt_version=? "
+                f"AND text_hash IN ({','.join('?' * len(part))})",
+                (src_lang, tgt_lang, model, prompt_version, *part),
+            ).fetchall()
+            for h, translation in rows:
+                for t in by_hash[h]:
+                    out[t] = translation
+        return out
+
+    def entries(self, src_lang: str, tgt_lang: str, model: Optional[str] = None,
+                prompt_version: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """(källtext, översättning) för ett språkpar, ev. begränsat till modell/promptversion (t.ex. fuzzy-index)."""
+        sql = "SELECT source_text, translation FROM translations WHERE src_lang=? AND tgt_lang=?"
+        params: List[str] = [src_lang, tgt_lang]
+        if model is not None:
+            sql += " AND model=?"
+            params.append(model)
+        if prompt_version is not None:
+            sql += " AND prompt_version=?"
+            params.append(prompt_version)
+        yield from self.conn.execute(sql + " ORDER BY created_at", params)
+
+    def put(self, text: str, translation: str, src_lang: str, tgt_lang: str, model: str, prompt_version: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO translations VALUES (?,?,?,?,?,?,?,?)",
+            (src_lang, tgt_lang, model, prompt_version, text_hash(text),
+             canonical_text(text), translation, time.time()),
+        )
+        if not self._in_tx:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Samlar många put() i en commit (rullas tillbaka vid fel)."""
+        self._in_tx = True
+        try:
+            yield self
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_tx = False
+
+    def import_json(
+        self,
+        path: str,
+        parse_key: Callable[[str], Optional[Tuple[str, str, str]]],
+        model: str,
+        prompt_version: str,
+    ) -> int:
+        """Läser in en gammal JSON-cache en gång. parse_key(nyckel) -> (src, tgt, text) eller None."""
+        if not os.path.exists(path):
+            return 0
+        abspath = os.path.abspath(path)
+        if self.conn.execute(
+            "SELECT 1 FROM imports WHERE path=? AND model=? AND prompt_version=?",
+            (abspath, model, prompt_version),
+        ).fetchone():
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except Exception:
+                return 0
+        count = 0
+        with self.transaction():
+            for key, translation in data.items():
+                parsed = parse_key(key)
+                if not parsed or not isinstance(translation, str):
+                    continue
+                src, tgt, text = parsed
+                self.put(text, strip_keep_markers(translation), src, tgt, model, prompt_version)
+                count += 1
+            self.conn.execute(
+                "INSERT INTO imports VALUES (?,?,?,?,?)",
+                (abspath, model, prompt_version, count, time.time()),
+            )
+        return count
@@ -14,7 +14,8 @@ import os
 import json
 import time
 from pathlib import Path
-import gspread
+
+from sheets_client import open_spreadsheet
 
 try:
     from dotenv import load_dotenv
@@ -30,22 +31,7 @@ def get_gspread_client():
     if load_dotenv:
         load_dotenv(ROOT / ".env.local")
 
-    SHEET_ID = os.getenv("SHEET_ID_MAIN")
-    GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-    GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-    GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-    creds = {
-        "type": "service_account",
-        "project_id": GCP_PROJECT_ID,
-        "private_key_id": "dummy",
-        "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-        "client_email": GCP_CLIENT_EMAIL,
-        "client_id": "dummy",
-        "token_uri": "https://oauth2.googleapis.com/token",
-    }
-    gc = gspread.service_account_from_dict(creds)
-    return gc.open_by_key(SHEET_ID)
+    return open_spreadsheet(os.getenv("SHEET_ID_MAIN"))
 
 # --------- Main ---------
 def main():
@@ -1,29 +1,15 @@
-import gspread
 import pandas as pd
 import time
 import os
 from dotenv import load_dotenv
+from sheets_client import open_spreadsheet
 
 # 🔑 Läs env
 load_dotenv(".env.local")
 
 SHEET_ID = os.getenv("SHEET_ID_MAIN")
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_CLIENT_EMAIL = os.getenv("GCP_CLIENT_EMAIL")
-GCP_PRIVATE_KEY = os.getenv("GCP_PRIVATE_KEY")
-
-# 🔐 Google auth via service account från env
-creds = {
-    "type": "service_account",
-    "project_id": GCP_PROJECT_ID,
-    "private_key_id": "dummy",
-    "private_key": GCP_PRIVATE_KEY.replace("\\n", "\n"),
-    "client_email": GCP_CLIENT_EMAIL,
-    "client_id": "dummy",
-    "token_uri": "https://oauth2.googleapis.com/token",
-}
-gc = gspread.service_account_from_dict(creds)
-sh = gc.open_by_key(SHEET_ID)
+
+sh = open_spreadsheet(SHEET_ID)
 
 # 📂 Normaliserade CSV-filer → rätt flikar
 base_dir = os.path.join(os.path.dirname(__file__), "..", "..", "faq-extended")
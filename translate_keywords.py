@@ -1,6 +1,9 @@
 import os
+import sys
 import json
 import math
+import asyncio
+from pathlib import Path
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font
@@ -9,24 +12,16 @@ from openpyxl.styles.differential import DifferentialStyle
 from openpyxl.worksheet.datavalidation import DataValidation
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+# Delade översättningsmoduler ligger i tests/.py
+sys.path.insert(0, str(Path(__file__).parent / "tests" / ".py"))
+from translate_engine import TranslateEngine
+from batch_translate import batch_complete_packed, translate_list
 
 # Ladda env.local från projektroten
 load_dotenv(dotenv_path=".env.local", override=True)
 
 
-# Initiera klienten (hämtar API-nyckeln från env.local)
-client = OpenAI()
-
-def chat_completion(messages, model="gpt-4o", temperature=0):
-    resp = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature
-    )
-    return resp.choices[0].message.content
-
-
 # ======== CONFIG ========
 INPUT_XLSX = r"C:\Users\chris\Documents\SE_FULL_LOOKUP.xlsx"
 SHEET_SE_LOOKUP = "SE_FULL_LOOKUP"
@@ -35,48 +30,54 @@ OUTPUT_JSON = r"C:\Users\chris\Documents\Faq_keywords_lookup_multilang.json"
 
 MODEL_TRANSLATE = "gpt-4o"     # or "gpt-4o" for best quality
 MODEL_SYNONYMS  = "gpt-4o"     # can be same as above
-BATCH_SIZE = 120                    # safe batch size
+# Batcher packas efter tokenbudget (batch_packer.py) i stället för fast BATCH_SIZE
+BUDGET = {"max_input_tokens": 6000, "max_output_tokens": 4000, "max_items": 200}
+
+# Initiera motorn (hämtar API-nyckeln från env.local)
+engine = TranslateEngine(model=MODEL_TRANSLATE)
 
 # ======== helpers ========
-def chunks(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i+n]
-
-def translate_batch(sw_words, target_lang):
-    prompt = (
-        f"Translate the following Swedish keywords into {target_lang}.\n"
-        f"Return ONLY a plain list, one translation per line, same order, no numbering.\n\n"
-        "Swedish words:\n" + "\n".join(sw_words)
-    )
-    txt = chat_completion(
-        [{"role": "user", "content": prompt}],
-        model=MODEL_TRANSLATE,
-        temperature=0
-    )
-    lines = [x.strip() for x in txt.splitlines() if x.strip()]
-    # If model returns fewer lines than input, pad with originals to keep length
-    if len(lines) != len(sw_words):
-        # attempt a best-effort map; if mismatch, fill with Swedish word
-        lines = (lines + sw_words)[:len(sw_words)]
-    return lines
-
-def generate_synonyms_batch(words, lang_label):
+async def translate_batch(sw_words, target_lang):
+    # id-taggade poster + JSON-svar; bara saknade id:n skickas om
+    out = await translate_list(engine, sw_words, "Swedish", target_lang,
+                               extra="Items are short keywords; answer with the keyword only.",
+                               model=MODEL_TRANSLATE, budget=BUDGET)
+    missing = [w for w, t in zip(sw_words, out) if t is None]
+    if missing:
+        # Lämnas tomma (inte det svenska ordet) – make_check flaggar raden som NEED_CHECK
+        print(f"⚠️ {target_lang}: {len(missing)} ord saknar översättning: {missing[:10]}")
+    return [t if t is not None else "" for t in out]
+
+async def generate_synonyms_batch(words, lang_label):
     # Ask for 1–3 simple synonyms per word, comma-separated, or "-" if none.
-    prompt = (
-        f"Generate up to 3 common synonyms for each of the following {lang_label} keywords.\n"
-        f"Return ONLY a plain list, one line per word, comma-separated synonyms, or '-' if none.\n\n"
-        f"Words:\n" + "\n".join(words)
-    )
-    txt = chat_completion(
-        [{"role": "user", "content": prompt}],
+    # Tomma (saknade) översättningar skickas inte
+    todo = [w for w in words if w]
+    if not todo:
+        return ["" for _ in words]
+    out = await batch_complete_packed(
+        engine,
+        todo,
+        f"For every {lang_label} keyword, generate up to 3 common synonyms as one "
+        f"comma-separated string, or '-' if none.",
         model=MODEL_SYNONYMS,
-        temperature=0
+        budget=dict(BUDGET, output_ratio=4.0),
     )
-    lines = [x.strip() for x in txt.splitlines()]
-    # length guard
-    if len(lines) != len(words):
-        lines = (lines + ["-"] * len(words))[:len(words)]
-    return lines
+    syns = iter(s if s is not None else "-" for s in out)
+    return [next(syns) if w else "" for w in words]
+
+async def translate_all(se_words):
+    # Alla språk parallellt (motorn begränsar antal samtidiga anrop), ordningen bevaras
+    en_all, da_all, de_all = await asyncio.gather(
+        translate_batch(se_words, "English"),
+        translate_batch(se_words, "Danish"),
+        translate_batch(se_words, "German"),
+    )
+    syn_en, syn_da, syn_de = await asyncio.gather(
+        generate_synonyms_batch(en_all, "English"),
+        generate_synonyms_batch(da_all, "Danish"),
+        generate_synonyms_batch(de_all, "German"),
+    )
+    return en_all, da_all, de_all, syn_en, syn_da, syn_de
 
 def categorize_se(se_word: str) -> str:
     w = (se_word or "").lower()
@@ -99,9 +100,9 @@ def is_domain_term(se_word: str) -> bool:
 
 def make_check(se, en, da, de):
     se_ = (se or "").strip().lower()
-    return "NEED_CHECK" if (se_.lower() in [(en or "").strip().lower(),
-                                            (da or "").strip().lower(),
-                                            (de or "").strip().lower()]) else "OK"
+    targets = [(en or "").strip().lower(), (da or "").strip().lower(), (de or "").strip().lower()]
+    # Oöversatt (samma som svenska) eller saknad översättning
+    return "NEED_CHECK" if (se_ in targets or "" in targets) else "OK"
 
 # ======== main pipeline ========
 def main():
@@ -113,20 +114,8 @@ def main():
     print(f"Loaded {len(se_words)} Swedish keywords.")
 
     # 2) Translate to EN / DA / DE in batches
-    en_all, da_all, de_all = [], [], []
-    for batch in chunks(se_words, BATCH_SIZE):
-        en_all += translate_batch(batch, "English")
-        da_all += translate_batch(batch, "Danish")
-        de_all += translate_batch(batch, "German")
-
     # 3) Synonyms per language (also batched)
-    syn_en, syn_da, syn_de = [], [], []
-    for batch_en in chunks(en_all, BATCH_SIZE):
-        syn_en += generate_synonyms_batch(batch_en, "English")
-    for batch_da in chunks(da_all, BATCH_SIZE):
-        syn_da += generate_synonyms_batch(batch_da, "Danish")
-    for batch_de in chunks(de_all, BATCH_SIZE):
-        syn_de += generate_synonyms_batch(batch_de, "German")
+    en_all, da_all, de_all, syn_en, syn_da, syn_de = asyncio.run(translate_all(se_words))
 
     # 4) Assemble DataFrame with extra columns
     data = {